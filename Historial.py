@@ -1,9 +1,7 @@
+import os
 import sys
-import sqlite3
+import threading
 from datetime import datetime
-import csv
-import json
-import xml.etree.ElementTree as ET
 from PyQt6.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -14,6 +12,7 @@ from PyQt6.QtWidgets import (
     QPushButton,
     QTableWidget,
     QTableWidgetItem,
+    QTableView,
     QLineEdit,
     QDateEdit,
     QHeaderView,
@@ -25,7 +24,9 @@ from PyQt6.QtWidgets import (
     QSplitter,
     QTabWidget,
     QComboBox,
+    QSpinBox,
     QProgressBar,
+    QProgressDialog,
     QFrame,
 )
 from PyQt6.QtGui import (
@@ -37,16 +38,18 @@ from PyQt6.QtGui import (
     QBrush,
     QPainter,
 )
-from PyQt6.QtCore import Qt, QSize, QDate, QTimer, QPropertyAnimation, QEasingCurve, QTime
-from PyQt6.QtCharts import (
-    QChart,
-    QChartView,
-    QBarSet,
-    QBarSeries,
-    QValueAxis,
-    QBarCategoryAxis,
-    QPieSeries,
-)
+from PyQt6.QtCore import Qt, QSize, QDate, QTimer, QPropertyAnimation, QEasingCurve, QTime, QThreadPool
+from PyQt6.QtCharts import QChart, QChartView, QPieSeries
+
+from charts import BarChartView
+from database import get_connection
+import events
+import rollups
+from exporters import export_line_items, export_query
+from schema import get_counter
+from table_models import ButtonDelegate, LazyQueryModel
+from sales_history import SalesHistoryPager, filter_query
+from workers import EventRelay, Worker, serial_pool
 
 
 class DigitalClock(QLabel):
@@ -130,17 +133,35 @@ class AnimatedProgressBar(QProgressBar):
         self.animation.setEndValue(end)
         self.animation.start()
 
+# Opciones de sort_combo -> (orden del paginador, descendente)
+SORT_OPTIONS = [("fecha", True), ("total", True), ("cliente", False)]
+
+# Campos de cada venta exportada (JSON/XML) y encabezados del CSV
+EXPORT_FIELDS = ("id", "cliente", "fecha", "total")
+EXPORT_HEADERS = ["ID Venta", "Cliente", "Fecha", "Total"]
+
+# Espera tras la última tecla antes de filtrar el historial
+FILTER_DEBOUNCE_MS = 250
+# Fecha mínima del filtro: significa "todas las fechas"
+ANY_DATE = QDate(2000, 1, 1)
+
+
 class SalesHistoryWidget(QWidget):
     def __init__(self):
         super().__init__()
         self.page = 1
         self.items_per_page = 20
-        self.total_items = 0
-        self.current_sort = "fecha"
-        self.sort_order = "DESC"
+        self.pager = SalesHistoryPager(self.items_per_page)
+        # Un solo hilo: el paginador nunca se usa desde dos trabajos a la vez
+        self.thread_pool = serial_pool(self)
+        self._request = 0
+        self._stale = False
         self.init_ui()
         self.load_sales_history()
 
+        self.events = EventRelay((events.SALE,), self)
+        self.events.event.connect(self.on_event)
+
     def init_ui(self):
         main_layout = QVBoxLayout(self)
         main_layout.setContentsMargins(0, 0, 0, 0)
@@ -278,11 +299,20 @@ class SalesHistoryWidget(QWidget):
         """)
         search_layout.addWidget(search_icon)
         search_layout.addWidget(self.search_input)
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(FILTER_DEBOUNCE_MS)
+        self.filter_timer.timeout.connect(self.filter_sales)
+        self.search_input.textEdited.connect(self.filter_timer.start)
         toolbar_layout.addWidget(search_container)
 
         # Filtros mejorados
         self.date_filter = QDateEdit()
         self.date_filter.setCalendarPopup(True)
+        self.date_filter.setMinimumDate(ANY_DATE)
+        self.date_filter.setSpecialValueText("Todas las fechas")
+        self.date_filter.setDate(ANY_DATE)
+        self.date_filter.dateChanged.connect(self.filter_timer.start)
         self.date_filter.setStyleSheet("""
             QDateEdit {
                 padding: 8px;
@@ -311,20 +341,30 @@ class SalesHistoryWidget(QWidget):
                 height: 12px;
             }
         """)
+        self.sort_combo.currentIndexChanged.connect(self.change_sort)
         toolbar_layout.addWidget(self.sort_combo)
 
         sales_layout.addWidget(toolbar)
 
         # Tabla mejorada con nuevo diseño
-        self.sales_table = QTableWidget()
-        self.sales_table.setColumnCount(5)
-        self.sales_table.setHorizontalHeaderLabels(
-            ["ID", "Cliente", "Fecha", "Total", "Acciones"]
+        # La columna "Acciones" no viene de la consulta: la dibuja el delegado
+        self.sales_model = LazyQueryModel(
+            ["ID", "Cliente", "Fecha", "Total", "Acciones"],
+            alignment=Qt.AlignmentFlag.AlignCenter,
+            parent=self,
+        )
+        self.sales_table = QTableView()
+        self.sales_table.setModel(self.sales_model)
+        self.view_delegate = ButtonDelegate("Ver", "#3498db", "icons/view.png", self.sales_table)
+        self.view_delegate.clicked.connect(
+            lambda row: self.show_sale_details(self.sales_model.row_values(row)[0])
         )
+        self.sales_table.setItemDelegateForColumn(4, self.view_delegate)
+        self.sales_table.setMouseTracking(True)
         
         # Estilo mejorado de la tabla
         self.sales_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: white;
                 gridline-color: #e0e6ed;
                 border: none;
@@ -334,18 +374,18 @@ class SalesHistoryWidget(QWidget):
                 font-size: 14px;
             }
             
-            QTableWidget::item {
+            QTableView::item {
                 padding: 16px;
                 border-bottom: 1px solid #e0e6ed;
                 color: #2c3e50;
                 font-size: 15px;
             }
             
-            QTableWidget::item:hover {
+            QTableView::item:hover {
                 background-color: #f8f9fa;
             }
             
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #e3f2fd;
                 color: #1565c0;
                 font-weight: 500;
@@ -396,12 +436,12 @@ class SalesHistoryWidget(QWidget):
                 background: none;
             }
             
-            QTableWidget::item:focus {
+            QTableView::item:focus {
                 border: none;
                 outline: none;
             }
             
-            QTableWidget QTableCornerButton::section {
+            QTableView QTableCornerButton::section {
                 background-color: #f8fafc;
                 border: none;
             }
@@ -430,7 +470,7 @@ class SalesHistoryWidget(QWidget):
         
         # Animación suave al seleccionar filas
         self.sales_table.setStyleSheet(self.sales_table.styleSheet() + """
-            QTableWidget::item {
+            QTableView::item {
             }
         """)
 
@@ -451,7 +491,23 @@ class SalesHistoryWidget(QWidget):
 
         self.prev_button = QPushButton("← Anterior")
         self.next_button = QPushButton("Siguiente →")
-        self.page_label = QLabel("Página 1 de 10")
+        self.page_label = QLabel("Página 1 de 1")
+        self.prev_button.clicked.connect(self.prev_page)
+        self.next_button.clicked.connect(self.next_page)
+
+        # Ir directamente a una página
+        self.page_spin = QSpinBox()
+        self.page_spin.setMinimum(1)
+        self.page_spin.setPrefix("Ir a ")
+        self.page_spin.setStyleSheet("""
+            QSpinBox {
+                padding: 6px;
+                border: 1px solid #e0e6ed;
+                border-radius: 5px;
+                background: #f5f7fa;
+            }
+        """)
+        self.page_spin.editingFinished.connect(self.go_to_page)
         
         for button in [self.prev_button, self.next_button]:
             button.setStyleSheet("""
@@ -481,6 +537,7 @@ class SalesHistoryWidget(QWidget):
         pagination_layout.addWidget(self.prev_button)
         pagination_layout.addWidget(self.page_label)
         pagination_layout.addWidget(self.next_button)
+        pagination_layout.addWidget(self.page_spin)
         sales_layout.addWidget(pagination)
 
          # Barra de acciones mejorada con botones de exportación
@@ -498,12 +555,12 @@ class SalesHistoryWidget(QWidget):
         actions_layout = QHBoxLayout(actions)
 
         export_buttons = [
-            ("CSV", "📊", self.export_to_csv),
-            ("JSON", "📝", self.export_to_json),
-            ("XML", "📄", self.export_to_xml)
+            ("CSV", "📊"),
+            ("JSON", "📝"),
+            ("XML", "📄")
         ]
 
-        for format, icon, func in export_buttons:
+        for format, icon in export_buttons:
             button = QPushButton(f"{icon} Exportar {format}")
             button.setStyleSheet("""
                 QPushButton {
@@ -533,6 +590,12 @@ class SalesHistoryWidget(QWidget):
             button.clicked.connect(lambda checked, f=format.lower(): self.export_data(f))
             actions_layout.addWidget(button)
 
+        # Detalle de cada venta (productos) para contabilidad
+        line_items_button = QPushButton("📦 Exportar detalle")
+        line_items_button.setStyleSheet(button.styleSheet())
+        line_items_button.clicked.connect(self.export_line_items_data)
+        actions_layout.addWidget(line_items_button)
+
         sales_layout.addWidget(actions)
 
         # Barra de progreso mejorada
@@ -555,147 +618,127 @@ class SalesHistoryWidget(QWidget):
         return sales_widget
 
     def load_sales_history(self):
-        """Carga el historial de ventas desde la base de datos con una barra de progreso animada."""
-        # Inicializar la barra de progreso
-        self.progress_bar.setValue(0)
-
-        # Paso 1: Simular progreso inicial (0 a 50)
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_progress_load_data)
-        self.timer.start(50)  # Actualización cada 50ms
-
-    def update_progress_load_data(self):
-        """Actualiza el progreso de la barra y carga los datos."""
-        current_value = self.progress_bar.value()
-
-        if current_value < 50:
-            # Progresar de 0 a 50 de forma animada
-            self.progress_bar.setValue(current_value + 1)
-        else:
-            # Detener la animación cuando llegue a 50
-            self.timer.stop()
-
-            # Paso 2: Cargar los datos de la base de datos
-            self.load_data_from_database()
-
-            # Paso 3: Completar el progreso (50 a 100)
-            self.timer = QTimer()
-            self.timer.timeout.connect(self.complete_progress)
-            self.timer.start(50)
-
-    def load_data_from_database(self):
-        """Carga los datos de la base de datos y los coloca en la tabla."""
-        conn = sqlite3.connect("pos_database.db")
-        cursor = conn.cursor()
-
-        # Obtener el conteo total
-        cursor.execute("SELECT COUNT(*) FROM ventas")
-        self.total_items = cursor.fetchone()[0]
-
-        # Obtener los datos paginados
-        offset = (self.page - 1) * self.items_per_page
-        query = f"""
-            SELECT v.id, c.nombre, v.fecha, v.total
-            FROM ventas v
-            JOIN clientes c ON v.cliente_id = c.id
-            ORDER BY {self.current_sort} {self.sort_order}
-            LIMIT ? OFFSET ?
-        """
-        cursor.execute(query, (self.items_per_page, offset))
-        sales_data = cursor.fetchall()
-        conn.close()
+        """Carga el historial de ventas en segundo plano."""
+        self.show_page(self.page)
 
-        # Poner los datos en la tabla
-        self.populate_table(sales_data)
-
-        # Actualizar la paginación
+    def show_page(self, page):
+        """Pide una página al paginador en el pool y la muestra al terminar."""
+        self._request += 1
+        sort, descending = SORT_OPTIONS[self.sort_combo.currentIndex()]
+        self.progress_bar.setValue(0)
+        worker = Worker(self._load_page, self._request, sort, descending, page)
+        worker.signals.progress.connect(self.progress_bar.setValue)
+        worker.signals.result.connect(self._page_loaded)
+        worker.signals.error.connect(self._load_failed)
+        self.thread_pool.start(worker)
+
+    def _load_page(self, request, sort, descending, page, progress):
+        # Corre en el pool: progreso 0-70 para la página pedida
+        if (self.pager.sort, self.pager.descending) != (sort, descending):
+            self.pager.set_sort(sort, descending)
+        with self.pager.borrowed():
+            # El contador lo mantienen los triggers: releerlo no recorre ventas
+            self.pager.refresh()
+            progress(20)
+            page, rows = self.pager.fetch_page(page)
+        progress(70)
+        return request, page, rows
+
+    def _page_loaded(self, result):
+        request, page, rows = result
+        if request != self._request:
+            return  # Llegó tarde: ya se pidió otra página u otro orden
+        self.page = page
+        self.sales_model.set_rows(rows)
         self.update_pagination()
-
-    def complete_progress(self):
-        """Completa la animación del progreso (50 a 100)."""
-        current_value = self.progress_bar.value()
-
-        if current_value < 100:
-            # Incrementar de 50 a 100
-            self.progress_bar.setValue(current_value + 1)
+        # Las páginas vecinas se leen después, en el mismo pool
+        worker = Worker(self._prefetch_neighbours, request, page)
+        worker.signals.progress.connect(self.progress_bar.setValue)
+        self.thread_pool.start(worker)
+
+    def _prefetch_neighbours(self, request, page, progress):
+        # Progreso 70-100 según las páginas vecinas que quedan en caché
+        neighbours = (page + 1, page - 1)
+        with self.pager.borrowed():
+            for done, neighbour in enumerate(neighbours, 1):
+                if request != self._request:
+                    return
+                self.pager.prefetch(neighbour)
+                progress(70 + 30 * done // len(neighbours))
+
+    def on_event(self, kind, payload):
+        # El paginador solo se usa desde su pool: el conteo se ajusta allí
+        worker = Worker(self._apply_sale, payload["revision"])
+        worker.signals.result.connect(self._sale_applied)
+        self.thread_pool.start(worker)
+
+    def _apply_sale(self, revision, progress):
+        return self.pager.apply_sale(revision)
+
+    def _sale_applied(self, applied):
+        if not self.page_spin.isEnabled():
+            return  # Se está mostrando un filtro, no la paginación
+        self.update_pagination()
+        # La página visible puede incluir la venta nueva: se vuelve a leer
+        if self.isVisible():
+            self.show_page(self.page)
         else:
-            # Detener la animación cuando llegue a 100
-            self.timer.stop()
-
-    def populate_table(self, sales):
-        self.sales_table.setRowCount(len(sales))
-        
-        # Estilo de la tabla
-        self.sales_table.setAlternatingRowColors(True)
-
-        for row, sale in enumerate(sales):
-            for col, value in enumerate(sale):
-                item = QTableWidgetItem(str(value))
-                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                self.sales_table.setItem(row, col, item)
+            self._stale = True
 
-            view_button = ModernButton("Ver", "#3498db", "icons/view.png")
-            view_button.clicked.connect(lambda _, s=sale[0]: self.show_sale_details(s))
-            self.sales_table.setCellWidget(row, 4, view_button)
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._stale and self.page_spin.isEnabled():
+            self._stale = False
+            self.show_page(self.page)
 
-            # Aplicar estilo al botón
-            view_button.setStyleSheet("""
-                QPushButton {
-                    background-color: #3498db;
-                    color: white;
-                    border-radius: 4px;
-                }
-                QPushButton:hover {
-                    background-color: #2980b9;
-                }
-            """)
+    def _load_failed(self, message):
+        self.progress_bar.setValue(0)
+        QMessageBox.warning(self, "Error", f"No se pudo cargar el historial: {message}")
 
     def filter_sales(self):
-        search_text = self.search_input.text().lower()
-        date_filter = self.date_filter.date().toString("yyyy-MM-dd")
-
-        conn = sqlite3.connect("pos_database.db")
-        cursor = conn.cursor()
-
-        query = """
-            SELECT v.id, c.nombre, v.fecha, v.total
-            FROM ventas v
-            JOIN clientes c ON v.cliente_id = c.id
-            WHERE (LOWER(v.id) LIKE ? OR LOWER(c.nombre) LIKE ?)
-            AND v.fecha LIKE ?
-        """
-        cursor.execute(
-            query, (f"%{search_text}%", f"%{search_text}%", f"%{date_filter}%")
-        )
-        filtered_sales = cursor.fetchall()
-
-        conn.close()
-
-        self.populate_table(filtered_sales)
+        """Muestra las ventas que coinciden con la búsqueda y el día elegidos."""
+        search_text = self.search_input.text().strip()
+        day = None
+        if self.date_filter.date() != ANY_DATE:
+            day = self.date_filter.date().toPyDate()
+        if not search_text and day is None:
+            self.show_page(1)
+            return
+
+        # La tabla perezosa lee el resultado por lotes según se desplaza
+        self._request += 1
+        self.sales_model.set_query(*filter_query(search_text, day))
+        self.page_label.setText("Resultados del filtro")
+        self.prev_button.setEnabled(False)
+        self.next_button.setEnabled(False)
+        self.page_spin.setEnabled(False)
 
     def change_sort(self, index):
-        sort_options = ["fecha", "total", "c.nombre"]
-        self.current_sort = sort_options[index]
-        self.sort_order = "DESC" if self.sort_order == "ASC" else "ASC"
-        self.page = 1
-        self.load_sales_history()
+        # Sin filtro vuelve a la página 1 con el orden nuevo
+        self.filter_sales()
 
     def update_pagination(self):
-        total_pages = (self.total_items - 1) // self.items_per_page + 1
+        total_pages = self.pager.total_pages
         self.page_label.setText(f"Página {self.page} de {total_pages}")
         self.prev_button.setEnabled(self.page > 1)
         self.next_button.setEnabled(self.page < total_pages)
+        self.page_spin.setEnabled(True)
+        self.page_spin.blockSignals(True)
+        self.page_spin.setMaximum(total_pages)
+        self.page_spin.setValue(self.page)
+        self.page_spin.blockSignals(False)
 
     def prev_page(self):
         if self.page > 1:
-            self.page -= 1
-            self.load_sales_history()
+            self.show_page(self.page - 1)
 
     def next_page(self):
-        total_pages = (self.total_items - 1) // self.items_per_page + 1
-        if self.page < total_pages:
-            self.page += 1
-            self.load_sales_history()
+        if self.page < self.pager.total_pages:
+            self.show_page(self.page + 1)
+
+    def go_to_page(self):
+        if self.page_spin.value() != self.page:
+            self.show_page(self.page_spin.value())
 
     def show_sale_details(self, sale_id):
         details_dialog = SaleDetailsDialog(sale_id, self)
@@ -703,64 +746,83 @@ class SalesHistoryWidget(QWidget):
 
     def export_data(self, format):
         file_formats = {
-            "csv": ("CSV Files (*.csv)", "w", ""),
-            "json": ("JSON Files (*.json)", "w", ""),
-            "xml": ("XML Files (*.xml)", "wb", ""),
+            "csv": "CSV Files (*.csv);;CSV comprimido (*.csv.gz)",
+            "json": "JSON Files (*.json);;JSON comprimido (*.json.gz)",
+            "xml": "XML Files (*.xml);;XML comprimido (*.xml.gz)",
         }
 
         file_name, _ = QFileDialog.getSaveFileName(
-            self, f"Guardar archivo {format.upper()}", "", file_formats[format][0]
+            self, f"Guardar archivo {format.upper()}", "", file_formats[format]
+        )
+        if not file_name:
+            return
+
+        # La exportación se lee por lotes en un hilo del pool: la memoria no
+        # crece con el historial y la ventana sigue respondiendo
+        sql, params = filter_query()
+        total, _ = get_counter("ventas")
+        self._start_export(
+            f"Exportando {format.upper()}...", file_name, "ventas",
+            export_query, file_name, format, sql, params, EXPORT_FIELDS,
+            headers=EXPORT_HEADERS, root="ventas", item="venta", total=total,
         )
-        if file_name:
-            conn = sqlite3.connect("pos_database.db")
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT v.id, c.nombre, v.fecha, v.total
-                FROM ventas v
-                JOIN clientes c ON v.cliente_id = c.id
-                ORDER BY v.fecha DESC
-            """
-            )
-            sales = cursor.fetchall()
-            conn.close()
 
-            if format == "csv":
-                self.export_to_csv(file_name, sales)
-            elif format == "json":
-                self.export_to_json(file_name, sales)
-            elif format == "xml":
-                self.export_to_xml(file_name, sales)
+    def export_line_items_data(self):
+        file_name, selected_filter = QFileDialog.getSaveFileName(
+            self, "Guardar detalle de ventas", "",
+            "CSV Files (*.csv);;CSV comprimido (*.csv.gz);;"
+            "JSON Files (*.json);;JSON comprimido (*.json.gz);;"
+            "XML Files (*.xml);;XML comprimido (*.xml.gz)",
+        )
+        if not file_name:
+            return
+
+        format = selected_filter.split()[0].lower()
+        compress = file_name.endswith(".gz")
+        partitioned = QMessageBox.question(
+            self, "Detalle por mes",
+            "¿Guardar un archivo por mes en una carpeta en lugar de un solo archivo?",
+        ) == QMessageBox.StandardButton.Yes
+        if partitioned:
+            # La carpeta se llama como el archivo elegido, sin extensiones
+            path = os.path.splitext(file_name[:-3] if compress else file_name)[0]
+        else:
+            path = file_name
+
+        # Cada mes se lee en paralelo en otro proceso; aquí solo se espera
+        self._start_export(
+            f"Exportando detalle {format.upper()}...", path, "líneas de venta",
+            export_line_items, path, format, partitioned=partitioned, compress=compress,
+        )
 
+    def _start_export(self, label, path, what, fn, *args, **kwargs):
+        self.export_file = path
+        self.export_what = what
+        self.export_cancel = threading.Event()
+        self.export_dialog = QProgressDialog(label, "Cancelar", 0, 100, self)
+        self.export_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        self.export_dialog.setMinimumDuration(0)
+        self.export_dialog.setAutoClose(False)
+        self.export_dialog.canceled.connect(self.export_cancel.set)
+
+        worker = Worker(fn, *args, cancelled=self.export_cancel.is_set, **kwargs)
+        worker.signals.progress.connect(self.export_dialog.setValue)
+        worker.signals.result.connect(self._export_finished)
+        worker.signals.error.connect(self._export_failed)
+        QThreadPool.globalInstance().start(worker)
+
+    def _export_finished(self, written):
+        self.export_dialog.close()
+        if written is None:
+            QMessageBox.information(self, "Exportación cancelada", "No se guardó ningún archivo.")
+        else:
             QMessageBox.information(
-                self, "Éxito", f"Los datos han sido exportados a {file_name}"
+                self, "Éxito", f"Se exportaron {written} {self.export_what} a {self.export_file}"
             )
 
-    def export_to_csv(self, file_name, sales):
-        with open(file_name, "w", newline="", encoding="utf-8") as csvfile:
-            csv_writer = csv.writer(csvfile)
-            csv_writer.writerow(["ID Venta", "Cliente", "Fecha", "Total"])
-            csv_writer.writerows(sales)
-
-    def export_to_json(self, file_name, sales):
-        data = [
-            {"id": sale[0], "cliente": sale[1], "fecha": sale[2], "total": sale[3]}
-            for sale in sales
-        ]
-        with open(file_name, "w", encoding="utf-8") as jsonfile:
-            json.dump(data, jsonfile, ensure_ascii=False, indent=2)
-
-    def export_to_xml(self, file_name, sales):
-        root = ET.Element("ventas")
-        for sale in sales:
-            venta = ET.SubElement(root, "venta")
-            ET.SubElement(venta, "id").text = str(sale[0])
-            ET.SubElement(venta, "cliente").text = sale[1]
-            ET.SubElement(venta, "fecha").text = sale[2]
-            ET.SubElement(venta, "total").text = str(sale[3])
-
-        tree = ET.ElementTree(root)
-        tree.write(file_name, encoding="utf-8", xml_declaration=True)
+    def _export_failed(self, message):
+        self.export_dialog.close()
+        QMessageBox.critical(self, "Error", f"No se pudo exportar: {message}")
 
 
 class SaleDetailsDialog(QDialog):
@@ -806,7 +868,7 @@ class SaleDetailsDialog(QDialog):
         self.load_sale_details()
 
     def load_sale_details(self):
-        conn = sqlite3.connect("pos_database.db")
+        conn = get_connection()
         cursor = conn.cursor()
 
         # Obtener información general de la venta
@@ -846,34 +908,34 @@ class SaleDetailsDialog(QDialog):
                 item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
                 self.products_table.setItem(row, col, item)
 
-        conn.close()
 
 
 class DashboardWidget(QWidget):
     def __init__(self):
         super().__init__()
+        # Agregados en memoria: las ventas nuevas llegan como eventos
+        self.totals = rollups.LiveTotals().load()
         self.init_ui()
+        self.events = EventRelay((events.SALE,), self)
+        self.events.event.connect(self.on_event)
 
     def init_ui(self):
         layout = QVBoxLayout(self)
 
         # Resumen de ventas
         summary_layout = QHBoxLayout()
-        summary_layout.addWidget(
-            self.create_summary_card(
-                "Ventas Totales", self.get_total_sales(), "#3498db"
-            )
+        self.total_sales_card = self.create_summary_card(
+            "Ventas Totales", self.get_total_sales(), "#3498db"
         )
-        summary_layout.addWidget(
-            self.create_summary_card(
-                "Ventas del Mes", self.get_monthly_sales(), "#2ecc71"
-            )
+        self.monthly_sales_card = self.create_summary_card(
+            "Ventas del Mes", self.get_monthly_sales(), "#2ecc71"
         )
-        summary_layout.addWidget(
-            self.create_summary_card(
-                "Clientes Totales", self.get_total_customers(), "#e74c3c"
-            )
+        self.customers_card = self.create_summary_card(
+            "Clientes Totales", self.get_total_customers(), "#e74c3c"
         )
+        summary_layout.addWidget(self.total_sales_card)
+        summary_layout.addWidget(self.monthly_sales_card)
+        summary_layout.addWidget(self.customers_card)
         layout.addLayout(summary_layout)
 
         # Gráficos
@@ -882,6 +944,19 @@ class DashboardWidget(QWidget):
         charts_layout.addWidget(self.create_products_chart())
         layout.addLayout(charts_layout)
 
+    def on_event(self, kind, payload):
+        applied = self.totals.apply_sale(payload)
+        if applied is None:
+            # Faltan ventas escritas por otro proceso: se recargan los resúmenes
+            self.totals.load()
+        elif not applied:
+            return
+        self.total_sales_card.value_label.setText(self.get_total_sales())
+        self.monthly_sales_card.value_label.setText(self.get_monthly_sales())
+        self.customers_card.value_label.setText(self.get_total_customers())
+        self.update_sales_chart()
+        self.update_products_chart()
+
     def create_summary_card(self, title, value, color):
         card = QWidget()
         card.setStyleSheet(
@@ -898,109 +973,57 @@ class DashboardWidget(QWidget):
         value_label.setStyleSheet("color: white; font-size: 24px; font-weight: bold;")
         card_layout.addWidget(title_label)
         card_layout.addWidget(value_label)
+        card.value_label = value_label
         return card
 
     def get_total_sales(self):
-        conn = sqlite3.connect("pos_database.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT SUM(total) FROM ventas")
-        total = cursor.fetchone()[0]
-        conn.close()
+        total = self.totals.total
         return f"${total:.2f}" if total else "$0.00"
 
     def get_monthly_sales(self):
-        conn = sqlite3.connect("pos_database.db")
-        cursor = conn.cursor()
         current_month = datetime.now().strftime("%Y-%m")
-        cursor.execute(
-            "SELECT SUM(total) FROM ventas WHERE fecha LIKE ?", (f"{current_month}%",)
-        )
-        total = cursor.fetchone()[0]
-        conn.close()
+        total = self.totals.month_total(current_month)
         return f"${total:.2f}" if total else "$0.00"
 
     def get_total_customers(self):
-        conn = sqlite3.connect("pos_database.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(DISTINCT cliente_id) FROM ventas")
-        count = cursor.fetchone()[0]
-        conn.close()
-        return str(count)
+        return str(self.totals.customers)
 
     def create_sales_chart(self):
-        conn = sqlite3.connect("pos_database.db")
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT strftime('%Y-%m', v.fecha) as month, SUM(d.cantidad * d.precio_unitario) as total
-            FROM detalles_venta d
-            JOIN ventas v ON d.venta_id = v.id
-            GROUP BY month
-            ORDER BY month
-            LIMIT 6
-        """
-        )
-        data = cursor.fetchall()
-        conn.close()
-
-        # Crear el gráfico
-        chart = QChart()
-        series = QBarSeries()
-
-        bar_set = QBarSet("Ventas Mensuales")
-        for _, value in data:
-            bar_set.append(value)
-        series.append(bar_set)
-
-        chart.addSeries(series)
-        chart.setTitle("Ventas por Mes")
+        self.sales_chart = BarChartView("Ventas por Mes", "Ventas Mensuales")
+        self.update_sales_chart()
+        return self.sales_chart
 
-        # Configurar el eje X
-        axis_x = QBarCategoryAxis()
-        axis_x.append([month for month, _ in data])
-        chart.addAxis(axis_x, Qt.AlignmentFlag.AlignBottom)
-        series.attachAxis(axis_x)
-
-        # Configurar el eje Y
-        axis_y = QValueAxis()
-        chart.addAxis(axis_y, Qt.AlignmentFlag.AlignLeft)
-        series.attachAxis(axis_y)
-
-        # Configurar la vista del gráfico
-        chart_view = QChartView(chart)
-        chart_view.setRenderHint(QPainter.RenderHint.Antialiasing)
-        return chart_view
+    def update_sales_chart(self):
+        # Importe de las líneas de los últimos seis meses
+        self.sales_chart.set_data(self.totals.monthly(6, amounts="lineas"))
 
     def create_products_chart(self):
-        conn = sqlite3.connect("pos_database.db")
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT p.nombre, SUM(d.cantidad) as total_vendido
-            FROM detalles_venta d
-            JOIN productos p ON d.producto_id = p.id
-            GROUP BY d.producto_id
-            ORDER BY total_vendido DESC
-            LIMIT 5
-        """
-        )
-        data = cursor.fetchall()
-        conn.close()
-
         chart = QChart()
-        series = QPieSeries()
-
-        for name, value in data:
-            slice = series.append(name, value)
-            slice.setLabelVisible()
+        self.products_series = QPieSeries()
+        self.update_products_chart()
 
-        chart.addSeries(series)
+        chart.addSeries(self.products_series)
         chart.setTitle("Productos más Vendidos")
 
         chart_view = QChartView(chart)
         chart_view.setRenderHint(QPainter.RenderHint.Antialiasing)
         return chart_view
 
+    def update_products_chart(self):
+        data = [
+            (name, quantity)
+            for name, quantity, _ in self.totals.top_products(5, by="cantidad")
+        ]
+        slices = self.products_series.slices()
+        if [slice.label() for slice in slices] == [name for name, _ in data]:
+            for slice, (_, value) in zip(slices, data):
+                slice.setValue(value)
+            return
+        self.products_series.clear()
+        for name, value in data:
+            slice = self.products_series.append(name, value)
+            slice.setLabelVisible()
+
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
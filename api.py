@@ -0,0 +1,447 @@
+"""API REST para lectores de mano, pantallas de cocina y cajas satélite.
+
+ApiServer atiende cada conexión en su propio hilo (ThreadingHTTPServer) y
+cada petición toma prestada una conexión del pool de solo lectura, así que
+varios clientes consultan a la vez sin esperar unos a otros ni a la caja,
+que escribe por su propia conexión (WAL).
+
+Rutas:
+
+- GET /productos?cursor=&limit=  productos por id.
+- GET /ventas?from=&to=&cursor=&limit=  ventas por fecha e id; from y to son
+  fechas YYYY-MM-DD, ambas incluidas.
+
+Las respuestas son {"<tabla>": [...], "siguiente": cursor o null}; para la
+página siguiente se repite la petición con cursor=<siguiente>. Con
+formato=ndjson (o Accept: application/x-ndjson) se envían en cambio todas
+las filas desde el cursor, una por línea, con transferencia por bloques:
+se leen del cursor de SQLite de STREAM_BATCH en STREAM_BATCH, así que el
+tiempo hasta el primer byte y la memoria no dependen del tamaño de la
+tabla. El ETag sale de la revisión de la tabla en contadores, así que un
+cliente que sondea con If-None-Match recibe 304 tras leer una sola fila.
+Los cuerpos grandes se comprimen con gzip si el cliente lo acepta.
+
+POST /ventas registra una venta o varias ({"ventas": [...]} o una lista):
+
+    {"clave": "caja2-000123", "cliente_id": 5, "user_id": 2,
+     "lineas": [{"producto_id": 7, "cantidad": 2, "precio_unitario": 15.5}]}
+
+clave es obligatoria y única por venta: reintentar con la misma clave
+devuelve la venta ya registrada. Las líneas se validan contra el catálogo en
+caché (precio_unitario por omisión es el del catálogo), cliente_id y user_id
+contra la base, y si alguna venta no es válida no se registra ninguna (400). Las válidas pasan por el escritor
+único (writer.py), que las confirma en grupo. La respuesta lista cada venta
+con estado "creada" o "duplicada" e id, "error" con el motivo, o "pendiente"
+si no se confirmó en WRITE_TIMEOUT segundos (se puede reintentar con la
+misma clave).
+
+GET /metricas devuelve las estadísticas del escritor (cola, trabajos por
+commit, latencias) y del pool de lectura.
+"""
+import base64
+import gzip
+import json
+import math
+import zlib
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from catalog import get_catalog
+import sales
+import writer
+from database import get_read_pool, read_connection
+from schema import get_counter
+
+HOST = "localhost"  # "0.0.0.0" para atender a otros equipos de la red
+PORT = 8000
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# Filas leídas y enviadas por bloque en las respuestas NDJSON
+STREAM_BATCH = 500
+NDJSON = "application/x-ndjson"
+
+# Por debajo de este tamaño gzip no compensa el tiempo de comprimir
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+
+# Límites de POST /ventas
+MAX_BODY_BYTES = 1024 * 1024
+MAX_KEY_LENGTH = 128
+WRITE_TIMEOUT = 30
+
+# Un solo codificador: json.dumps con opciones crea uno nuevo en cada llamada
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise ApiError(400, "Cursor no válido")
+
+
+def _param(params, name, default=None):
+    values = params.get(name)
+    return values[-1] if values else default
+
+
+def _limit(params):
+    try:
+        limit = int(_param(params, "limit", DEFAULT_LIMIT))
+    except ValueError:
+        raise ApiError(400, "limit debe ser un número")
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def _date(params, name):
+    value = _param(params, name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ApiError(400, f"{name} debe ser una fecha YYYY-MM-DD")
+
+
+def _cursor_key(params, valid):
+    cursor = _param(params, "cursor")
+    if not cursor:
+        return None
+    key = decode_cursor(cursor)
+    if not valid(key):
+        raise ApiError(400, "Cursor no válido")
+    return key
+
+
+def products_query(params):
+    after = _cursor_key(params, lambda key: isinstance(key, int)) or 0
+    return "SELECT id, nombre, precio, stock, proveedor_id, imagen FROM productos WHERE id > ? ORDER BY id", [after]
+
+
+def product_row(row):
+    pid, name, price, stock, supplier, image = row
+    return {"id": pid, "nombre": name, "precio": price, "stock": stock, "proveedor_id": supplier, "imagen": image}
+
+
+def sales_query(params):
+    start, end = _date(params, "from"), _date(params, "to")
+    # Misma clave que idx_ventas_fecha_id: el rango y el cursor son un solo
+    # SEARCH en el índice, sin ordenar
+    conditions, values = [], []
+    if start:
+        conditions.append("IFNULL(fecha, '') >= ?")
+        values.append(start.isoformat())
+    if end:
+        conditions.append("IFNULL(fecha, '') < ?")
+        values.append((end + timedelta(days=1)).isoformat())
+    key = _cursor_key(
+        params,
+        lambda key: isinstance(key, list) and len(key) == 2 and isinstance(key[0], str) and isinstance(key[1], int),
+    )
+    if key:
+        # La primera condición acota el SEARCH; la segunda descarta los empates
+        conditions += ["IFNULL(fecha, '') >= ?", "(IFNULL(fecha, ''), id) > (?, ?)"]
+        values += [key[0]] + key
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    sql = f"""SELECT id, user_id, cliente_id, fecha, total FROM ventas INDEXED BY idx_ventas_fecha_id
+              {where} ORDER BY IFNULL(fecha, ''), id"""
+    return sql, values
+
+
+def product_key(row):
+    return row[0]
+
+
+def sale_row(row):
+    sid, user_id, customer_id, when, total = row
+    return {"id": sid, "user_id": user_id, "cliente_id": customer_id, "fecha": when, "total": total}
+
+
+def sale_key(row):
+    return [row[3] or "", row[0]]
+
+
+class Route:
+    """Lista paginable de una tabla: consulta ordenada, forma de cada fila y cursor."""
+
+    def __init__(self, table, query, to_dict, key):
+        self.table = table
+        self.query = query
+        self.to_dict = to_dict
+        self.key = key
+
+    def page(self, conn, params):
+        limit = _limit(params)
+        sql, values = self.query(params)
+        rows = conn.execute(f"{sql} LIMIT ?", values + [limit + 1]).fetchall()
+        following = encode_cursor(self.key(rows[limit - 1])) if len(rows) > limit else None
+        return {self.table: [self.to_dict(row) for row in rows[:limit]], "siguiente": following}
+
+    def stream(self, conn, params):
+        """Bloques de líneas NDJSON de STREAM_BATCH filas cada uno.
+
+        La consulta se valida y ejecuta aquí, antes de enviar el estado; las
+        filas se leen a medida que se consumen los bloques.
+        """
+        sql, values = self.query(params)
+        return self._lines(conn.execute(sql, values))
+
+    def _lines(self, cursor):
+        while True:
+            rows = cursor.fetchmany(STREAM_BATCH)
+            if not rows:
+                return
+            yield "".join(
+                _encode(self.to_dict(row)) + "\n" for row in rows
+            ).encode()
+
+
+# Ruta -> lista que atiende; la revisión de su tabla identifica la respuesta
+ROUTES = {
+    "/productos": Route("productos", products_query, product_row, product_key),
+    "/ventas": Route("ventas", sales_query, sale_row, sale_key),
+}
+
+
+def _number(value, what):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ApiError(400, f"{what} debe ser un número")
+    return value
+
+
+def _optional_id(sale, name, index):
+    value = sale.get(name)
+    if value is not None and (isinstance(value, bool) or not isinstance(value, int)):
+        raise ApiError(400, f"venta {index}: {name} debe ser un entero")
+    return value
+
+
+def parse_sale(sale, index, catalog):
+    """Valida una venta del cuerpo de POST /ventas contra el catálogo en caché."""
+    if not isinstance(sale, dict):
+        raise ApiError(400, f"venta {index}: se esperaba un objeto")
+    key = sale.get("clave")
+    if not isinstance(key, str) or not key or len(key) > MAX_KEY_LENGTH:
+        raise ApiError(400, f"venta {index}: clave obligatoria (texto de hasta {MAX_KEY_LENGTH} caracteres)")
+    lines = sale.get("lineas")
+    if not isinstance(lines, list) or not lines:
+        raise ApiError(400, f"venta {index}: la venta no tiene líneas")
+    items = []
+    for line in lines:
+        if not isinstance(line, dict):
+            raise ApiError(400, f"venta {index}: cada línea debe ser un objeto")
+        product_id = line.get("producto_id")
+        product = catalog.get(product_id) if isinstance(product_id, int) else None
+        if product is None:
+            raise ApiError(400, f"venta {index}: el producto {product_id!r} no existe")
+        quantity = _number(line.get("cantidad"), f"venta {index}: cantidad")
+        price = line.get("precio_unitario")
+        price = product.precio if price is None else _number(price, f"venta {index}: precio_unitario")
+        if quantity <= 0:
+            raise ApiError(400, f"venta {index}: cantidad debe ser mayor que cero")
+        if price < 0:
+            raise ApiError(400, f"venta {index}: precio_unitario no puede ser negativo")
+        items.append((product_id, quantity, price))
+    total = sale.get("total")
+    if total is not None:
+        total = _number(total, f"venta {index}: total")
+    return {
+        "items": items,
+        "customer_id": _optional_id(sale, "cliente_id", index),
+        "user_id": _optional_id(sale, "user_id", index),
+        "total": total,
+        "key": key,
+    }
+
+
+def post_sales(body):
+    """Valida todas las ventas, las encola en el escritor y espera su resultado."""
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise ApiError(400, "El cuerpo no es JSON válido")
+    if isinstance(data, dict) and "ventas" in data:
+        data = data["ventas"]
+    bodies = data if isinstance(data, list) else [data]
+    if not bodies:
+        raise ApiError(400, "No hay ventas")
+
+    catalog = get_catalog()
+    with read_connection() as conn:
+        catalog.ensure_loaded(conn)
+        parsed = [parse_sale(sale, index, catalog) for index, sale in enumerate(bodies)]
+        for index, sale in enumerate(parsed):
+            reason = sales.unknown_reference(conn, sale["customer_id"], sale["user_id"])
+            if reason:
+                raise ApiError(400, f"venta {index}: {reason}")
+
+    # El escritor vuelve a comprobarlos por si se borraron entre medias
+    futures = [sales.submit_sale(**sale, strict=True) for sale in parsed]
+    results = []
+    for sale, future in zip(parsed, futures):
+        result = {"clave": sale["key"]}
+        try:
+            sale_id, recorded = future.result(timeout=WRITE_TIMEOUT)
+        except FutureTimeoutError:
+            result["estado"] = "pendiente"
+        except Exception as error:
+            result.update(estado="error", error=str(error))
+        else:
+            result.update(estado="duplicada" if recorded is None else "creada", id=sale_id)
+        results.append(result)
+    return {"ventas": results}
+
+
+def metrics():
+    return {"escritor": writer.get_writer().stats(), "lecturas": get_read_pool().stats()}
+
+
+# Ruta -> función que atiende el cuerpo de un POST
+POST_ROUTES = {
+    "/ventas": post_sales,
+}
+
+
+def _etag(table, revision, query):
+    # Débil: la misma respuesta puede ir comprimida o no
+    return f'W/"{table}-{revision}-{zlib.crc32(query.encode()):08x}"'
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    # Conexiones persistentes: los clientes que sondean no abren una por petición
+    protocol_version = "HTTP/1.1"
+    # Cabeceras y cuerpo van en escrituras separadas; con Nagle el cuerpo
+    # esperaría al ACK retrasado del cliente (~40 ms por respuesta)
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip("/") == "/metricas":
+            self._send_json(200, metrics())
+            return
+        route = ROUTES.get(url.path.rstrip("/") or "/")
+        if route is None:
+            self._send_json(404, {"error": "Ruta no encontrada"})
+            return
+        params = parse_qs(url.query)
+        streaming = _param(params, "formato") == "ndjson" or NDJSON in self.headers.get("Accept", "")
+        try:
+            with read_connection() as conn:
+                # Revisión y filas en la misma instantánea de lectura
+                conn.execute("BEGIN")
+                _, revision = get_counter(route.table, conn)
+                etag = _etag(route.table, revision, url.query + (" ndjson" if streaming else ""))
+                if etag in self._if_none_match():
+                    self._send(304, b"", etag=etag)
+                elif streaming:
+                    self._send_chunked(route.stream(conn, params), etag)
+                else:
+                    self._send_json(200, route.page(conn, params), etag=etag)
+        except ApiError as error:
+            self._send_json(error.status, {"error": str(error)})
+
+    def do_POST(self):
+        handler = POST_ROUTES.get(urlsplit(self.path).path.rstrip("/"))
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            length = -1
+        if handler is None:
+            self.close_connection = True  # El cuerpo no se leyó
+            self._send_json(404, {"error": "Ruta no encontrada"})
+            return
+        if not 0 <= length <= MAX_BODY_BYTES:
+            self.close_connection = True
+            self._send_json(413 if length > 0 else 411, {"error": "Falta Content-Length o el cuerpo es muy grande"})
+            return
+        body = self.rfile.read(length)
+        try:
+            self._send_json(200, handler(body))
+        except ApiError as error:
+            self._send_json(error.status, {"error": str(error)})
+
+    def _if_none_match(self):
+        header = self.headers.get("If-None-Match", "")
+        return {tag.strip() for tag in header.split(",")}
+
+    def _send_json(self, status, payload, etag=None):
+        body = _encode(payload).encode()
+        self._send(status, body, etag=etag, content_type="application/json; charset=utf-8")
+
+    def _send(self, status, body, etag=None, content_type=None):
+        gzipped = len(body) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", "")
+        if gzipped:
+            body = gzip.compress(body, GZIP_LEVEL)
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _send_chunked(self, chunks, etag):
+        compressor = None
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: formato gzip
+        self.send_response(200)
+        self.send_header("Content-Type", f"{NDJSON}; charset=utf-8")
+        if compressor:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for chunk in chunks:
+                if compressor:
+                    # SYNC_FLUSH: cada bloque se puede descomprimir en cuanto llega
+                    chunk = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+                self._write_chunk(chunk)
+            if compressor:
+                self._write_chunk(compressor.flush())
+            self.wfile.write(b"0\r\n\r\n")
+        except ConnectionError:
+            self.close_connection = True  # El cliente se fue a media respuesta
+        except Exception:
+            # Con el estado ya enviado solo queda cortar la respuesta: el
+            # cliente la ve incompleta porque falta el bloque final
+            self.close_connection = True
+            raise
+
+    def _write_chunk(self, data):
+        if data:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+    def log_message(self, format, *args):
+        # Los lectores sondean cada pocos segundos; no llenar la consola
+        pass
+
+
+class ApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=(HOST, PORT)):
+        super().__init__(address, ApiRequestHandler)
@@ -1,6 +1,8 @@
-import sqlite3
 from PyQt6.QtCore import QObject, pyqtSignal
 
+import writer
+from database import get_connection
+
 class AuthManager(QObject):
     login_success = pyqtSignal(int)
     login_failed = pyqtSignal(str)
@@ -9,14 +11,13 @@ class AuthManager(QObject):
         super().__init__()
 
     def attempt_login(self, username, password):
-        conn = sqlite3.connect("pos_database.db")
+        conn = get_connection()
         c = conn.cursor()
         c.execute(
             "SELECT id FROM usuarios WHERE username=? AND password=?",
             (username, password),
         )
         user = c.fetchone()
-        conn.close()
 
         if user:
             user_id = user[0]
@@ -26,20 +27,11 @@ class AuthManager(QObject):
             self.login_failed.emit("Incorrect username or password")
 
     def log_session(self, user_id, is_login):
-        conn = sqlite3.connect("pos_database.db")
-        c = conn.cursor()
-        if is_login:
-            c.execute(
-                "UPDATE usuarios SET login_time = datetime('now') WHERE id = ?",
-                (user_id,),
-            )
-        else:
-            c.execute(
-                "UPDATE usuarios SET logout_time = datetime('now') WHERE id = ?",
-                (user_id,),
-            )
-        conn.commit()
-        conn.close()
+        column = "login_time" if is_login else "logout_time"
+        writer.execute(
+            f"UPDATE usuarios SET {column} = datetime('now') WHERE id = ?",
+            (user_id,),
+        )
 
     def logout(self, user_id):
         self.log_session(user_id, False)
\ No newline at end of file
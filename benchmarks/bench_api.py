@@ -0,0 +1,189 @@
+"""Prueba de carga local de la API REST (api.py): peticiones por segundo y p99.
+
+Crea una base temporal con el esquema de schema.migrate, arranca ApiServer en
+otro proceso (para que los clientes no compitan por el GIL con el servidor)
+y lanza --clientes hilos con conexiones persistentes durante --segundos en
+cada escenario:
+
+- página: GET /ventas?limit=100 desde una fecha al azar, con gzip.
+- sondeo: GET /productos?limit=100 con If-None-Match (respuestas 304).
+- ndjson: GET /ventas?formato=ndjson completo; se mide además el tiempo
+  hasta el primer bloque, que no debe crecer con --ventas.
+
+Al final se mide con tracemalloc la memoria de Python de una sola respuesta
+NDJSON completa, en este proceso. El RSS del servidor no sirve para eso:
+incluye las páginas de la base mapeadas con mmap por cada conexión.
+
+    python benchmarks/bench_api.py [--ventas 200000] [--clientes 8] [--segundos 5]
+"""
+import argparse
+import http.client
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import api  # noqa: E402
+import database  # noqa: E402
+import schema  # noqa: E402
+
+DAYS = 730
+
+
+def create_database(path, sales):
+    database.DB_PATH = path
+    schema.migrate()
+    conn = database.get_connection()
+    conn.executemany("INSERT INTO productos (nombre, precio, stock) VALUES (?, 10, 100)",
+                     ((f"Producto {i}",) for i in range(1000)))
+    conn.executemany(
+        "INSERT INTO ventas (user_id, cliente_id, fecha, total) "
+        "VALUES (?, ?, datetime('2023-01-01', ?, ?), ?)",
+        ((random.randint(1, 10), random.randint(1, 5000), f"+{random.randrange(DAYS)} days",
+          f"+{random.randrange(86400)} seconds", round(random.uniform(1, 500), 2)) for _ in range(sales)),
+    )
+    conn.commit()
+    database.get_pool().close_all()
+
+
+def serve(path):
+    """Modo servidor: imprime el puerto y atiende hasta que se cierra stdin."""
+    database.DB_PATH = path
+    server = api.ApiServer(("127.0.0.1", 0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(server.server_address[1], flush=True)
+    sys.stdin.read()
+    server.shutdown()
+
+
+def stream_memory(path):
+    """Pico de memoria de Python (MB) al servir /ventas?formato=ndjson entero."""
+    database.DB_PATH = path
+    server = api.ApiServer(("127.0.0.1", 0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    tracemalloc.start()
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+    conn.request("GET", "/ventas?formato=ndjson", headers={"Accept-Encoding": "gzip"})
+    response = conn.getresponse()
+    while response.read1(65536):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    conn.close()
+    server.shutdown()
+    server.server_close()
+    return peak / 1024 / 1024
+
+
+def page_request(rng, _state):
+    day = rng.randrange(DAYS)
+    start = time.strftime("%Y-%m-%d", time.gmtime(1672531200 + day * 86400))
+    return f"/ventas?from={start}&limit=100", {"Accept-Encoding": "gzip"}
+
+
+def poll_request(_rng, state):
+    headers = {"If-None-Match": state["etag"]} if "etag" in state else {}
+    return "/productos?limit=100", headers
+
+
+def stream_request(_rng, _state):
+    return "/ventas?formato=ndjson", {"Accept-Encoding": "gzip"}
+
+
+SCENARIOS = (("página", page_request), ("sondeo", poll_request), ("ndjson", stream_request))
+
+
+def client(port, make_request, deadline, results, seed):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    state = {}
+    latencies, first_bytes, statuses = [], [], {}
+    while time.perf_counter() < deadline:
+        path, headers = make_request(rng, state)
+        t0 = time.perf_counter()
+        conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        response.read1(65536)
+        first_bytes.append(time.perf_counter() - t0)
+        response.read()
+        latencies.append(time.perf_counter() - t0)
+        statuses[response.status] = statuses.get(response.status, 0) + 1
+        if response.getheader("ETag"):
+            state["etag"] = response.getheader("ETag")
+    conn.close()
+    results.append((latencies, first_bytes, statuses))
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_scenario(port, make_request, clients, seconds):
+    results = []
+    deadline = time.perf_counter() + seconds
+    threads = [
+        threading.Thread(target=client, args=(port, make_request, deadline, results, seed))
+        for seed in range(clients)
+    ]
+    t0 = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - t0
+    latencies = [ms for result in results for ms in result[0]]
+    first_bytes = [ms for result in results for ms in result[1]]
+    statuses = {}
+    for _, _, counts in results:
+        for status, count in counts.items():
+            statuses[status] = statuses.get(status, 0) + count
+    return len(latencies) / elapsed, latencies, first_bytes, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ventas", type=int, default=200_000)
+    parser.add_argument("--clientes", type=int, default=8)
+    parser.add_argument("--segundos", type=float, default=5)
+    parser.add_argument("--servir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.servir:
+        serve(args.servir)
+        return
+    random.seed(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        create_database(path, args.ventas)
+        server = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--servir", path],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        )
+        try:
+            port = int(server.stdout.readline())
+            print(f"{args.ventas:,} ventas, {args.clientes} clientes, {args.segundos:g} s por escenario\n")
+            for name, make_request in SCENARIOS:
+                rps, latencies, first_bytes, statuses = run_scenario(port, make_request, args.clientes, args.segundos)
+                codes = ", ".join(f"{status}×{count}" for status, count in sorted(statuses.items()))
+                print(
+                    f"  {name:<7} {rps:>8.1f} req/s  p50 {statistics.median(latencies) * 1000:>8.1f} ms"
+                    f"  p99 {percentile(latencies, 99) * 1000:>8.1f} ms"
+                    f"  primer byte p99 {percentile(first_bytes, 99) * 1000:>7.1f} ms  ({codes})"
+                )
+        finally:
+            server.stdin.close()
+            server.wait(timeout=30)
+        print(f"\nmemoria de Python para un NDJSON completo: {stream_memory(path):.2f} MB")
+        database.get_read_pool().close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Escaneos por segundo: caché del catálogo frente a consultas a SQLite.
+
+Compara tres formas de resolver un escaneo a (nombre, precio):
+conexión nueva por escaneo (como el add_to_cart original), conexión del pool
+con sentencia preparada, y catalog.ProductCatalog en memoria.
+
+    python benchmarks/bench_catalog.py [--productos 50000] [--escaneos 100000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import database  # noqa: E402
+from catalog import ProductCatalog  # noqa: E402
+
+
+def rate(label, scans, func):
+    t0 = time.perf_counter()
+    for product_id in scans:
+        func(product_id)
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<32} {len(scans) / elapsed:>14,.0f} escaneos/s  ({elapsed / len(scans) * 1e6:.2f} µs c/u)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--productos", type=int, default=50_000)
+    parser.add_argument("--escaneos", type=int, default=100_000)
+    args = parser.parse_args()
+    random.seed(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        conn = database.connect(path)
+        conn.execute(
+            """CREATE TABLE productos (id INTEGER PRIMARY KEY, nombre TEXT, precio REAL, stock INTEGER,
+               proveedor_id INTEGER, imagen TEXT)"""
+        )
+        conn.executemany(
+            "INSERT INTO productos (id, nombre, precio, stock) VALUES (?, ?, ?, ?)",
+            ((i, f"Producto {i}", round(random.uniform(1, 500), 2), 100) for i in range(1, args.productos + 1)),
+        )
+        conn.commit()
+
+        scans = [random.randint(1, args.productos) for _ in range(args.escaneos)]
+
+        catalog = ProductCatalog()
+        t0 = time.perf_counter()
+        catalog.warm(conn)
+        print(f"Precarga de {len(catalog)} productos: {(time.perf_counter() - t0) * 1000:.1f} ms\n")
+
+        def new_connection(product_id):
+            c = sqlite3.connect(path)
+            c.execute("SELECT nombre, precio FROM productos WHERE id = ?", (product_id,)).fetchone()
+            c.close()
+
+        def pooled(product_id):
+            conn.execute("SELECT nombre, precio FROM productos WHERE id = ?", (product_id,)).fetchone()
+
+        def cached(product_id):
+            product = catalog.get(product_id)
+            return product.nombre, product.precio
+
+        rate("conexión nueva por escaneo", scans[: max(1, len(scans) // 20)], new_connection)
+        rate("conexión del pool", scans, pooled)
+        rate("caché del catálogo", scans, cached)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
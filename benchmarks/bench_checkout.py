@@ -0,0 +1,143 @@
+"""Latencia de cobro según el tamaño del carrito.
+
+Compara sales.record_sale (una transacción BEGIN IMMEDIATE, executemany y un
+UPDATE de stock por conjunto) con el flujo anterior de complete_sale: conexión
+nueva, un INSERT y un UPDATE por línea, cliente por defecto y resumen leídos
+en conexiones aparte.
+
+    python benchmarks/bench_checkout.py [--sizes 1 10 50 100 500] [--ventas 50]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import database  # noqa: E402
+import sales  # noqa: E402
+import schema  # noqa: E402
+
+TABLES = (
+    """CREATE TABLE ventas (id INTEGER PRIMARY KEY, user_id INTEGER, cliente_id INTEGER,
+       fecha TEXT, total REAL)""",
+    """CREATE TABLE detalles_venta (id INTEGER PRIMARY KEY, venta_id INTEGER, producto_id INTEGER,
+       cantidad REAL, precio REAL, precio_unitario REAL)""",
+    """CREATE TABLE productos (id INTEGER PRIMARY KEY, nombre TEXT, precio REAL, stock INTEGER,
+       proveedor_id INTEGER, imagen TEXT)""",
+    "CREATE TABLE clientes (id INTEGER PRIMARY KEY, nombre TEXT, email TEXT, telefono TEXT)",
+    "CREATE TABLE proveedores (id INTEGER PRIMARY KEY, nombre TEXT, contacto TEXT)",
+)
+
+PRODUCTS = 5000
+
+
+def legacy_checkout(path, items):
+    """Reproduce el complete_sale original, una conexión por paso."""
+    conn = sqlite3.connect(path)
+    c = conn.cursor()
+    c.execute("SELECT id FROM clientes WHERE nombre = 'variado'")
+    row = c.fetchone()
+    if row:
+        customer_id = row[0]
+    else:
+        c.execute("INSERT INTO clientes (nombre) VALUES ('variado')")
+        customer_id = c.lastrowid
+        conn.commit()
+    conn.close()
+
+    conn = sqlite3.connect(path)
+    c = conn.cursor()
+    total = sum(q * p for _, q, p in items)
+    c.execute("INSERT INTO ventas (cliente_id, fecha, total) VALUES (?, datetime('now'), ?)", (customer_id, total))
+    sale_id = c.lastrowid
+    for product_id, quantity, price in items:
+        c.execute(
+            "INSERT INTO detalles_venta (venta_id, producto_id, cantidad, precio_unitario, precio) VALUES (?, ?, ?, ?, ?)",
+            (sale_id, product_id, quantity, price, quantity * price),
+        )
+        c.execute("UPDATE productos SET stock = stock - ? WHERE id = ?", (quantity, product_id))
+    conn.commit()
+    conn.close()
+
+    conn = sqlite3.connect(path)
+    c = conn.cursor()
+    c.execute(
+        """SELECT v.id, c.nombre, v.fecha, SUM(d.cantidad * d.precio_unitario)
+           FROM ventas v JOIN clientes c ON v.cliente_id = c.id
+           JOIN detalles_venta d ON v.id = d.venta_id WHERE v.id = ? GROUP BY v.id""",
+        (sale_id,),
+    )
+    c.fetchone()
+    c.execute(
+        """SELECT p.nombre, d.cantidad, d.precio_unitario, d.cantidad * d.precio_unitario
+           FROM detalles_venta d JOIN productos p ON d.producto_id = p.id WHERE d.venta_id = ?""",
+        (sale_id,),
+    )
+    c.fetchall()
+    conn.close()
+
+
+def setup(path):
+    conn = database.connect(path)
+    for ddl in TABLES:
+        conn.execute(ddl)
+    conn.executemany(
+        "INSERT INTO productos (id, nombre, precio, stock) VALUES (?, ?, ?, ?)",
+        ((i, f"Producto {i}", round(random.uniform(1, 500), 2), 10**9) for i in range(1, PRODUCTS + 1)),
+    )
+    conn.commit()
+    schema.migrate(conn)
+    conn.close()
+
+
+def basket(size):
+    return [
+        (random.randint(1, PRODUCTS), random.randint(1, 3), round(random.uniform(1, 500), 2))
+        for _ in range(size)
+    ]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50, 100, 500])
+    parser.add_argument("--ventas", type=int, default=50, help="ventas medidas por tamaño")
+    args = parser.parse_args()
+    random.seed(7)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        setup(path)
+        pool = database.ConnectionPool(path)
+        conn = pool.connection()
+
+        print(f"{'líneas':>7} | {'record_sale p50':>15} {'p99':>9} | {'anterior p50':>12} {'p99':>9}")
+        for size in args.sizes:
+            new, old = [], []
+            for _ in range(args.ventas):
+                items = basket(size)
+                t0 = time.perf_counter()
+                sales.record_sale(items, conn=conn)
+                new.append((time.perf_counter() - t0) * 1000)
+
+                t0 = time.perf_counter()
+                legacy_checkout(path, items)
+                old.append((time.perf_counter() - t0) * 1000)
+            print(
+                f"{size:>7} | {statistics.median(new):>12.2f} ms {percentile(new, 99):>6.2f} ms"
+                f" | {statistics.median(old):>9.2f} ms {percentile(old, 99):>6.2f} ms"
+            )
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
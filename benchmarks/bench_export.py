@@ -0,0 +1,82 @@
+"""Exportación del historial: fetchall + volcado completo frente a exporters.export_query.
+
+Para cada formato mide el tiempo y el pico de memoria del proceso (RSS) de
+la exportación original (fetchall, lista de dicts para JSON, ElementTree
+para XML) y de la exportación por lotes. La versión por lotes se mide
+primero porque el pico de RSS nunca baja.
+
+    python benchmarks/bench_export.py [--ventas 1000000] [--formato json]
+"""
+import argparse
+import json
+import os
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import exporters  # noqa: E402
+
+FIELDS = ("id", "cliente", "fecha", "total")
+
+
+def peak_mib():
+    # ru_maxrss está en KiB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def export_original(conn, fmt, path):
+    sales = conn.execute("SELECT id, cliente, fecha, total FROM ventas ORDER BY id").fetchall()
+    if fmt == "json":
+        with open(path, "w", encoding="utf-8") as out:
+            json.dump([dict(zip(FIELDS, sale)) for sale in sales], out, ensure_ascii=False, indent=2)
+    elif fmt == "xml":
+        root = ET.Element("ventas")
+        for sale in sales:
+            venta = ET.SubElement(root, "venta")
+            for field, value in zip(FIELDS, sale):
+                ET.SubElement(venta, field).text = str(value)
+        ET.ElementTree(root).write(path, encoding="utf-8", xml_declaration=True)
+    else:
+        with open(path, "w", encoding="utf-8", newline="") as out:
+            exporters.CsvWriter(out, FIELDS).write(sales)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ventas", type=int, default=1_000_000)
+    parser.add_argument("--formato", choices=sorted(exporters.WRITERS), default="json")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"))
+        conn.execute("CREATE TABLE ventas (id INTEGER PRIMARY KEY, cliente TEXT, fecha TEXT, total REAL)")
+        conn.executemany(
+            "INSERT INTO ventas (cliente, fecha, total) VALUES (?, ?, ?)",
+            ((f"Cliente {i % 5000}", "2024-01-01 12:00:00", i * 0.5) for i in range(args.ventas)),
+        )
+        conn.commit()
+        print(f"{args.ventas:,} ventas, formato {args.formato}, RSS inicial {peak_mib():.0f} MiB")
+
+        for label, func in (
+            ("por lotes", lambda path: exporters.export_query(
+                path, args.formato, "SELECT id, cliente, fecha, total FROM ventas ORDER BY id", (),
+                FIELDS, root="ventas", item="venta", conn=conn)),
+            ("por lotes + gzip", lambda path: exporters.export_query(
+                path + ".gz", args.formato, "SELECT id, cliente, fecha, total FROM ventas ORDER BY id", (),
+                FIELDS, root="ventas", item="venta", conn=conn)),
+            ("original", lambda path: export_original(conn, args.formato, path)),
+        ):
+            path = os.path.join(tmp, f"salida.{args.formato}")
+            t0 = time.perf_counter()
+            func(path)
+            print(f"  {label:<18} {time.perf_counter() - t0:>7.2f} s   pico RSS {peak_mib():>7.0f} MiB")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Latencia de búsqueda de clientes: LIKE frente a FTS5 según el tamaño de la tabla.
+
+Mide el tiempo hasta el primer lote de resultados (lo que ve la tabla
+perezosa) para varias búsquedas, con la consulta LIKE y con
+fulltext.search_query sobre clientes_fts.
+
+    python benchmarks/bench_fts.py [--tamanos 10000,100000,500000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import database  # noqa: E402
+import fulltext  # noqa: E402
+
+NAMES = ["Ana", "José", "María", "Lucía", "Pedro", "Íñigo", "Sofía", "Raúl"]
+SURNAMES = ["López", "Pérez", "Núñez", "García", "Martínez", "Hernández"]
+QUERIES = ["l", "lop", "jose lop", "martinez", "55000123", "nadie"]
+COLUMNS = ("id", "nombre", "email", "telefono")
+BATCH = 256
+
+
+def first_batch_ms(conn, sql, params, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        cursor = conn.execute(sql, params)
+        cursor.fetchmany(BATCH)
+        cursor.close()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanos", default="10000,100000,500000")
+    args = parser.parse_args()
+    random.seed(1)
+
+    for size in (int(value) for value in args.tamanos.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            conn = database.connect(path)
+            conn.execute("CREATE TABLE clientes (id INTEGER PRIMARY KEY, nombre TEXT, email TEXT, telefono TEXT)")
+            conn.executemany(
+                "INSERT INTO clientes (nombre, email, telefono) VALUES (?, ?, ?)",
+                (
+                    (f"{random.choice(NAMES)} {random.choice(SURNAMES)} {i}", f"c{i}@correo.mx", f"55{i:08d}")
+                    for i in range(size)
+                ),
+            )
+            for statement in fulltext.index_statements("clientes"):
+                conn.execute(statement)
+            conn.commit()
+
+            print(f"\n{size:,} clientes")
+            print(f"  {'búsqueda':<12} {'LIKE':>10} {'FTS5':>10}")
+            for query in QUERIES:
+                pattern = f"%{query}%"
+                like_ms = first_batch_ms(
+                    conn,
+                    "SELECT id, nombre, email, telefono FROM clientes WHERE nombre LIKE ? OR email LIKE ? OR telefono LIKE ?",
+                    (pattern, pattern, pattern),
+                )
+                select = ", ".join(f"t.{column}" for column in COLUMNS)
+                fts_ms = first_batch_ms(
+                    conn,
+                    f"SELECT {select} FROM clientes_fts f JOIN clientes t ON t.id = f.rowid "
+                    "WHERE clientes_fts MATCH ? ORDER BY f.rowid",
+                    (fulltext.match_expression(query),),
+                )
+                print(f"  {query!r:<12} {like_ms:>8.2f}ms {fts_ms:>8.2f}ms")
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Planes de consulta y tiempos antes/después de las migraciones de índices.
+
+Genera un historial sintético de ventas (1M por defecto) en una base temporal,
+muestra EXPLAIN QUERY PLAN de las consultas más frecuentes sin índices, aplica
+schema.migrate() y repite la medición.
+
+    python benchmarks/bench_indexes.py [--ventas 1000000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import database  # noqa: E402
+import schema  # noqa: E402
+
+TABLES = (
+    """CREATE TABLE ventas (id INTEGER PRIMARY KEY, user_id INTEGER, cliente_id INTEGER,
+       fecha TEXT, total REAL)""",
+    """CREATE TABLE detalles_venta (id INTEGER PRIMARY KEY, venta_id INTEGER, producto_id INTEGER,
+       cantidad REAL, precio REAL, precio_unitario REAL)""",
+    """CREATE TABLE productos (id INTEGER PRIMARY KEY, nombre TEXT, precio REAL, stock INTEGER,
+       proveedor_id INTEGER, imagen TEXT)""",
+    "CREATE TABLE clientes (id INTEGER PRIMARY KEY, nombre TEXT, email TEXT, telefono TEXT)",
+)
+
+QUERIES = {
+    "SaleDetailsDialog": (
+        """SELECT d.producto_id, p.nombre, d.cantidad, d.precio_unitario, d.precio
+           FROM detalles_venta d JOIN productos p ON d.producto_id = p.id
+           WHERE d.venta_id = ?""",
+        lambda n: (random.randint(1, n),),
+    ),
+    "show_sale_summary": (
+        """SELECT v.id, c.nombre, v.fecha, SUM(d.cantidad * d.precio_unitario)
+           FROM ventas v JOIN clientes c ON v.cliente_id = c.id
+           JOIN detalles_venta d ON v.id = d.venta_id
+           WHERE v.id = ? GROUP BY v.id""",
+        lambda n: (random.randint(1, n),),
+    ),
+    "load_top_products": (
+        """SELECT p.nombre, SUM(dv.cantidad), SUM(dv.cantidad * dv.precio) AS total_sales
+           FROM detalles_venta dv JOIN productos p ON dv.producto_id = p.id
+           GROUP BY dv.producto_id ORDER BY total_sales DESC LIMIT 5""",
+        lambda n: (),
+    ),
+    "get_or_create_default_customer": (
+        "SELECT id FROM clientes WHERE nombre = 'variado'",
+        lambda n: (),
+    ),
+    "ventas por cliente": (
+        "SELECT id, fecha, total FROM ventas WHERE cliente_id = ?",
+        lambda n: (random.randint(1, 5000),),
+    ),
+    "ventas por usuario": (
+        "SELECT SUM(total) FROM ventas WHERE user_id = ?",
+        lambda n: (random.randint(1, 20),),
+    ),
+    "ventas de un día": (
+        "SELECT SUM(total) FROM ventas WHERE fecha >= ? AND fecha < ?",
+        lambda n: ("2024-06-01", "2024-06-02"),
+    ),
+}
+
+
+def populate(conn, ventas):
+    random.seed(42)
+    conn.executemany(
+        "INSERT INTO productos (id, nombre, precio, stock) VALUES (?, ?, ?, ?)",
+        ((i, f"Producto {i}", round(random.uniform(1, 500), 2), 1000) for i in range(1, 2001)),
+    )
+    conn.executemany(
+        "INSERT INTO clientes (id, nombre) VALUES (?, ?)",
+        ((i, f"Cliente {i}") for i in range(1, 5001)),
+    )
+    conn.execute("INSERT INTO clientes (nombre) VALUES ('variado')")
+    start = time.mktime((2020, 1, 1, 0, 0, 0, 0, 0, -1))
+    span = 5 * 365 * 86400
+
+    def sales():
+        for i in range(1, ventas + 1):
+            fecha = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start + random.randrange(span)))
+            yield (i, random.randint(1, 20), random.randint(1, 5000), fecha, 0.0)
+
+    def details():
+        for venta_id in range(1, ventas + 1):
+            for _ in range(random.randint(1, 5)):
+                precio = round(random.uniform(1, 500), 2)
+                cantidad = random.randint(1, 4)
+                yield (venta_id, random.randint(1, 2000), cantidad, precio * cantidad, precio)
+
+    conn.executemany("INSERT INTO ventas VALUES (?, ?, ?, ?, ?)", sales())
+    conn.executemany(
+        "INSERT INTO detalles_venta (venta_id, producto_id, cantidad, precio, precio_unitario) VALUES (?, ?, ?, ?, ?)",
+        details(),
+    )
+    conn.commit()
+
+
+def measure(conn, ventas, repeat):
+    results = {}
+    for name, (sql, params) in QUERIES.items():
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params(ventas))]
+        elapsed = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            conn.execute(sql, params(ventas)).fetchall()
+            elapsed.append(time.perf_counter() - t0)
+        results[name] = (plan, sorted(elapsed)[len(elapsed) // 2] * 1000)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ventas", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = database.connect(os.path.join(tmp, "bench.db"))
+        for ddl in TABLES:
+            conn.execute(ddl)
+        t0 = time.perf_counter()
+        populate(conn, args.ventas)
+        print(f"Datos generados: {args.ventas} ventas en {time.perf_counter() - t0:.1f} s\n")
+
+        before = measure(conn, args.ventas, args.repeat)
+        t0 = time.perf_counter()
+        schema.migrate(conn)
+        print(f"Migración a la versión {schema.get_version(conn)} en {time.perf_counter() - t0:.1f} s\n")
+        after = measure(conn, args.ventas, args.repeat)
+        conn.close()
+
+    for name in QUERIES:
+        plan_before, ms_before = before[name]
+        plan_after, ms_after = after[name]
+        print(f"== {name}: {ms_before:.2f} ms -> {ms_after:.2f} ms")
+        print("   antes:   " + " | ".join(plan_before))
+        print("   después: " + " | ".join(plan_after))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Latencia de cobro: venta directa a la base frente al diario local (journal.py).
+
+Sobre una base temporal con el esquema de schema.migrate, hace --ventas
+ventas de una línea desde --hilos hilos, primero con sales.record_sale (lo
+que esperaba la caja antes del diario) y después con
+SaleJournal.append_sale, y muestra p50/p99 de lo que espera quien cobra. Con
+el diario se mide también cuánto tarda en quedar todo en la base y cuántos
+fsync hicieron falta.
+
+    python benchmarks/bench_journal.py [--ventas 2000] [--hilos 4] [--durable]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import database  # noqa: E402
+import journal  # noqa: E402
+import sales  # noqa: E402
+import schema  # noqa: E402
+import writer  # noqa: E402
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run(sell, threads, count):
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        own = []
+        for _ in range(count // threads):
+            t0 = time.perf_counter()
+            sell()
+            own.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(own)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    t0 = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - t0, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ventas", type=int, default=2000)
+    parser.add_argument("--hilos", type=int, default=4)
+    parser.add_argument("--durable", action="store_true", help="esperar al fsync de cada venta del diario")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench.db")
+        journal.REJECTED_PATH = os.path.join(tmp, "rechazadas")
+        schema.migrate()
+        conn = database.get_connection()
+        product_id = conn.execute("INSERT INTO productos (nombre, precio, stock) VALUES ('Producto', 10, 1e9)").lastrowid
+        conn.commit()
+        items = [(product_id, 1, 10.0)]
+
+        diary = journal.SaleJournal(os.path.join(tmp, "ventas.diario"))
+        diary.start()
+        print(f"{args.ventas} ventas desde {args.hilos} hilos\n")
+        for name, sell in (
+            ("record_sale", lambda: sales.record_sale(items, total=10.0)),
+            ("diario", lambda: diary.append_sale(items, total=10.0, durable=args.durable)),
+        ):
+            elapsed, latencies = run(sell, args.hilos, args.ventas)
+            print(
+                f"  {name:<12} {len(latencies) / elapsed:>9.0f} ventas/s  p50 {statistics.median(latencies) * 1000:>7.3f} ms"
+                f"  p99 {percentile(latencies, 99) * 1000:>7.3f} ms"
+            )
+        t0 = time.perf_counter()
+        diary.stop(timeout=None)
+        stats = diary.stats()
+        print(
+            f"\ndiario: {stats['en_base']} ventas en la base {(time.perf_counter() - t0) * 1000:.0f} ms después,"
+            f" {stats['fsyncs']} fsync, {stats['pendiente_bytes']} bytes pendientes"
+        )
+        writer.get_writer().stop()
+        database.get_pool().close_all()
+
+
+if __name__ == "__main__":
+    main()
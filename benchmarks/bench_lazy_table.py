@@ -0,0 +1,91 @@
+"""Tiempo hasta la primera pantalla: carga completa frente a cursor perezoso.
+
+Reproduce en SQLite lo que hacen las tablas al abrirse: la versión original
+lee todas las filas y crea un texto por celda; LazyQueryModel solo ejecuta la
+consulta y lee el primer lote con fetchmany. No necesita Qt.
+
+    python benchmarks/bench_lazy_table.py [--filas 500000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import database  # noqa: E402
+import schema  # noqa: E402
+
+# Igual que table_models.FETCH_BATCH (ese módulo importa Qt)
+FETCH_BATCH = 256
+
+QUERIES = {
+    "clientes": "SELECT id, nombre, email, telefono FROM clientes",
+    "inventario": "SELECT nombre, stock, precio FROM productos ORDER BY stock ASC",
+}
+
+
+def measure(label, func):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    rows = func()
+    elapsed = (time.perf_counter() - t0) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<18} {elapsed:>10.1f} ms {peak / 1e6:>10.1f} MB  ({rows} filas)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filas", type=int, default=500_000)
+    args = parser.parse_args()
+    random.seed(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench.db")
+        conn = database.get_connection()
+        conn.execute("CREATE TABLE clientes (id INTEGER PRIMARY KEY, nombre TEXT, email TEXT, telefono TEXT)")
+        conn.execute(
+            """CREATE TABLE productos (id INTEGER PRIMARY KEY, nombre TEXT, precio REAL, stock INTEGER,
+               proveedor_id INTEGER, imagen TEXT)"""
+        )
+        conn.execute("CREATE TABLE ventas (id INTEGER PRIMARY KEY, user_id INTEGER, cliente_id INTEGER, fecha TEXT, total REAL)")
+        conn.execute(
+            """CREATE TABLE detalles_venta (id INTEGER PRIMARY KEY, venta_id INTEGER, producto_id INTEGER,
+               cantidad REAL, precio REAL, precio_unitario REAL)"""
+        )
+        conn.executemany(
+            "INSERT INTO clientes (nombre, email, telefono) VALUES (?, ?, ?)",
+            ((f"Cliente {i}", f"c{i}@correo.mx", f"55{i:08d}") for i in range(args.filas)),
+        )
+        conn.executemany(
+            "INSERT INTO productos (nombre, precio, stock) VALUES (?, ?, ?)",
+            ((f"Producto {i}", round(random.uniform(1, 500), 2), random.randint(0, 1000)) for i in range(args.filas)),
+        )
+        conn.commit()
+        schema.migrate(conn)
+
+        reader = database.get_read_connection()
+        for name, sql in QUERIES.items():
+            print(name)
+
+            def full_load():
+                rows = reader.execute(sql).fetchall()
+                cells = [[str(value) for value in row] for row in rows]
+                return len(cells)
+
+            def lazy_load():
+                cursor = reader.execute(sql)
+                rows = cursor.fetchmany(FETCH_BATCH)
+                cursor.close()
+                return len(rows)
+
+            measure("carga completa", full_load)
+            measure("cursor perezoso", lazy_load)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Exportación del detalle de ventas por meses según el número de procesos.
+
+Crea una base WAL con ventas repartidas en varios meses y varias líneas por
+venta, y mide exporters.export_line_items a un solo archivo CSV con 1, 2,
+4... procesos (hasta el número de núcleos).
+
+    python benchmarks/bench_line_items.py [--ventas 200000] [--lineas 5] [--meses 24]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import database  # noqa: E402
+import exporters  # noqa: E402
+import schema  # noqa: E402
+
+
+def create_database(path, sales, lines, months):
+    conn = database.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE clientes (id INTEGER PRIMARY KEY, nombre TEXT, email TEXT, telefono TEXT);
+        CREATE TABLE proveedores (id INTEGER PRIMARY KEY, nombre TEXT, contacto TEXT);
+        CREATE TABLE productos (id INTEGER PRIMARY KEY, nombre TEXT, precio REAL, stock INTEGER);
+        CREATE TABLE ventas (id INTEGER PRIMARY KEY, cliente_id INTEGER, fecha TEXT, total REAL);
+        CREATE TABLE detalles_venta (id INTEGER PRIMARY KEY, venta_id INTEGER, producto_id INTEGER,
+                                     cantidad REAL, precio_unitario REAL, precio REAL);
+        """
+    )
+    conn.executemany("INSERT INTO clientes (nombre) VALUES (?)", ((f"Cliente {i}",) for i in range(1000)))
+    conn.executemany(
+        "INSERT INTO productos (nombre, precio, stock) VALUES (?, ?, 100)",
+        ((f"Producto {i}", i % 50 + 1) for i in range(2000)),
+    )
+    conn.executemany(
+        "INSERT INTO ventas (cliente_id, fecha, total) VALUES (?, ?, 0)",
+        (
+            (
+                random.randint(1, 1000),
+                f"{2020 + month // 12}-{month % 12 + 1:02d}-{random.randint(1, 28):02d} 12:00:00",
+            )
+            for month in (random.randrange(months) for _ in range(sales))
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO detalles_venta (venta_id, producto_id, cantidad, precio_unitario, precio) VALUES (?, ?, 1, ?, ?)",
+        (
+            (sale, product, product % 50 + 1, product % 50 + 1)
+            for sale in range(1, sales + 1)
+            for product in random.sample(range(1, 2001), lines)
+        ),
+    )
+    conn.commit()
+    schema.migrate(conn)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ventas", type=int, default=200_000)
+    parser.add_argument("--lineas", type=int, default=5)
+    parser.add_argument("--meses", type=int, default=24)
+    args = parser.parse_args()
+    random.seed(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        create_database(path, args.ventas, args.lineas, args.meses)
+        print(f"{args.ventas:,} ventas x {args.lineas} líneas en {args.meses} meses, {os.cpu_count()} núcleos")
+
+        workers = 1
+        baseline = None
+        while workers <= (os.cpu_count() or 1):
+            t0 = time.perf_counter()
+            rows = exporters.export_line_items(os.path.join(tmp, "detalle.csv"), "csv", workers=workers, db_path=path)
+            elapsed = time.perf_counter() - t0
+            baseline = baseline or elapsed
+            print(f"  {workers:>2} procesos  {elapsed:>7.2f} s  {rows / elapsed:>12,.0f} filas/s  x{baseline / elapsed:.1f}")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Historial de ventas: LIMIT/OFFSET frente a paginación por clave según la página.
+
+Mide el tiempo de mostrar una página (conteo incluido) con la consulta
+original (COUNT(*) + ORDER BY ... LIMIT/OFFSET) y con
+sales_history.SalesHistoryPager, tanto saltando directamente a la página
+como llegando desde la anterior.
+
+    python benchmarks/bench_pagination.py [--ventas 300000] [--paginas 1,100,5000,15000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import database  # noqa: E402
+import schema  # noqa: E402
+from sales_history import SalesHistoryPager  # noqa: E402
+
+PAGE_SIZE = 20
+# Orden del combo -> (orden del paginador, descendente, ORDER BY original)
+SORTS = [("fecha", True, "fecha DESC"), ("total", True, "total DESC"), ("cliente", False, "c.nombre ASC")]
+
+
+def create_database(path, sales, customers):
+    conn = database.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE clientes (id INTEGER PRIMARY KEY, nombre TEXT, email TEXT, telefono TEXT);
+        CREATE TABLE proveedores (id INTEGER PRIMARY KEY, nombre TEXT, contacto TEXT);
+        CREATE TABLE productos (id INTEGER PRIMARY KEY, nombre TEXT, precio REAL, stock INTEGER);
+        CREATE TABLE ventas (id INTEGER PRIMARY KEY, cliente_id INTEGER, fecha TEXT, total REAL);
+        CREATE TABLE detalles_venta (id INTEGER PRIMARY KEY, venta_id INTEGER, producto_id INTEGER,
+                                     cantidad REAL, precio_unitario REAL, precio REAL);
+        """
+    )
+    conn.executemany(
+        "INSERT INTO clientes (nombre) VALUES (?)", ((f"Cliente {random.randint(1, customers)}",) for _ in range(customers))
+    )
+    conn.executemany(
+        "INSERT INTO ventas (cliente_id, fecha, total) VALUES (?, ?, ?)",
+        (
+            (
+                random.randint(1, customers),
+                f"2024-{random.randint(1, 12):02d}-{random.randint(1, 28):02d} {random.randint(0, 23):02d}:00:00",
+                round(random.uniform(1, 2000), 2),
+            )
+            for _ in range(sales)
+        ),
+    )
+    conn.commit()
+    schema.migrate(conn)
+    return conn
+
+
+def offset_page_ms(conn, order, page):
+    t0 = time.perf_counter()
+    conn.execute("SELECT COUNT(*) FROM ventas").fetchone()
+    conn.execute(
+        f"""SELECT v.id, c.nombre, v.fecha, v.total FROM ventas v JOIN clientes c ON v.cliente_id = c.id
+            ORDER BY {order} LIMIT ? OFFSET ?""",
+        (PAGE_SIZE, (page - 1) * PAGE_SIZE),
+    ).fetchall()
+    return (time.perf_counter() - t0) * 1000
+
+
+def pager_page_ms(pager, page):
+    t0 = time.perf_counter()
+    pager.refresh()
+    pager.fetch_page(page)
+    return (time.perf_counter() - t0) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ventas", type=int, default=300_000)
+    parser.add_argument("--clientes", type=int, default=5_000)
+    parser.add_argument("--paginas", default="1,100,5000,15000")
+    args = parser.parse_args()
+    random.seed(1)
+    pages = [int(value) for value in args.paginas.split(",")]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = create_database(os.path.join(tmp, "bench.db"), args.ventas, args.clientes)
+        pager = SalesHistoryPager(PAGE_SIZE, conn=conn)
+        print(f"{args.ventas:,} ventas, páginas de {PAGE_SIZE}")
+
+        for sort, descending, order in SORTS:
+            print(f"\nOrden {sort}")
+            print(f"  {'página':>8} {'OFFSET':>10} {'salto':>10} {'siguiente':>10}")
+            for page in pages:
+                offset_ms = offset_page_ms(conn, order, page)
+                # Salto en frío: sin claves recordadas de otras páginas
+                pager.set_sort(sort, descending)
+                jump_ms = pager_page_ms(pager, page)
+                next_ms = pager_page_ms(pager, page + 1)
+                print(f"  {page:>8} {offset_ms:>8.2f}ms {jump_ms:>8.2f}ms {next_ms:>8.2f}ms")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""KPIs de los tableros: agregación sobre ventas frente a los resúmenes diarios.
+
+Crea una base con varios años de ventas y mide las consultas originales de
+DashboardModule (SUM, AVG, COUNT DISTINCT y GROUP BY sobre ventas y
+detalles_venta) frente a las funciones de rollups, además de lo que tarda
+rebuild() en llenar los resúmenes.
+
+    python benchmarks/bench_rollups.py [--ventas 500000] [--lineas 3] [--dias 1095]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import database  # noqa: E402
+import rollups  # noqa: E402
+
+ORIGINAL = [
+    ("total de ventas", "SELECT SUM(total) FROM ventas"),
+    ("ventas de hoy", "SELECT SUM(total) FROM ventas WHERE fecha LIKE '2023-06-01%'"),
+    ("transacciones", "SELECT COUNT(*) FROM ventas"),
+    ("ventas mensuales", """SELECT strftime('%Y-%m', fecha) AS month, SUM(total) FROM ventas
+                            GROUP BY month ORDER BY month DESC LIMIT 6"""),
+    ("ticket promedio", "SELECT AVG(total) FROM ventas"),
+    ("usuarios activos", "SELECT COUNT(DISTINCT user_id) FROM ventas"),
+    ("productos por venta", """SELECT AVG(n) FROM (SELECT venta_id, COUNT(*) AS n
+                               FROM detalles_venta GROUP BY venta_id)"""),
+    ("productos más vendidos", """SELECT p.nombre, SUM(d.cantidad), SUM(d.precio) FROM detalles_venta d
+                                  JOIN productos p ON d.producto_id = p.id
+                                  GROUP BY d.producto_id ORDER BY 3 DESC LIMIT 5"""),
+]
+
+
+def create_database(path, sales, lines, days):
+    conn = database.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE productos (id INTEGER PRIMARY KEY, nombre TEXT, precio REAL, stock INTEGER);
+        CREATE TABLE ventas (id INTEGER PRIMARY KEY, user_id INTEGER, cliente_id INTEGER, fecha TEXT, total REAL);
+        CREATE TABLE detalles_venta (id INTEGER PRIMARY KEY, venta_id INTEGER, producto_id INTEGER,
+                                     cantidad REAL, precio_unitario REAL, precio REAL);
+        CREATE INDEX idx_detalles_venta_venta
+            ON detalles_venta (venta_id, producto_id, cantidad, precio_unitario, precio);
+        """
+    )
+    conn.executemany("INSERT INTO productos (nombre, precio, stock) VALUES (?, 10, 100)",
+                     ((f"Producto {i}",) for i in range(1000)))
+    conn.executemany(
+        "INSERT INTO ventas (user_id, cliente_id, fecha, total) VALUES (?, ?, date('2021-01-01', ?), ?)",
+        ((random.randint(1, 10), random.randint(1, 5000), f"+{random.randrange(days)} days",
+          round(random.uniform(1, 500), 2)) for _ in range(sales)),
+    )
+    conn.executemany(
+        "INSERT INTO detalles_venta (venta_id, producto_id, cantidad, precio_unitario, precio) VALUES (?, ?, 1, 10, 10)",
+        ((sale, random.randint(1, 1000)) for sale in range(1, sales + 1) for _ in range(lines)),
+    )
+    for statement in (
+        "CREATE TABLE resumen_ventas_dia (dia TEXT PRIMARY KEY, ventas INTEGER, ventas_con_total INTEGER,"
+        " total REAL, ventas_con_lineas INTEGER, lineas INTEGER, importe REAL) WITHOUT ROWID",
+        "CREATE TABLE resumen_productos_dia (dia TEXT, producto_id INTEGER, cantidad REAL, importe REAL,"
+        " PRIMARY KEY (dia, producto_id)) WITHOUT ROWID",
+        "CREATE TABLE resumen_productos (producto_id INTEGER PRIMARY KEY, cantidad REAL, importe REAL)",
+        "CREATE TABLE resumen_usuarios_dia (dia TEXT, user_id INTEGER, ventas INTEGER, total REAL,"
+        " PRIMARY KEY (dia, user_id)) WITHOUT ROWID",
+        "CREATE TABLE resumen_clientes (cliente_id INTEGER PRIMARY KEY, ventas INTEGER, total REAL)",
+    ):
+        conn.execute(statement)
+    conn.commit()
+    return conn
+
+
+def best_ms(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ventas", type=int, default=500_000)
+    parser.add_argument("--lineas", type=int, default=3)
+    parser.add_argument("--dias", type=int, default=1095)
+    args = parser.parse_args()
+    random.seed(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = create_database(os.path.join(tmp, "bench.db"), args.ventas, args.lineas, args.dias)
+        t0 = time.perf_counter()
+        rollups.rebuild(conn)
+        conn.commit()
+        print(f"{args.ventas:,} ventas en {args.dias} días; rebuild(): {time.perf_counter() - t0:.2f} s\n")
+
+        original = sum(best_ms(lambda sql=sql: conn.execute(sql).fetchall()) for _, sql in ORIGINAL)
+        summarized = sum(
+            best_ms(func)
+            for func in (
+                lambda: rollups.sales_summary("2023-06-01", conn),
+                lambda: rollups.monthly_sales(6, conn),
+                lambda: rollups.kpis(conn),
+                lambda: rollups.top_products(5, conn),
+            )
+        )
+        print(f"  consultas originales ({len(ORIGINAL)}) {original:>10.2f} ms")
+        print(f"  resúmenes                  {summarized:>10.2f} ms")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
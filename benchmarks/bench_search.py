@@ -0,0 +1,71 @@
+"""Latencia del buscador de productos: recorrido lineal frente a SearchIndex.
+
+Genera un catálogo sintético con nombres acentuados y mide, para varias
+búsquedas típicas, el recorrido original (subcadena sobre cada elemento) y
+search_index.SearchIndex con los primeros N resultados.
+
+    python benchmarks/bench_search.py [--productos 50000] [--limite 50]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from search_index import SearchIndex  # noqa: E402
+
+WORDS = (
+    "jamón ibérico queso manchego leche entera pan integral aceite oliva café molido "
+    "azúcar morena arroz frijol tortilla maíz salsa picante chocolate galleta refresco "
+    "cola agua mineral jabón detergente papel higiénico atún sardina plátano limón"
+).split()
+
+QUERIES = ["a", "ca", "pan", "jamon", "Jamón ibé", "cafe mol", "ico", "500g", "zzz"]
+
+
+def best_ms(func, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--productos", type=int, default=50_000)
+    parser.add_argument("--limite", type=int, default=50)
+    args = parser.parse_args()
+    random.seed(1)
+
+    names = [
+        f"{' '.join(random.sample(WORDS, 3))} {random.randint(100, 999)}g"
+        for _ in range(args.productos)
+    ]
+    items = [f"{name} - ${random.uniform(1, 500):.2f}" for name in names]
+
+    index = SearchIndex()
+    t0 = time.perf_counter()
+    index.rebuild(enumerate(names))
+    print(f"Construcción del índice ({len(index)} productos): {(time.perf_counter() - t0) * 1000:.0f} ms")
+    t0 = time.perf_counter()
+    for key in range(100):
+        index.add(key, names[key] + " nuevo")
+    print(f"Actualización incremental: {(time.perf_counter() - t0) * 10:.3f} ms por producto\n")
+
+    print(f"{'búsqueda':<12} {'lineal':>10} {'índice':>10} {'resultados':>11}")
+    for query in QUERIES:
+        def linear():
+            return [i for i, item in enumerate(items) if query.lower() in item.lower()]
+
+        def indexed():
+            return index.search(query, args.limite)
+
+        print(f"{query!r:<12} {best_ms(linear):>8.2f}ms {best_ms(indexed):>8.3f}ms {len(indexed()):>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Arranque de main.py hasta la pantalla de login, en frío y en caliente.
+
+Lanza main.py sin pantalla (QT_QPA_PLATFORM=offscreen) con POS_TRACE_STARTUP
+y POS_TRACE_EXIT=1, que cierra la aplicación en cuanto el login está listo, y
+lee de cada traza el instante login_listo. En frío cada ejecución usa una
+carpeta nueva (la base se crea desde cero) y un PYTHONPYCACHEPREFIX vacío
+(sin bytecode compilado); en caliente se reutilizan ambos. La caché de
+páginas del sistema operativo no se vacía. Con --limite-ms el script termina
+con error si la mediana en caliente lo supera, para detectar regresiones.
+
+    python benchmarks/bench_startup.py [--ejecuciones 10] [--limite-ms 300]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+MAIN = os.path.join(ROOT, "main.py")
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run(workdir, pycache, trace):
+    env = dict(
+        os.environ,
+        QT_QPA_PLATFORM="offscreen",
+        POS_TRACE_STARTUP=trace,
+        POS_TRACE_EXIT="1",
+        PYTHONPYCACHEPREFIX=pycache,
+    )
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, MAIN], cwd=workdir, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=120)
+    wall = (time.perf_counter() - t0) * 1000
+    with open(trace, encoding="utf-8") as source:
+        summary = json.load(source)["resumen"]
+    return wall, summary
+
+
+def report(label, results):
+    walls = [wall for wall, _ in results]
+    ready = [summary["marcas_ms"]["login_listo"] for _, summary in results]
+    for name, values in (("login listo", ready), ("proceso completo", walls)):
+        print(
+            f"  {label:<9} {name:<17} p50 {statistics.median(values):>8.1f} ms"
+            f"  p90 {percentile(values, 90):>8.1f} ms  máx {max(values):>8.1f} ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ejecuciones", type=int, default=10)
+    parser.add_argument("--limite-ms", type=float, help="mediana máxima de login listo en caliente")
+    parser.add_argument("--top", type=int, default=8, help="importaciones y fases más lentas a mostrar")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        trace = os.path.join(tmp, "traza.json")
+        cold = []
+        for i in range(args.ejecuciones):
+            workdir = os.path.join(tmp, f"frio{i}")
+            os.makedirs(workdir)
+            cold.append(run(workdir, os.path.join(tmp, f"pycache{i}"), trace))
+
+        workdir = os.path.join(tmp, "caliente")
+        os.makedirs(workdir)
+        pycache = os.path.join(tmp, "pycache_caliente")
+        run(workdir, pycache, trace)  # Deja la base creada y el bytecode compilado
+        warm = [run(workdir, pycache, trace) for _ in range(args.ejecuciones)]
+
+    print(f"{args.ejecuciones} ejecuciones de cada tipo")
+    report("frío", cold)
+    report("caliente", warm)
+
+    _, summary = warm[len(warm) // 2]
+    for title, key in (("importaciones", "importaciones_ms"), ("fases y módulos", "fases_ms")):
+        print(f"\n{title} más lentas (caliente):")
+        for name, ms in list(summary[key].items())[:args.top]:
+            print(f"  {ms:>8.1f} ms  {name}")
+    print("\nSQL por fase (caliente):")
+    for phase, sql in list(summary["sql"].items())[:args.top]:
+        print(f"  {sql['ms']:>8.1f} ms  {sql['llamadas']:>5} llamadas  {phase}")
+
+    if args.limite_ms is not None:
+        median = statistics.median(summary["marcas_ms"]["login_listo"] for _, summary in warm)
+        if median > args.limite_ms:
+            print(f"\nREGRESIÓN: mediana en caliente {median:.1f} ms > {args.limite_ms:.1f} ms")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
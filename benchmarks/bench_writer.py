@@ -0,0 +1,106 @@
+"""Escrituras concurrentes: una transacción por hilo frente al escritor único.
+
+Lanza --hilos hilos que hacen --escrituras INSERT pequeños cada uno, primero
+cada hilo con su propia conexión y su propia transacción BEGIN IMMEDIATE
+(como hacían los módulos antes de writer.py) y después enviándolos a
+writer.Writer, que los confirma en grupo. Muestra escrituras por segundo,
+p50/p99 de latencia por escritura, commits y errores "database is locked";
+para el escritor, además, sus estadísticas de cola y de commit.
+
+    python benchmarks/bench_writer.py [--hilos 16] [--escrituras 200] [--synchronous NORMAL]
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import database  # noqa: E402
+import writer  # noqa: E402
+
+INSERT = "INSERT INTO notas (titulo, contenido, fecha) VALUES (?, ?, datetime('now'))"
+
+
+def direct_write(params):
+    with database.transaction() as conn:
+        conn.execute(INSERT, params)
+
+
+def queued_write(params):
+    writer.execute(INSERT, params)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run(write, threads, writes):
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def worker(n):
+        own = []
+        for i in range(writes):
+            t0 = time.perf_counter()
+            try:
+                write((f"hilo {n}", str(i)))
+            except sqlite3.OperationalError as error:
+                with lock:
+                    errors.append(error)
+                continue
+            own.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(own)
+        database.get_pool().release_thread_connection()
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    t0 = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - t0, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hilos", type=int, default=16)
+    parser.add_argument("--escrituras", type=int, default=200)
+    parser.add_argument("--synchronous", default="NORMAL", choices=("OFF", "NORMAL", "FULL"))
+    args = parser.parse_args()
+    database.CONNECTION_PRAGMAS = tuple(
+        pragma for pragma in database.CONNECTION_PRAGMAS if "synchronous" not in pragma
+    ) + (f"PRAGMA synchronous = {args.synchronous}",)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench.db")
+        conn = database.get_connection()
+        conn.execute("CREATE TABLE notas (id INTEGER PRIMARY KEY, titulo TEXT, contenido TEXT, fecha TEXT)")
+        conn.commit()
+
+        total = args.hilos * args.escrituras
+        print(f"{args.hilos} hilos × {args.escrituras} escrituras, synchronous={args.synchronous}\n")
+        for name, write in (("transacción por hilo", direct_write), ("escritor único", queued_write)):
+            elapsed, latencies, errors = run(write, args.hilos, args.escrituras)
+            commits = writer.get_writer().stats()["commits"] if write is queued_write else len(latencies)
+            print(
+                f"  {name:<21} {total / elapsed:>9.0f} escrituras/s  p50 {statistics.median(latencies) * 1000:>7.2f} ms"
+                f"  p99 {percentile(latencies, 99) * 1000:>7.2f} ms  {commits:>5} commits  {len(errors)} bloqueos"
+            )
+        stats = writer.get_writer().stats()
+        writer.get_writer().stop()
+        print(
+            f"\nescritor: {stats['trabajos_por_commit']:.1f} trabajos por commit, cola máxima {stats['cola_maxima']},"
+            f" espera p99 {stats['espera_ms']['p99']:.2f} ms, commit p99 {stats['commit_ms']['p99']:.2f} ms"
+        )
+        database.get_pool().close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+CENT = Decimal("0.01")
+QUANTITY_STEP = Decimal("0.01")
+
+
+def to_cents(amount):
+    """Convierte un importe (float, str o Decimal) a centavos enteros."""
+    return int((Decimal(str(amount)).quantize(CENT, rounding=ROUND_HALF_UP) * 100))
+
+
+def format_cents(cents):
+    sign = "-" if cents < 0 else ""
+    cents = abs(cents)
+    return f"{sign}${cents // 100}.{cents % 100:02d}"
+
+
+class CartLine:
+    __slots__ = ("product_id", "name", "unit_cents", "quantity", "subtotal_cents")
+
+    def __init__(self, product_id, name, unit_cents, quantity):
+        self.product_id = product_id
+        self.name = name
+        self.unit_cents = unit_cents
+        self.quantity = quantity
+        self.subtotal_cents = self._subtotal()
+
+    def _subtotal(self):
+        return int((self.quantity * self.unit_cents).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+    def add_quantity(self, quantity):
+        """Suma cantidad a la línea y devuelve la diferencia del subtotal en centavos."""
+        previous = self.subtotal_cents
+        self.quantity += quantity
+        self.subtotal_cents = self._subtotal()
+        return self.subtotal_cents - previous
+
+
+class Cart:
+    """Carrito en memoria con total acumulado en centavos.
+
+    Las líneas se guardan en una lista y se indexan por producto en un
+    diccionario, así que agregar (o fusionar con una línea existente) y quitar
+    una línea cuestan O(1). Al quitar, la última línea ocupa el hueco.
+    """
+
+    def __init__(self):
+        self._lines = []
+        self._rows = {}
+        self.total_cents = 0
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __iter__(self):
+        return iter(self._lines)
+
+    def line(self, row):
+        return self._lines[row]
+
+    def row_of(self, product_id):
+        return self._rows.get(product_id)
+
+    def add(self, product_id, name, unit_price, quantity):
+        """Agrega un producto o suma la cantidad a su línea.
+
+        Devuelve (fila, es_nueva).
+        """
+        quantity = Decimal(str(quantity)).quantize(QUANTITY_STEP, rounding=ROUND_HALF_UP)
+        row = self._rows.get(product_id)
+        if row is not None:
+            self.total_cents += self._lines[row].add_quantity(quantity)
+            return row, False
+
+        line = CartLine(product_id, name, to_cents(unit_price), quantity)
+        self._rows[product_id] = len(self._lines)
+        self._lines.append(line)
+        self.total_cents += line.subtotal_cents
+        return len(self._lines) - 1, True
+
+    def remove_row(self, row):
+        """Quita la línea de la fila indicada y devuelve la línea quitada."""
+        line = self._lines[row]
+        last = self._lines.pop()
+        if last is not line:
+            self._lines[row] = last
+            self._rows[last.product_id] = row
+        del self._rows[line.product_id]
+        self.total_cents -= line.subtotal_cents
+        return line
+
+    def clear(self):
+        self._lines.clear()
+        self._rows.clear()
+        self.total_cents = 0
+
+    @property
+    def total(self):
+        return Decimal(self.total_cents) / 100
+
+    def items(self):
+        """Líneas como (producto_id, cantidad, precio_unitario) para sales.record_sale."""
+        return [
+            (line.product_id, float(line.quantity), line.unit_cents / 100)
+            for line in self._lines
+        ]
+
+    def details(self):
+        """Líneas como (nombre, cantidad, precio_unitario, subtotal), igual que los detalles de una venta."""
+        return [
+            (line.name, float(line.quantity), line.unit_cents / 100, line.subtotal_cents / 100)
+            for line in self._lines
+        ]
@@ -0,0 +1,140 @@
+import threading
+
+import events
+from database import get_connection
+
+# Columnas que, si existen en productos, se indexan como código de barras/SKU
+CODE_COLUMNS = ("codigo_barras", "sku", "codigo")
+
+
+class Product:
+    __slots__ = ("id", "nombre", "precio", "stock", "codigo")
+
+    def __init__(self, id, nombre, precio, stock, codigo=None):
+        self.id = id
+        self.nombre = nombre
+        self.precio = precio
+        self.stock = stock
+        self.codigo = codigo
+
+
+class ProductCatalog:
+    """Caché del catálogo de productos con búsqueda O(1) por id y por código.
+
+    Se carga una vez al arrancar (warm) y se mantiene al día con las
+    invalidaciones que emite el inventario (refresh/remove). Los oyentes
+    registrados con subscribe() reciben el id del producto cambiado, o None
+    cuando se recargó todo el catálogo, en el hilo que hizo el cambio (que
+    puede no ser el de la interfaz: la precarga de main.py, el escritor).
+    """
+
+    def __init__(self):
+        self._by_id = {}
+        self._by_code = {}
+        self._code_column = None
+        self._lock = threading.RLock()
+        self._listeners = []
+        self.loaded = False
+
+    def _detect_code_column(self, conn):
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(productos)")}
+        for column in CODE_COLUMNS:
+            if column in columns:
+                return column
+        return None
+
+    def _select(self):
+        code = self._code_column or "NULL"
+        return f"SELECT id, nombre, precio, stock, {code} FROM productos"
+
+    def warm(self, conn=None):
+        conn = conn or get_connection()
+        self._code_column = self._detect_code_column(conn)
+        rows = conn.execute(self._select()).fetchall()
+        by_id = {}
+        by_code = {}
+        for row in rows:
+            product = Product(*row)
+            by_id[product.id] = product
+            if product.codigo:
+                by_code[str(product.codigo)] = product
+        with self._lock:
+            self._by_id = by_id
+            self._by_code = by_code
+            self.loaded = True
+        self._notify(None)
+        return len(by_id)
+
+    def ensure_loaded(self, conn=None):
+        if not self.loaded:
+            self.warm(conn)
+
+    def get(self, product_id):
+        return self._by_id.get(product_id)
+
+    def lookup_code(self, code):
+        """Busca por código de barras/SKU y, si no hay, por id numérico."""
+        code = str(code).strip()
+        product = self._by_code.get(code)
+        if product is None and code.isdigit():
+            product = self._by_id.get(int(code))
+        return product
+
+    def all(self):
+        return list(self._by_id.values())
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def refresh(self, product_id, conn=None):
+        """Vuelve a leer un producto tras agregarlo o modificarlo."""
+        conn = conn or get_connection()
+        row = conn.execute(self._select() + " WHERE id = ?", (product_id,)).fetchone()
+        if row is None:
+            self.remove(product_id)
+            return None
+        product = Product(*row)
+        with self._lock:
+            previous = self._by_id.get(product_id)
+            if previous is not None and previous.codigo:
+                self._by_code.pop(str(previous.codigo), None)
+            self._by_id[product_id] = product
+            if product.codigo:
+                self._by_code[str(product.codigo)] = product
+        self._notify(product_id)
+        return product
+
+    def remove(self, product_id):
+        with self._lock:
+            product = self._by_id.pop(product_id, None)
+            if product is not None and product.codigo:
+                self._by_code.pop(str(product.codigo), None)
+        self._notify(product_id)
+
+    def apply_stock(self, stocks):
+        """Actualiza el stock en caché con un evento events.STOCK {id: stock}."""
+        with self._lock:
+            for product_id, stock in stocks.items():
+                product = self._by_id.get(product_id)
+                if product is not None and stock is not None:
+                    product.stock = stock
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, product_id):
+        for callback in list(self._listeners):
+            callback(product_id)
+
+
+_catalog = ProductCatalog()
+# Las ventas publican el stock que dejaron; el catálogo lo toma sin releer
+events.get_bus().subscribe(events.STOCK, _catalog.apply_stock)
+
+
+def get_catalog():
+    return _catalog
@@ -0,0 +1,48 @@
+from PyQt6.QtCharts import QBarCategoryAxis, QBarSeries, QBarSet, QChart, QChartView, QValueAxis
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QPainter
+
+
+class BarChartView(QChartView):
+    """Gráfico de barras de QtCharts cuyos datos se cambian en el lugar.
+
+    set_data() reemplaza solo los valores que cambiaron; la serie, los ejes
+    y la escena se crean una vez.
+    """
+
+    def __init__(self, title, series_name, x_title=None, y_title=None, parent=None):
+        chart = QChart()
+        chart.setTitle(title)
+        super().__init__(chart, parent)
+
+        self.bar_set = QBarSet(series_name)
+        self.series = QBarSeries()
+        self.series.append(self.bar_set)
+        chart.addSeries(self.series)
+
+        self.axis_x = QBarCategoryAxis()
+        self.axis_y = QValueAxis()
+        if x_title:
+            self.axis_x.setTitleText(x_title)
+        if y_title:
+            self.axis_y.setTitleText(y_title)
+        chart.addAxis(self.axis_x, Qt.AlignmentFlag.AlignBottom)
+        chart.addAxis(self.axis_y, Qt.AlignmentFlag.AlignLeft)
+        self.series.attachAxis(self.axis_x)
+        self.series.attachAxis(self.axis_y)
+
+        self.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+    def set_data(self, data):
+        """data es [(categoría, valor)]; los valores None se dibujan como 0."""
+        categories = [str(category) for category, _ in data]
+        values = [value or 0 for _, value in data]
+        if categories != self.axis_x.categories():
+            self.axis_x.setCategories(categories)
+            self.bar_set.remove(0, self.bar_set.count())
+            self.bar_set.append(values)
+        else:
+            for index, value in enumerate(values):
+                if self.bar_set.at(index) != value:
+                    self.bar_set.replace(index, value)
+        self.axis_y.setRange(0, max(values, default=0) or 1)
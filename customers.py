@@ -1,6 +1,6 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit,
-    QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox, QDialog,
+    QTableView, QAbstractItemView, QHeaderView, QMessageBox, QDialog,
     QFormLayout, QDialogButtonBox, QApplication, QComboBox, QStackedWidget,
     QSplitter, QFrame
 )
@@ -9,6 +9,14 @@ from PyQt6.QtCore import Qt, pyqtSignal, QSize
 import sqlite3
 import sys
 
+import events
+import writer
+from fulltext import search_query
+from schema import get_counter
+from table_models import LazyQueryModel
+
+CUSTOMER_COLUMNS = ("id", "nombre", "email", "telefono")
+
 class CustomersModule(QWidget):
     customer_updated = pyqtSignal()
 
@@ -48,7 +56,7 @@ class CustomersModule(QWidget):
                 border-radius: 4px;
                 font-size: 14px;
             }
-            QTableWidget {
+            QTableView {
                 border: 1px solid #ddd;
                 border-radius: 4px;
                 background-color: white;
@@ -135,16 +143,19 @@ class CustomersModule(QWidget):
         right_layout.addLayout(search_layout)
 
         # Tabla de clientes
-        self.customer_table = QTableWidget(0, 4)
-        self.customer_table.setHorizontalHeaderLabels(["ID", "Nombre", "Email", "Teléfono"])
+        self.customer_model = LazyQueryModel(["ID", "Nombre", "Email", "Teléfono"], parent=self)
+        self.customer_table = QTableView()
+        self.customer_table.setModel(self.customer_model)
+        self.customer_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.customer_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
         self.customer_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.customer_table.setAlternatingRowColors(True)
         self.customer_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 gridline-color: #d6d9dc;
                 selection-background-color: #e2e8f0;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 10px;
             }
         """)
@@ -182,11 +193,10 @@ class CustomersModule(QWidget):
             return
 
         try:
-            conn = sqlite3.connect('pos_database.db')
-            c = conn.cursor()
-            c.execute("INSERT INTO clientes (nombre, email, telefono) VALUES (?, ?, ?)", (name, email, phone))
-            conn.commit()
-            conn.close()
+            customer_id, _ = writer.execute(
+                "INSERT INTO clientes (nombre, email, telefono) VALUES (?, ?, ?)", (name, email, phone)
+            )
+            events.publish(events.CUSTOMER, {"id": customer_id, "accion": "alta"})
 
             self.clear_form()
             self.load_customers()
@@ -198,37 +208,29 @@ class CustomersModule(QWidget):
 
     def load_customers(self):
         try:
-            conn = sqlite3.connect('pos_database.db')
-            c = conn.cursor()
-            c.execute("SELECT * FROM clientes")
-            customers = c.fetchall()
-            conn.close()
-
-            self.customer_table.setRowCount(0)
-            for row, customer in enumerate(customers):
-                self.customer_table.insertRow(row)
-                for col, value in enumerate(customer):
-                    item = QTableWidgetItem(str(value))
-                    if col == 0:  # ID column
-                        item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                    self.customer_table.setItem(row, col, item)
-
-            self.total_customers_label.setText(f"Total de clientes: {len(customers)}")
+            # Las filas se leen del cursor a medida que se desplaza la tabla
+            self.search_customers()
+
+            # Lo mantienen los disparadores de contadores: no recorre la tabla
+            total, _ = get_counter("clientes")
+            self.total_customers_label.setText(f"Total de clientes: {total}")
 
         except sqlite3.Error as e:
             QMessageBox.critical(self, "Error", f"No se pudieron cargar los clientes: {e}")
 
+    def selected_customer(self):
+        rows = self.customer_table.selectionModel().selectedRows()
+        if not rows:
+            return None
+        return ["" if value is None else value for value in self.customer_model.row_values(rows[0].row())]
+
     def edit_customer(self):
-        selected_items = self.customer_table.selectedItems()
-        if not selected_items:
+        customer = self.selected_customer()
+        if customer is None:
             QMessageBox.warning(self, "Advertencia", "Por favor, seleccione un cliente para editar.")
             return
 
-        row = selected_items[0].row()
-        customer_id = int(self.customer_table.item(row, 0).text())
-        current_name = self.customer_table.item(row, 1).text()
-        current_email = self.customer_table.item(row, 2).text()
-        current_phone = self.customer_table.item(row, 3).text()
+        customer_id, current_name, current_email, current_phone = customer
 
         dialog = QDialog(self)
         dialog.setWindowTitle("Editar Cliente")
@@ -258,15 +260,12 @@ class CustomersModule(QWidget):
             new_phone = phone_input.text()
 
             try:
-                conn = sqlite3.connect('pos_database.db')
-                c = conn.cursor()
-                c.execute("""
+                writer.execute("""
                     UPDATE clientes
                     SET nombre = ?, email = ?, telefono = ?
                     WHERE id = ?
                 """, (new_name, new_email, new_phone, customer_id))
-                conn.commit()
-                conn.close()
+                events.publish(events.CUSTOMER, {"id": customer_id, "accion": "cambio"})
 
                 self.load_customers()
                 self.customer_updated.emit()
@@ -275,14 +274,12 @@ class CustomersModule(QWidget):
                 QMessageBox.critical(self, "Error", f"No se pudo actualizar el cliente: {e}")
 
     def delete_customer(self):
-        selected_items = self.customer_table.selectedItems()
-        if not selected_items:
+        customer = self.selected_customer()
+        if customer is None:
             QMessageBox.warning(self, "Advertencia", "Por favor, seleccione un cliente para eliminar.")
             return
 
-        row = selected_items[0].row()
-        customer_id = int(self.customer_table.item(row, 0).text())
-        customer_name = self.customer_table.item(row, 1).text()
+        customer_id, customer_name = customer[0], customer[1]
 
         reply = QMessageBox.question(self, "Confirmar eliminación",
                                      f"¿Está seguro de que desea eliminar el cliente '{customer_name}'?",
@@ -290,11 +287,8 @@ class CustomersModule(QWidget):
 
         if reply == QMessageBox.StandardButton.Yes:
             try:
-                conn = sqlite3.connect('pos_database.db')
-                c = conn.cursor()
-                c.execute("DELETE FROM clientes WHERE id = ?", (customer_id,))
-                conn.commit()
-                conn.close()
+                writer.execute("DELETE FROM clientes WHERE id = ?", (customer_id,))
+                events.publish(events.CUSTOMER, {"id": customer_id, "accion": "baja"})
 
                 self.load_customers()
                 self.customer_updated.emit()
@@ -308,15 +302,9 @@ class CustomersModule(QWidget):
         self.customer_phone_input.clear()
 
     def search_customers(self):
-        search_text = self.search_input.text().lower()
-        for row in range(self.customer_table.rowCount()):
-            match = False
-            for col in range(1, self.customer_table.columnCount()):  # Excluye la columna ID
-                item = self.customer_table.item(row, col)
-                if item and search_text in item.text().lower():
-                    match = True
-                    break
-            self.customer_table.setRowHidden(row, not match)
+        # Búsqueda por prefijos en clientes_fts; la tabla trae los resultados por lotes
+        sql, params = search_query("clientes", self.search_input.text(), CUSTOMER_COLUMNS)
+        self.customer_model.set_query(sql, params)
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
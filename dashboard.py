@@ -4,6 +4,7 @@ from PyQt6.QtWidgets import (
     QHBoxLayout,
     QLabel,
     QTableWidget,
+    QTableView,
     QGroupBox,
     QPushButton,
     QFrame,
@@ -25,12 +26,36 @@ from PyQt6.QtWidgets import (
     QApplication,
 )
 from PyQt6.QtGui import QFont, QIcon, QColor, QPalette
-from PyQt6.QtCore import Qt, QDate, pyqtSignal, QTimer
-import plotly.graph_objs as go
-from plotly.subplots import make_subplots
-from plotly.offline import plot
-import sqlite3
+from PyQt6.QtCore import Qt, QDate, pyqtSignal, QTimer, QThreadPool
 from datetime import datetime, timedelta
+import time
+import traceback
+
+import events
+import rollups
+from catalog import get_catalog
+from charts import BarChartView
+from database import get_connection, get_read_connection
+from schema import get_counter
+from table_models import LazyQueryModel
+from workers import EventRelay, Worker
+
+# Cargadores del tablero: cada uno es un fetch_<nombre> que corre en el pool
+# y un show_<nombre> que aplica su resultado en el hilo de la interfaz
+DASHBOARD_LOADERS = (
+    "totals",
+    "product_stock_chart",
+    "sales_table",
+    "new_entities_summary",
+)
+# Los eventos mantienen el tablero al día; la reconciliación solo vuelve a
+# cargar si los contadores muestran cambios que no llegaron como evento
+RECONCILE_MS = 15 * 60 * 1000
+RECENT_SALES = 50
+# Por debajo de este stock un producto queda entre los primeros del
+# inventario: solo cruzar este umbral obliga a reordenarlo
+LOW_STOCK = 10
+STOCK_CHART_SIZE = 5
 
 
 class DashboardModule(QWidget):
@@ -38,13 +63,33 @@ class DashboardModule(QWidget):
 
     def __init__(self):
         super().__init__()
+        self._pending = set()
+        self._results = {}
+        self._stale = False
+        self._refresh_started = 0.0
+        # Milisegundos del último refresco por cargador (y "total")
+        self.loader_timings = {}
+        self.loader_errors = {}
+        self._reload_after = False
+        # Agregados en memoria (rollups.LiveTotals) y conteos de la última carga
+        self.totals = None
+        self.unique_products = 0
+        self.total_customers = 0
+        self.total_suppliers = 0
+        self._revisions = None
+        self._sales_filtered = False
+        # Últimas filas (id, nombre, stock) del gráfico de stock
+        self._stock_top = None
         self.init_ui()
         self.load_data()
         self.refresh_signal.connect(self.load_data)
 
+        self.events = EventRelay((events.SALE, events.STOCK, events.CUSTOMER), self)
+        self.events.event.connect(self.on_event)
+
         self.update_timer = QTimer(self)
-        self.update_timer.timeout.connect(self.load_data)
-        self.update_timer.start(300000)  # 300000 ms = 5 minutos
+        self.update_timer.timeout.connect(self.reconcile)
+        self.update_timer.start(RECONCILE_MS)
 
     def init_ui(self):
         main_layout = QVBoxLayout()
@@ -80,7 +125,7 @@ class DashboardModule(QWidget):
             QPushButton:hover {
                 background-color: #2980b9;
             }
-            QTableWidget {
+            QTableWidget, QTableView {
                 gridline-color: #d0d0d0;
                 border: 1px solid #d0d0d0;
                 border-radius: 4px;
@@ -192,11 +237,14 @@ class DashboardModule(QWidget):
         layout.addWidget(self.create_top_products_table())
         layout.addWidget(self.create_product_stock_chart())
 
-        self.inventory_table = QTableWidget()
-        self.inventory_table.setColumnCount(3)
-        self.inventory_table.setHorizontalHeaderLabels(
-            ["Producto", "Stock Actual", "Precio"]
+        self.inventory_model = LazyQueryModel(
+            ["Producto", "Stock Actual", "Precio"],
+            formatters={2: lambda price: f"${price:.2f}"},
+            key_column=3,
+            parent=self,
         )
+        self.inventory_table = QTableView()
+        self.inventory_table.setModel(self.inventory_model)
         self.inventory_table.horizontalHeader().setSectionResizeMode(
             QHeaderView.ResizeMode.Stretch
         )
@@ -228,8 +276,9 @@ class DashboardModule(QWidget):
         group_box = QGroupBox("Gráfico de Ventas Mensuales")
         layout = QVBoxLayout()
 
-        self.sales_chart_widget = QLabel("Cargando gráfico...")
-        layout.addWidget(self.sales_chart_widget)
+        self.sales_chart = BarChartView("Ventas Mensuales", "Ventas", "Mes", "Ventas ($)")
+        self.sales_chart.setMinimumHeight(300)
+        layout.addWidget(self.sales_chart)
 
         group_box.setLayout(layout)
         return group_box
@@ -291,130 +340,202 @@ class DashboardModule(QWidget):
         group_box = QGroupBox("Stock de Productos")
         layout = QVBoxLayout()
 
-        self.stock_chart_widget = QLabel("Cargando gráfico...")
-        layout.addWidget(self.stock_chart_widget)
+        self.stock_chart = BarChartView("Stock de Productos", "Stock", "Producto", "Unidades en Stock")
+        self.stock_chart.setMinimumHeight(300)
+        layout.addWidget(self.stock_chart)
 
         group_box.setLayout(layout)
         return group_box
 
     def load_data(self):
-        self.load_sales_summary()
-        self.load_sales_chart()
-        self.load_kpis()
-        self.load_top_products()
-        self.load_product_stock_chart()
-        self.load_inventory()
-        self.load_sales_table()
-        self.load_new_entities_summary()
-
-    def load_sales_summary(self):
-        conn = sqlite3.connect("pos_database.db")
-        c = conn.cursor()
-
-        c.execute("SELECT SUM(total) FROM ventas")
-        total_sales = c.fetchone()[0] or 0
-
-        today = datetime.now().strftime("%Y-%m-%d")
-        c.execute("SELECT SUM(total) FROM ventas WHERE fecha LIKE ?", (f"{today}%",))
-        today_sales = c.fetchone()[0] or 0
-
-        c.execute("SELECT COUNT(*) FROM ventas")
-        transactions = c.fetchone()[0] or 0
-
-        conn.close()
-
-        self.total_sales_label.setText(f"Total de Ventas: ${total_sales:.2f}")
-        self.today_sales_label.setText(f"Ventas de Hoy: ${today_sales:.2f}")
-        self.transactions_label.setText(f"Transacciones: {transactions}")
-
-    def load_sales_chart(self):
-        conn = sqlite3.connect("pos_database.db")
-        c = conn.cursor()
-
-        c.execute(
-            """
-            SELECT strftime('%Y-%m', fecha) as month, SUM(total) as total_sales
-            FROM ventas
-            GROUP BY month
-            ORDER BY month DESC
-            LIMIT 6
-        """
-        )
-        results = c.fetchall()
-        conn.close()
-
-        months = [row[0] for row in results][::-1]
-        sales = [row[1] for row in results][::-1]
-
-        fig = go.Figure(data=[go.Bar(x=months, y=sales)])
-        fig.update_layout(
-            title="Ventas Mensuales", xaxis_title="Mes", yaxis_title="Ventas ($)"
+        """Refresca el tablero en segundo plano; si no está visible, al mostrarse."""
+        if not self.isVisible():
+            self._stale = True
+            return
+        if self._pending:
+            return  # Ya hay un refresco en curso
+
+        self._stale = False
+        self._reload_after = False
+        self._results = {}
+        self._pending = set(DASHBOARD_LOADERS)
+        self._refresh_started = time.perf_counter()
+        pool = QThreadPool.globalInstance()
+        for name in DASHBOARD_LOADERS:
+            worker = Worker(self._run_loader, name)
+            worker.signals.result.connect(self._loader_finished)
+            pool.start(worker)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._stale:
+            self.load_data()
+
+    def _run_loader(self, name, progress):
+        # Corre en el pool; Worker devuelve la conexión de solo lectura al terminar
+        start = time.perf_counter()
+        try:
+            data, error = getattr(self, f"fetch_{name}")(), None
+        except Exception as exc:
+            traceback.print_exc()
+            data, error = None, str(exc)
+        return name, data, error, (time.perf_counter() - start) * 1000
+
+    def _loader_finished(self, result):
+        name, data, error, elapsed = result
+        self._results[name] = (data, error)
+        self.loader_timings[name] = elapsed
+        self._pending.discard(name)
+        if not self._pending:
+            self._apply_results()
+
+    def _apply_results(self):
+        # Todos los widgets se actualizan de una vez, con un solo repintado
+        self.loader_errors = {}
+        self.setUpdatesEnabled(False)
+        try:
+            for name in DASHBOARD_LOADERS:
+                data, error = self._results[name]
+                if error is None:
+                    getattr(self, f"show_{name}")(data)
+                else:
+                    self.loader_errors[name] = error
+            self.load_inventory()
+        finally:
+            self.setUpdatesEnabled(True)
+        self.loader_timings["total"] = (time.perf_counter() - self._refresh_started) * 1000
+        if self._reload_after:
+            # Llegaron eventos durante la carga: puede que no estén incluidos
+            self.load_data()
+
+    def on_event(self, kind, payload):
+        """Aplica un evento de events al tablero sin volver a consultar."""
+        if self._pending:
+            self._reload_after = True
+            return
+        if self.totals is None:
+            return  # La primera carga ya incluirá el cambio
+
+        if kind == events.SALE:
+            applied = self.totals.apply_sale(payload)
+            if applied is None:
+                # Faltan ventas que no llegaron como evento (otro proceso)
+                self.load_data()
+            elif applied:
+                self.show_sales_figures()
+                self.add_recent_sale(payload)
+        elif kind == events.STOCK:
+            self.apply_stock(payload)
+        elif kind == events.CUSTOMER:
+            self.total_customers += {"alta": 1, "baja": -1}.get(payload["accion"], 0)
+            self.show_entity_counts()
+
+    def apply_stock(self, stocks):
+        """Cambia el stock de las filas cargadas; reordena solo si hace falta."""
+        catalog = get_catalog()
+        changes = {}
+        for product_id, stock in stocks.items():
+            product = catalog.get(product_id)
+            if product is None:
+                changes[product_id] = {1: stock}
+            else:
+                # Una edición del inventario también puede cambiar nombre y precio
+                changes[product_id] = {0: product.nombre, 1: stock, 2: product.precio}
+        previous = self.inventory_model.update_rows(changes)
+
+        def low(stock):
+            return (stock or 0) < LOW_STOCK
+
+        for product_id, stock in stocks.items():
+            if stock is None:
+                rerank = True  # Producto eliminado
+            elif product_id in previous:
+                rerank = low(previous[product_id][1]) != low(stock)
+            else:
+                # Aún no cargado: solo se ve si entra en la zona de stock bajo
+                rerank = low(stock)
+            if rerank:
+                self.load_inventory()
+                break
+
+        top = self._stock_top
+        if top is None:
+            return
+        ranked = {row[0] for row in top}
+        floor = (top[-1][2] or 0) if len(top) == STOCK_CHART_SIZE else None
+        if any(
+            product_id in ranked or stock is None or floor is None or stock > floor
+            for product_id, stock in stocks.items()
+        ):
+            # El índice por stock da los primeros sin recorrer el catálogo
+            worker = Worker(self._run_loader, "product_stock_chart")
+            worker.signals.result.connect(self._stock_chart_loaded)
+            QThreadPool.globalInstance().start(worker)
+
+    def _stock_chart_loaded(self, result):
+        _, data, error, _ = result
+        if error is None:
+            self.show_product_stock_chart(data)
+
+    def reconcile(self):
+        """Red de seguridad: recarga solo si los contadores cambiaron sin avisar."""
+        if not self.isVisible():
+            self._stale = True
+            return
+        worker = Worker(self._read_revisions)
+        worker.signals.result.connect(self._revisions_read)
+        QThreadPool.globalInstance().start(worker)
+
+    def _read_revisions(self, progress):
+        conn = get_read_connection()
+        return tuple(
+            get_counter(table, conn)[1] for table in ("ventas", "clientes", "productos", "proveedores")
         )
 
-        plot(fig, filename="sales_chart.html", auto_open=False)
-        self.sales_chart_widget.setText(
-            '<img src="sales_chart.html" width="100%" height="300">'
+    def _revisions_read(self, revisions):
+        # Las ventas aplicadas por evento ya movieron totals.revision
+        known = self._revisions
+        if self.totals is not None and known is not None:
+            known = (self.totals.revision,) + known[1:]
+        if revisions != known or None in revisions:
+            self.load_data()
+
+    def fetch_totals(self):
+        # Resúmenes diarios y por producto en memoria; los productos únicos,
+        # del contador de la tabla
+        conn = get_read_connection()
+        totals = rollups.LiveTotals().load(conn)
+        unique_products, _ = get_counter("productos", conn)
+        revisions = tuple(
+            get_counter(table, conn)[1] for table in ("ventas", "clientes", "productos", "proveedores")
         )
+        return totals, unique_products, revisions
 
-    def load_kpis(self):
-        conn = sqlite3.connect("pos_database.db")
-        c = conn.cursor()
-
-        # Ticket Promedio
-        c.execute("SELECT AVG(total) FROM ventas")
-        avg_ticket = c.fetchone()[0] or 0
-
-        # Productos Únicos
-        c.execute("SELECT COUNT(DISTINCT id) FROM productos")
-        unique_products = c.fetchone()[0] or 0
-
-        # Usuarios Activos
-        c.execute("SELECT COUNT(DISTINCT user_id) FROM ventas")
-        active_users = c.fetchone()[0] or 0
+    def show_totals(self, data):
+        self.totals, self.unique_products, self._revisions = data
+        self.show_sales_figures()
 
-        # Productos por Venta
-        c.execute(
-            """
-            SELECT AVG(product_count) FROM (
-                SELECT venta_id, COUNT(*) as product_count
-                FROM detalles_venta
-                GROUP BY venta_id
-            )
-        """
-        )
-        products_per_sale = c.fetchone()[0] or 0
-
-        conn.close()
+    def show_sales_figures(self):
+        """Resumen, KPIs, productos más vendidos y gráfico mensual desde self.totals."""
+        totals = self.totals
+        today = datetime.now().strftime("%Y-%m-%d")
+        self.total_sales_label.setText(f"Total de Ventas: ${totals.total:.2f}")
+        self.today_sales_label.setText(f"Ventas de Hoy: ${totals.day_total(today):.2f}")
+        self.transactions_label.setText(f"Transacciones: {totals.transactions}")
 
+        avg_ticket, active_users, products_per_sale = totals.kpis()
         kpi_group_box = self.findChild(QGroupBox, "KPIs")
         if kpi_group_box:
             kpi_layout = kpi_group_box.layout()
             if kpi_layout:
                 kpi_layout.itemAtPosition(0, 1).widget().setText(f"${avg_ticket:.2f}")
-                kpi_layout.itemAtPosition(0, 3).widget().setText(f"{unique_products}")
+                kpi_layout.itemAtPosition(0, 3).widget().setText(f"{self.unique_products}")
                 kpi_layout.itemAtPosition(1, 1).widget().setText(f"{active_users}")
                 kpi_layout.itemAtPosition(1, 3).widget().setText(
                     f"{products_per_sale:.1f}"
                 )
 
-    def load_top_products(self):
-        conn = sqlite3.connect("pos_database.db")
-        c = conn.cursor()
-
-        c.execute(
-            """
-            SELECT p.nombre, SUM(dv.cantidad) as total_quantity, SUM(dv.cantidad * dv.precio) as total_sales
-            FROM detalles_venta dv
-            JOIN productos p ON dv.producto_id = p.id
-            GROUP BY dv.producto_id
-            ORDER BY total_sales DESC
-            LIMIT 5
-        """
-        )
-        results = c.fetchall()
-        conn.close()
-
-        for row, (product, quantity, total) in enumerate(results):
+        for row, (product, quantity, total) in enumerate(totals.top_products(5)):
             self.top_products_table.setItem(row, 0, QTableWidgetItem(product))
             self.top_products_table.setItem(row, 1, QTableWidgetItem(str(quantity)))
 
@@ -426,100 +547,88 @@ class DashboardModule(QWidget):
 
             self.top_products_table.setItem(row, 2, QTableWidgetItem(total_str))
 
-    def load_product_stock_chart(self):
-        conn = sqlite3.connect("pos_database.db")
-        c = conn.cursor()
+        # Las barras se actualizan en el lugar, sin rehacer el gráfico
+        self.sales_chart.set_data(totals.monthly(6))
 
-        c.execute(
+    def fetch_product_stock_chart(self):
+        return get_read_connection().execute(
             """
-            SELECT nombre, stock
+            SELECT id, nombre, stock
             FROM productos
             ORDER BY stock DESC
-            LIMIT 5
-        """
-        )
-        results = c.fetchall()
-        conn.close()
-
-        products = [row[0] for row in results]
-        stock = [row[1] for row in results]
-
-        fig = go.Figure(data=[go.Bar(x=products, y=stock)])
-        fig.update_layout(
-            title="Stock de Productos",
-            xaxis_title="Producto",
-            yaxis_title="Unidades en Stock",
-        )
+            LIMIT ?
+        """,
+            (STOCK_CHART_SIZE,),
+        ).fetchall()
 
-        plot(fig, filename="stock_chart.html", auto_open=False)
-        self.stock_chart_widget.setText(
-            '<img src="stock_chart.html" width="100%" height="300">'
-        )
+    def show_product_stock_chart(self, results):
+        self._stock_top = results
+        self.stock_chart.set_data([(name, stock) for _, name, stock in results])
 
     def load_inventory(self):
-        conn = sqlite3.connect("pos_database.db")
-        c = conn.cursor()
-
-        c.execute(
+        # idx_productos_stock entrega las filas ya ordenadas: no hay que
+        # ordenar todo el catálogo antes de mostrar la primera página
+        self.inventory_model.set_query(
             """
-            SELECT nombre, stock, precio
+            SELECT nombre, stock, precio, id
             FROM productos
             ORDER BY stock ASC
         """
         )
-        results = c.fetchall()
-        conn.close()
 
-        self.inventory_table.setRowCount(len(results))
-        for row, (product, stock, price) in enumerate(results):
-            self.inventory_table.setItem(row, 0, QTableWidgetItem(product))
-            self.inventory_table.setItem(row, 1, QTableWidgetItem(str(stock)))
-            self.inventory_table.setItem(row, 2, QTableWidgetItem(f"${price:.2f}"))
-
-    def load_sales_table(self):
-        conn = sqlite3.connect("pos_database.db")
-        c = conn.cursor()
-
-        c.execute(
-            """
+    def fetch_sales_table(self):
+        return get_read_connection().execute(
+            f"""
             SELECT v.id, v.fecha, v.total, u.username
             FROM ventas v
             JOIN usuarios u ON v.user_id = u.id
             ORDER BY v.fecha DESC
-            LIMIT 50
+            LIMIT {RECENT_SALES}
         """
-        )
-        results = c.fetchall()
-        conn.close()
+        ).fetchall()
 
+    def show_sales_table(self, results):
+        self._sales_filtered = False
         self.sales_table.setRowCount(len(results))
         for row, (id, date, total, username) in enumerate(results):
-            self.sales_table.setItem(row, 0, QTableWidgetItem(str(id)))
-            self.sales_table.setItem(row, 1, QTableWidgetItem(date))
-            self.sales_table.setItem(row, 2, QTableWidgetItem(f"${total:.2f}"))
-            self.sales_table.setItem(row, 3, QTableWidgetItem(username))
-
-    def load_new_entities_summary(self):
-        conn = sqlite3.connect("pos_database.db")
-        c = conn.cursor()
-
-        # Contar todos los clientes (ya que no tenemos una columna de fecha de creación)
-        c.execute("SELECT COUNT(*) FROM clientes")
-        total_customers = c.fetchone()[0] or 0
-
-        # Contar todos los proveedores (ya que no tenemos una columna de fecha de creación)
-        c.execute("SELECT COUNT(*) FROM proveedores")
-        total_suppliers = c.fetchone()[0] or 0
-
-        conn.close()
+            self.set_sale_row(row, id, date, total, username)
+
+    def set_sale_row(self, row, id, date, total, username):
+        self.sales_table.setItem(row, 0, QTableWidgetItem(str(id)))
+        self.sales_table.setItem(row, 1, QTableWidgetItem(date))
+        self.sales_table.setItem(row, 2, QTableWidgetItem(f"${total:.2f}"))
+        self.sales_table.setItem(row, 3, QTableWidgetItem(username))
+
+    def add_recent_sale(self, sale):
+        # Igual que el JOIN con usuarios: las ventas sin usuario no se listan
+        if self._sales_filtered or sale["usuario"] is None:
+            return
+        self.sales_table.insertRow(0)
+        self.set_sale_row(0, sale["id"], sale["fecha"], sale["total"], sale["usuario"])
+        if self.sales_table.rowCount() > RECENT_SALES:
+            self.sales_table.removeRow(RECENT_SALES)
+
+    def fetch_new_entities_summary(self):
+        # Contar todos los clientes y proveedores (no hay columna de fecha de
+        # creación); los contadores evitan recorrer las tablas
+        conn = get_read_connection()
+        total_customers, _ = get_counter("clientes", conn)
+        total_suppliers, _ = get_counter("proveedores", conn)
+        return total_customers, total_suppliers
+
+    def show_new_entities_summary(self, data):
+        self.total_customers, self.total_suppliers = data
+        self.show_entity_counts()
+
+    def show_entity_counts(self):
+        self.new_customers_label.setText(f"Total de Clientes: {self.total_customers}")
+        self.new_suppliers_label.setText(f"Total de Proveedores: {self.total_suppliers}")
 
-        self.new_customers_label.setText(f"Total de Clientes: {total_customers}")
-        self.new_suppliers_label.setText(f"Total de Proveedores: {total_suppliers}")
     def apply_sales_filters(self):
         date_from = self.date_from.date().toString("yyyy-MM-dd")
         date_to = self.date_to.date().toString("yyyy-MM-dd")
 
-        conn = sqlite3.connect("pos_database.db")
+        conn = get_connection()
         c = conn.cursor()
 
         c.execute(
@@ -533,14 +642,12 @@ class DashboardModule(QWidget):
             (date_from, date_to),
         )
         results = c.fetchall()
-        conn.close()
 
+        # Con un rango elegido, las ventas nuevas no se agregan arriba
+        self._sales_filtered = True
         self.sales_table.setRowCount(len(results))
         for row, (id, date, total, username) in enumerate(results):
-            self.sales_table.setItem(row, 0, QTableWidgetItem(str(id)))
-            self.sales_table.setItem(row, 1, QTableWidgetItem(date))
-            self.sales_table.setItem(row, 2, QTableWidgetItem(f"${total:.2f}"))
-            self.sales_table.setItem(row, 3, QTableWidgetItem(username))
+            self.set_sale_row(row, id, date, total, username)
 
         QMessageBox.information(
             self, "Filtros Aplicados", "Los filtros de fecha han sido aplicados."
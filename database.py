@@ -0,0 +1,205 @@
+import sqlite3
+import threading
+import queue
+from contextlib import contextmanager
+
+DB_PATH = "pos_database.db"
+
+# Pragmas aplicados a cada conexión nueva. journal_mode se fija aparte porque
+# es persistente en el archivo y cambiarlo requiere un bloqueo de escritura.
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16000",  # ~16 MB de caché de páginas por conexión
+    "PRAGMA mmap_size = 268435456",  # 256 MB mapeados en memoria
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+)
+
+# Sentencias preparadas que cada conexión mantiene en caché para reutilizarlas
+STATEMENT_CACHE_SIZE = 256
+
+# Clase de las conexiones nuevas; tracing la cambia para medir el SQL
+CONNECTION_FACTORY = sqlite3.Connection
+
+
+def connect(path=None, readonly=False):
+    """Abre una conexión nueva ya configurada (WAL y pragmas de rendimiento)."""
+    path = path or DB_PATH
+    if readonly:
+        conn = sqlite3.connect(
+            f"file:{path}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            factory=CONNECTION_FACTORY,
+        )
+    else:
+        conn = sqlite3.connect(
+            path,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            factory=CONNECTION_FACTORY,
+        )
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        if mode.lower() != "wal":
+            conn.execute("PRAGMA journal_mode = WAL")
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class ConnectionPool:
+    """Pool de conexiones SQLite con una conexión persistente por hilo.
+
+    Cada hilo reutiliza siempre la misma conexión (y su caché de sentencias
+    preparadas y de páginas). Los hilos de corta vida pueden tomar prestada
+    una conexión ociosa con borrow() para no abrir una nueva cada vez.
+    """
+
+    def __init__(self, path=None, readonly=False, max_idle=8):
+        self.path = path
+        self.readonly = readonly
+        self._local = threading.local()
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+        self._lock = threading.Lock()
+        self._all = []
+        self._opened = 0
+        self._reused = 0
+
+    def _open(self):
+        conn = connect(self.path, readonly=self.readonly)
+        with self._lock:
+            self._opened += 1
+            self._all.append(conn)
+        return conn
+
+    def _count_reuse(self):
+        with self._lock:
+            self._reused += 1
+
+    def connection(self):
+        """Devuelve la conexión del hilo actual, abriéndola la primera vez."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            try:
+                conn = self._idle.get_nowait()
+                self._count_reuse()
+            except queue.Empty:
+                conn = self._open()
+            self._local.conn = conn
+        else:
+            self._count_reuse()
+        return conn
+
+    def acquire(self):
+        """Toma una conexión ociosa (o abre una) para uso exclusivo; se devuelve con release()."""
+        try:
+            conn = self._idle.get_nowait()
+            self._count_reuse()
+        except queue.Empty:
+            conn = self._open()
+        return conn
+
+    def release(self, conn):
+        """Devuelve al pool una conexión tomada con acquire()."""
+        if conn.in_transaction:
+            conn.rollback()
+        self._release(conn)
+
+    @contextmanager
+    def borrow(self):
+        """Presta una conexión ociosa del pool y la devuelve al terminar."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def release_thread_connection(self):
+        """Devuelve al pool la conexión del hilo actual (p. ej. al terminar el hilo)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            if conn.in_transaction:
+                conn.rollback()
+            self._release(conn)
+
+    def _release(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            with self._lock:
+                if conn in self._all:
+                    self._all.remove(conn)
+            conn.close()
+
+    @contextmanager
+    def transaction(self, conn=None):
+        """Ejecuta un bloque en una transacción BEGIN IMMEDIATE con commit o rollback."""
+        conn = conn or self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "opened": self._opened,
+                "reused": self._reused,
+                "open": len(self._all),
+                "idle": self._idle.qsize(),
+            }
+
+    def close_all(self):
+        with self._lock:
+            connections, self._all = self._all, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass
+        self._local = threading.local()
+        self._idle = queue.LifoQueue(maxsize=self._idle.maxsize)
+
+
+_pool = ConnectionPool()
+# Conexiones de solo lectura para cursores de larga vida (tablas perezosas),
+# separadas de las de escritura para no mezclar lecturas abiertas con BEGIN
+_read_pool = ConnectionPool(readonly=True)
+
+
+def get_pool():
+    return _pool
+
+
+def get_read_pool():
+    return _read_pool
+
+
+def get_connection():
+    """Conexión compartida del hilo actual hacia pos_database.db."""
+    return _pool.connection()
+
+
+def get_read_connection():
+    """Conexión de solo lectura del hilo actual."""
+    return _read_pool.connection()
+
+
+def read_connection():
+    """Presta una conexión de solo lectura para un hilo de corta vida (API)."""
+    return _read_pool.borrow()
+
+
+def transaction():
+    return _pool.transaction()
+
+
+def connection_stats():
+    """Cuántas conexiones se han abierto y cuántas veces se han reutilizado."""
+    return _pool.stats()
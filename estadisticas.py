@@ -1,6 +1,7 @@
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton, QDateEdit, QTableWidget, QTableWidgetItem
 from PyQt6.QtCore import QDate
-import sqlite3
+
+from database import get_connection
 
 class StatisticsModule(QWidget):
     def __init__(self):
@@ -30,11 +31,10 @@ class StatisticsModule(QWidget):
         start = self.start_date.date().toString("yyyy-MM-dd")
         end = self.end_date.date().toString("yyyy-MM-dd")
 
-        conn = sqlite3.connect('pos_database.db')
+        conn = get_connection()
         c = conn.cursor()
         c.execute("SELECT fecha, tipo, valor FROM estadisticas WHERE fecha BETWEEN ? AND ?", (start, end))
         stats = c.fetchall()
-        conn.close()
 
         self.report_table.setRowCount(0)
         for row, stat in enumerate(stats):
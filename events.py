@@ -0,0 +1,60 @@
+"""Bus de eventos del proceso: ventas, cambios de stock y de clientes.
+
+Quien escribe en la base publica lo que cambió, con los datos que necesitan
+las vistas para actualizar sus agregados sin volver a consultar:
+
+- SALE: el resumen que devuelve sales.record_sale, con cliente_id, user_id,
+  usuario, productos {producto_id: (nombre, cantidad, importe)}, lineas,
+  importe, cliente_nuevo (primera compra del cliente) y revision (la de
+  ventas en contadores tras insertar la venta).
+- STOCK: {producto_id: stock nuevo}, con None si el producto se eliminó.
+- CUSTOMER: {"id": cliente_id, "accion": "alta" | "cambio" | "baja"}.
+
+Los oyentes se llaman en el hilo que publica, después del commit. Las vistas
+Qt se suscriben con workers.EventRelay para recibirlos en el hilo de la
+interfaz.
+"""
+import threading
+import traceback
+
+SALE = "venta"
+STOCK = "stock"
+CUSTOMER = "cliente"
+
+
+class EventBus:
+    def __init__(self):
+        self._listeners = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, kind, callback):
+        with self._lock:
+            self._listeners.setdefault(kind, []).append(callback)
+
+    def unsubscribe(self, kind, callback):
+        with self._lock:
+            listeners = self._listeners.get(kind, [])
+            if callback in listeners:
+                listeners.remove(callback)
+
+    def publish(self, kind, payload):
+        with self._lock:
+            listeners = list(self._listeners.get(kind, ()))
+        for callback in listeners:
+            # Un oyente con errores no impide avisar a los demás ni deshace
+            # la escritura, que ya está confirmada
+            try:
+                callback(payload)
+            except Exception:
+                traceback.print_exc()
+
+
+_bus = EventBus()
+
+
+def get_bus():
+    return _bus
+
+
+def publish(kind, payload):
+    _bus.publish(kind, payload)
@@ -0,0 +1,306 @@
+import csv
+import gzip
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from xml.sax.saxutils import XMLGenerator
+
+import database
+from database import read_connection
+
+# Filas que se leen del cursor y se escriben de una vez
+EXPORT_BATCH = 5000
+
+
+class CsvWriter:
+    def __init__(self, out, fields, headers=None, root=None, item=None):
+        self.writer = csv.writer(out)
+        self.headers = headers or fields
+
+    def begin(self):
+        self.writer.writerow(self.headers)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def end(self):
+        pass
+
+
+class JsonWriter:
+    """Escribe un arreglo JSON objeto por objeto, sin armarlo en memoria."""
+
+    def __init__(self, out, fields, headers=None, root=None, item=None):
+        self.out = out
+        self.fields = fields
+        self.first = True
+
+    def begin(self):
+        self.out.write("[")
+
+    def write(self, rows):
+        separator = "\n  " if self.first else ",\n  "
+        self.out.write(separator + ",\n  ".join(
+            json.dumps(dict(zip(self.fields, row)), ensure_ascii=False) for row in rows
+        ))
+        self.first = self.first and not rows
+
+    def end(self):
+        self.out.write("\n]\n" if not self.first else "]\n")
+
+
+class XmlWriter:
+    """Escribe el XML elemento por elemento con XMLGenerator (sin ElementTree)."""
+
+    def __init__(self, out, fields, headers=None, root="filas", item="fila"):
+        self.xml = XMLGenerator(out, encoding="utf-8", short_empty_elements=True)
+        self.out = out
+        self.fields = fields
+        self.root = root
+        self.item = item
+
+    def begin(self):
+        self.xml.startDocument()
+        self.xml.startElement(self.root, {})
+        self.xml.ignorableWhitespace("\n")
+
+    def write(self, rows):
+        # Cada fila es una línea completa, así que los fragmentos se pueden concatenar
+        xml = self.xml
+        for row in rows:
+            xml.ignorableWhitespace("  ")
+            xml.startElement(self.item, {})
+            for field, value in zip(self.fields, row):
+                xml.startElement(field, {})
+                if value is not None:
+                    xml.characters(str(value))
+                xml.endElement(field)
+            xml.endElement(self.item)
+            xml.ignorableWhitespace("\n")
+
+    def end(self):
+        self.xml.endElement(self.root)
+        self.xml.endDocument()
+        self.out.write("\n")
+
+
+WRITERS = {"csv": CsvWriter, "json": JsonWriter, "xml": XmlWriter}
+
+
+def open_output(path):
+    """Abre el archivo de salida en texto UTF-8; comprimido con gzip si termina en .gz."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def export_query(path, fmt, sql, params, fields, headers=None, root="filas", item="fila",
+                 total=None, progress=None, cancelled=None, batch_size=EXPORT_BATCH, conn=None,
+                 fragment=False):
+    """Escribe el resultado de una consulta en CSV, JSON o XML en memoria constante.
+
+    Las filas se leen del cursor por lotes de batch_size y cada lote se escribe
+    antes de pedir el siguiente. progress(porcentaje) se llama tras cada lote
+    si se conoce total; cancelled() se consulta entre lotes y, si devuelve
+    True, se borra el archivo a medias. Devuelve las filas escritas, o None si
+    se canceló. Con fragment solo se escriben las filas, sin encabezado ni
+    cierre, para unir después varios fragmentos en un archivo.
+    """
+    writer_class = WRITERS[fmt]
+    # Sin conn, una conexión prestada que vuelve al pool al terminar la exportación
+    with nullcontext(conn) if conn is not None else read_connection() as conn:
+        written = 0
+        finished = False
+        cursor = conn.execute(sql, params)
+        try:
+            with open_output(path) as out:
+                writer = writer_class(out, fields, headers, root, item)
+                if not fragment:
+                    writer.begin()
+                while cancelled is None or not cancelled():
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        if not fragment:
+                            writer.end()
+                        finished = True
+                        break
+                    writer.write(rows)
+                    written += len(rows)
+                    if progress is not None and total:
+                        progress(min(100, written * 100 // total))
+        finally:
+            cursor.close()
+            # Nunca se deja un archivo a medias (cancelado o con error)
+            if not finished and os.path.exists(path):
+                os.remove(path)
+    return written if finished else None
+
+
+# Detalle de ventas (una fila por producto vendido) para contabilidad
+LINE_ITEM_FIELDS = (
+    "venta_id", "fecha", "cliente", "producto_id", "producto", "cantidad", "precio_unitario", "importe",
+)
+LINE_ITEM_HEADERS = [
+    "ID Venta", "Fecha", "Cliente", "ID Producto", "Producto", "Cantidad", "Precio Unitario", "Importe",
+]
+
+# Un mes de detalles en orden de fecha: el rango lo resuelve idx_ventas_fecha_id
+# y los detalles de cada venta idx_detalles_venta_venta
+LINE_ITEMS_SQL = """
+    SELECT v.id, v.fecha, (SELECT nombre FROM clientes WHERE id = v.cliente_id),
+           d.producto_id, p.nombre, d.cantidad, d.precio_unitario, d.precio
+    FROM ventas v INDEXED BY idx_ventas_fecha_id
+    CROSS JOIN detalles_venta d ON d.venta_id = v.id
+    LEFT JOIN productos p ON p.id = d.producto_id
+    WHERE IFNULL(v.fecha, '') >= ? {upper}
+    ORDER BY IFNULL(v.fecha, ''), v.id, d.id
+"""
+
+
+def month_chunks(conn):
+    """(mes, inicio, fin) de rangos semiabiertos que cubren todas las ventas.
+
+    El primero empieza en '' (ventas sin fecha) y el último no tiene fin, de
+    modo que ninguna venta queda fuera aunque su fecha no tenga el formato
+    habitual.
+    """
+    dated = "FROM ventas WHERE fecha GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]*'"
+    first = conn.execute(f"SELECT MIN(fecha) {dated}").fetchone()[0]
+    last = conn.execute(f"SELECT MAX(fecha) {dated}").fetchone()[0]
+    if first is None:
+        return [("todo", "", None)]
+
+    year, month = int(first[:4]), int(first[5:7])
+    last_year, last_month = int(last[:4]), int(last[5:7])
+    starts = []
+    while (year, month) <= (last_year, last_month):
+        starts.append(f"{year:04d}-{month:02d}-01")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    labels = [start[:7] for start in starts]
+    return list(zip(labels, [""] + starts[1:], starts[1:] + [None]))
+
+
+def _export_chunk(db_path, fmt, start, end, path, fragment):
+    # Corre en otro proceso: su propia conexión de solo lectura sobre el WAL
+    conn = database.connect(db_path, readonly=True)
+    try:
+        upper = "AND IFNULL(v.fecha, '') < ?" if end is not None else ""
+        params = (start, end) if end is not None else (start,)
+        return export_query(
+            path, fmt, LINE_ITEMS_SQL.format(upper=upper), params, LINE_ITEM_FIELDS,
+            headers=LINE_ITEM_HEADERS, root="detalles", item="detalle", conn=conn, fragment=fragment,
+        )
+    finally:
+        conn.close()
+
+
+def _join_fragments(path, fmt, parts, counts):
+    """Une los fragmentos en orden con el encabezado y el cierre del formato.
+
+    Si la salida es .gz cada fragmento ya viene comprimido por su proceso y se
+    copia tal cual: varios miembros gzip seguidos forman un gzip válido.
+    """
+    compress = path.endswith(".gz")
+    buffer = io.StringIO()
+    writer = WRITERS[fmt](buffer, LINE_ITEM_FIELDS, LINE_ITEM_HEADERS, "detalles", "detalle")
+
+    def flush(out):
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        out.write(gzip.compress(data) if compress else data)
+
+    with open(path, "wb") as out:
+        writer.begin()
+        flush(out)
+        written = False
+        for part, count in zip(parts, counts):
+            if not count:
+                continue
+            if written and fmt == "json":
+                buffer.write(",")
+                flush(out)
+            with open(part, "rb") as source:
+                shutil.copyfileobj(source, out)
+            written = True
+        if fmt == "json":
+            writer.first = not written
+        writer.end()
+        flush(out)
+
+
+def export_line_items(path, fmt, partitioned=False, compress=False, workers=None,
+                      progress=None, cancelled=None, db_path=None):
+    """Exporta el detalle de todas las ventas leyendo cada mes en paralelo.
+
+    Cada mes se lee en un proceso de un ProcessPoolExecutor con su propia
+    conexión de solo lectura; en modo WAL los lectores no se bloquean entre sí,
+    así que el tiempo baja casi en proporción a los núcleos. Con partitioned,
+    path es una carpeta con un archivo por mes (comprimido si compress); si no,
+    los fragmentos se unen en orden en el archivo path (comprimido si termina
+    en .gz). progress y cancelled funcionan como en export_query, por meses.
+    Devuelve las filas escritas, o None si se canceló.
+    """
+    db_path = db_path or database.DB_PATH
+    conn = database.connect(db_path, readonly=True)
+    try:
+        chunks = month_chunks(conn)
+    finally:
+        conn.close()
+
+    if partitioned:
+        os.makedirs(path, exist_ok=True)
+        suffix = f".{fmt}.gz" if compress else f".{fmt}"
+        targets = [os.path.join(path, f"detalles_{label}{suffix}") for label, _, _ in chunks]
+        work_dir = None
+    else:
+        work_dir = tempfile.mkdtemp(prefix=".detalles_", dir=os.path.dirname(os.path.abspath(path)))
+        suffix = f".{fmt}.gz" if path.endswith(".gz") else f".{fmt}"
+        targets = [os.path.join(work_dir, f"{i:05d}{suffix}") for i in range(len(chunks))]
+
+    counts = [0] * len(chunks)
+    cancel = False
+    finished = False
+    # Lo que hay que borrar si no se termina (los fragmentos van con work_dir)
+    outputs = targets if partitioned else []
+    # Un proceso hijo por fork copiaría el estado de los hilos de Qt y del pool
+    # de conexiones a medio usar (se puede colgar): los procesos arrancan limpios
+    context = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            pending = {
+                pool.submit(_export_chunk, db_path, fmt, start, end, target, not partitioned): i
+                for i, ((_, start, end), target) in enumerate(zip(chunks, targets))
+            }
+            try:
+                while pending and not cancel:
+                    done, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        counts[pending.pop(future)] = future.result()
+                    if progress is not None:
+                        progress((len(chunks) - len(pending)) * 100 // len(chunks))
+                    cancel = cancelled is not None and cancelled()
+            finally:
+                # Cancelado o con error: los meses que faltan no se empiezan
+                if pending:
+                    pool.shutdown(cancel_futures=True)
+        if cancel:
+            return None
+        if not partitioned:
+            outputs = [path]
+            _join_fragments(path, fmt, targets, counts)
+        finished = True
+        return sum(counts)
+    finally:
+        if work_dir is not None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        if not finished:
+            # Como export_query, nunca se dejan archivos a medias
+            for output in outputs:
+                if os.path.exists(output):
+                    os.remove(output)
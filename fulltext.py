@@ -0,0 +1,111 @@
+import re
+
+from database import get_connection
+
+# Tabla base -> (tabla FTS5, columnas indexadas)
+FTS_TABLES = {
+    "clientes": ("clientes_fts", ("nombre", "email", "telefono")),
+    "proveedores": ("proveedores_fts", ("nombre", "contacto")),
+}
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def fts5_supported(conn):
+    options = {row[0] for row in conn.execute("PRAGMA compile_options")}
+    return "ENABLE_FTS5" in options
+
+
+def index_statements(table):
+    """Sentencias que crean la tabla FTS5 de contenido externo y sus triggers.
+
+    La tabla FTS solo guarda el índice (content=table), así que no duplica los
+    datos; los triggers la mantienen al día en la misma transacción que cada
+    INSERT, UPDATE o DELETE sobre la tabla base. Los índices de prefijos de 1 a
+    4 letras hacen que "l"* o "lop"* lean una sola lista en vez de combinar
+    las de todos los términos que empiezan así.
+    """
+    fts, columns = FTS_TABLES[table]
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+    return (
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                {column_list}, content='{table}', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='1 2 3 4'
+            )""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts} (rowid, {column_list}) VALUES (new.id, {new_values});
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+                INSERT INTO {fts} (rowid, {column_list}) VALUES (new.id, {new_values});
+            END""",
+        f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')",
+    )
+
+
+def create_index(table):
+    """Paso de migración que crea el índice FTS5 de una tabla si SQLite lo soporta."""
+
+    def step(conn):
+        if not fts5_supported(conn):
+            return
+        for statement in index_statements(table):
+            conn.execute(statement)
+
+    return step
+
+
+def has_index(conn, table):
+    fts = FTS_TABLES[table][0]
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,)).fetchone()
+    return row is not None
+
+
+def match_expression(text, column=None):
+    """Convierte lo que escribe el usuario en una consulta MATCH por prefijos.
+
+    "ana lóp" -> '"ana"* "lóp"*': cada palabra debe aparecer como inicio de
+    alguna palabra indexada. Las comillas evitan que la sintaxis de FTS5
+    (AND, NEAR, -, :) en el texto del usuario se interprete. Con column la
+    búsqueda se limita a esa columna: 'nombre : ("ana"* "lóp"*)'.
+    """
+    expression = " ".join(f'"{token}"*' for token in _TOKEN.findall(text or ""))
+    if column and expression:
+        return f"{column} : ({expression})"
+    return expression
+
+
+def search_query(table, text, columns):
+    """(sql, parámetros) para buscar en una tabla; FTS5 si existe, LIKE si no.
+
+    Las coincidencias salen en orden de id directamente del índice, sin
+    ordenar todo el resultado, así que el primer lote que pide la tabla
+    perezosa cuesta lo mismo con mil clientes que con un millón.
+    """
+    select = ", ".join(f"t.{column}" for column in columns)
+    expression = match_expression(text)
+    if not expression:
+        return f"SELECT {select} FROM {table} t", ()
+
+    conn = get_connection()
+    fts, indexed = FTS_TABLES[table]
+    if has_index(conn, table):
+        return (
+            f"""
+            SELECT {select}
+            FROM {fts} f
+            JOIN {table} t ON t.id = f.rowid
+            WHERE {fts} MATCH ?
+            ORDER BY f.rowid
+            """,
+            (expression,),
+        )
+
+    pattern = f"%{text.strip()}%"
+    where = " OR ".join(f"t.{column} LIKE ?" for column in indexed)
+    return f"SELECT {select} FROM {table} t WHERE {where}", (pattern,) * len(indexed)
@@ -10,6 +10,12 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtGui import QFont, QIcon, QPixmap, QAction
 from PyQt6.QtCore import Qt, pyqtSignal
 
+import events
+import writer
+from catalog import get_catalog
+from database import get_connection
+from workers import EventRelay
+
 class ProductWidget(QFrame):
     edit_clicked = pyqtSignal(int)
     delete_clicked = pyqtSignal(int)
@@ -61,9 +67,9 @@ class ProductWidget(QFrame):
         layout.addWidget(price_label)
 
         # Stock
-        stock_label = QLabel(f"Stock: {self.product_data[3]}")
-        stock_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(stock_label)
+        self.stock_label = QLabel(f"Stock: {self.product_data[3]}")
+        self.stock_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.stock_label)
 
         # Proveedor
         supplier_label = QLabel(f"Proveedor: {self.product_data[4]}")
@@ -80,16 +86,24 @@ class ProductWidget(QFrame):
         button_layout.addWidget(delete_button)
         layout.addLayout(button_layout)
 
+    def set_stock(self, stock):
+        self.stock_label.setText(f"Stock: {stock}")
+
 class InventoryModule(QWidget):
     inventory_updated = pyqtSignal()
 
     def __init__(self):
         super().__init__()
+        self.product_widgets = {}
         self.init_ui()
         self.load_products()
         self.load_suppliers()
         self.image_path = None
 
+        # Las ventas publican el stock que dejaron: se actualiza cada tarjeta
+        self.events = EventRelay((events.STOCK,), self)
+        self.events.event.connect(self.on_stock_changed)
+
     def init_ui(self):
         main_layout = QHBoxLayout()
         self.setLayout(main_layout)
@@ -213,12 +227,12 @@ class InventoryModule(QWidget):
             return
 
         try:
-            conn = sqlite3.connect('pos_database.db')
-            c = conn.cursor()
-            c.execute("INSERT INTO productos (nombre, precio, stock, proveedor_id, imagen) VALUES (?, ?, ?, ?, ?)",
-                      (name, price, stock, supplier_id, self.image_path))
-            conn.commit()
-            conn.close()
+            product_id, _ = writer.execute(
+                "INSERT INTO productos (nombre, precio, stock, proveedor_id, imagen) VALUES (?, ?, ?, ?, ?)",
+                (name, price, stock, supplier_id, self.image_path),
+            )
+            get_catalog().refresh(product_id)
+            events.publish(events.STOCK, {product_id: stock})
 
             self.clear_inputs()
             self.load_products()
@@ -235,7 +249,7 @@ class InventoryModule(QWidget):
 
     def load_products(self):
         try:
-            conn = sqlite3.connect('pos_database.db')
+            conn = get_connection()
             c = conn.cursor()
             c.execute("""
                 SELECT p.id, p.nombre, p.precio, p.stock, COALESCE(pr.nombre, 'Sin proveedor'), p.imagen
@@ -243,17 +257,18 @@ class InventoryModule(QWidget):
                 LEFT JOIN proveedores pr ON p.proveedor_id = pr.id
             """)
             products = c.fetchall()
-            conn.close()
 
             # Limpiar el grid existente
             for i in reversed(range(self.product_grid.count())): 
                 self.product_grid.itemAt(i).widget().setParent(None)
+            self.product_widgets = {}
 
             # Agregar productos al grid
             for i, product in enumerate(products):
                 product_widget = ProductWidget(product)
                 product_widget.edit_clicked.connect(self.edit_product)
                 product_widget.delete_clicked.connect(self.delete_product)
+                self.product_widgets[product[0]] = product_widget
                 row = i // 3
                 col = i % 3
                 self.product_grid.addWidget(product_widget, row, col)
@@ -261,13 +276,18 @@ class InventoryModule(QWidget):
         except sqlite3.Error as e:
             QMessageBox.critical(self, "Error", f"No se pudieron cargar los productos: {e}")
 
+    def on_stock_changed(self, kind, stocks):
+        for product_id, stock in stocks.items():
+            widget = self.product_widgets.get(product_id)
+            if widget is not None and stock is not None:
+                widget.set_stock(stock)
+
     def load_suppliers(self):
         try:
-            conn = sqlite3.connect('pos_database.db')
+            conn = get_connection()
             c = conn.cursor()
             c.execute("SELECT id, nombre FROM proveedores")
             suppliers = c.fetchall()
-            conn.close()
 
             self.supplier_combo.clear()
             self.supplier_combo.addItem("Seleccione un proveedor", None)
@@ -279,11 +299,10 @@ class InventoryModule(QWidget):
 
     def edit_product(self, product_id):
         try:
-            conn = sqlite3.connect('pos_database.db')
+            conn = get_connection()
             c = conn.cursor()
             c.execute("SELECT nombre, precio, stock, proveedor_id, imagen FROM productos WHERE id = ?", (product_id,))
             product = c.fetchone()
-            conn.close()
 
             if product:
                 dialog = QDialog(self)
@@ -359,11 +378,10 @@ class InventoryModule(QWidget):
 
     def load_suppliers_for_combo(self, combo, current_supplier_id):
         try:
-            conn = sqlite3.connect('pos_database.db')
+            conn = get_connection()
             c = conn.cursor()
             c.execute("SELECT id, nombre FROM proveedores")
             suppliers = c.fetchall()
-            conn.close()
 
             combo.clear()
             combo.addItem("Seleccione un proveedor", None)
@@ -377,15 +395,13 @@ class InventoryModule(QWidget):
 
     def update_product(self, product_id, name, price, stock, supplier_id, image_path):
         try:
-            conn = sqlite3.connect('pos_database.db')
-            c = conn.cursor()
-            c.execute("""
+            writer.execute("""
                 UPDATE productos
                 SET nombre = ?, precio = ?, stock = ?, proveedor_id = ?, imagen = ?
                 WHERE id = ?
             """, (name, price, stock, supplier_id, image_path, product_id))
-            conn.commit()
-            conn.close()
+            get_catalog().refresh(product_id)
+            events.publish(events.STOCK, {product_id: stock})
 
             self.load_products()
             self.inventory_updated.emit()
@@ -400,11 +416,9 @@ class InventoryModule(QWidget):
 
         if reply == QMessageBox.StandardButton.Yes:
             try:
-                conn = sqlite3.connect('pos_database.db')
-                c = conn.cursor()
-                c.execute("DELETE FROM productos WHERE id = ?", (product_id,))
-                conn.commit()
-                conn.close()
+                writer.execute("DELETE FROM productos WHERE id = ?", (product_id,))
+                get_catalog().remove(product_id)
+                events.publish(events.STOCK, {product_id: None})
 
                 self.load_products()
                 self.inventory_updated.emit()
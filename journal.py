@@ -0,0 +1,280 @@
+"""Diario local de ventas: la caja cobra sin esperar a pos_database.db.
+
+append_sale() escribe la venta al final de un archivo local (JOURNAL_PATH,
+uno por caja y en un disco de la propia caja) y vuelve enseguida; un hilo
+hace fsync del archivo cada FSYNC_INTERVAL segundos para todas las ventas
+escritas mientras tanto, y otro pasa las ventas a la base por el escritor
+único (sales.submit_sale) en grupos de hasta DRAIN_BATCH. Cobrar cuesta
+escribir unos cientos de bytes, por lenta o disputada que esté la base.
+
+Cada registro es <longitud uint32><crc32 uint32><venta en JSON>, en
+little-endian. El archivo se lee mapeado en memoria. Al arrancar, start()
+recorre los registros, corta el final si quedó a medio escribir (o con un
+CRC que no cuadra) y vuelve a enviar todo lo que queda: cada venta lleva una
+clave de idempotencia, así que las que ya estaban en la base no se repiten.
+Cuando todo el diario está en la base se vacía.
+
+Si la base no responde (bloqueada, disco de red caído) las ventas se quedan
+en el diario y se reintentan cada vez más espaciadas, hasta RETRY_MAX
+segundos. Una venta que la base rechaza por otro motivo se aparta en
+REJECTED_PATH, con el error, para revisarla a mano.
+"""
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+import traceback
+import uuid
+import zlib
+from datetime import datetime, timezone
+
+import sales
+
+JOURNAL_PATH = "ventas.diario"
+REJECTED_PATH = "ventas.diario.rechazadas"
+
+HEADER = struct.Struct("<II")  # longitud y crc32 del contenido
+MAX_RECORD_BYTES = 1024 * 1024
+
+# Un fsync por grupo de ventas escritas en este intervalo
+FSYNC_INTERVAL = 0.005
+# Ventas enviadas al escritor por vuelta
+DRAIN_BATCH = 256
+# Espera entre reintentos cuando la base no responde (se duplica hasta RETRY_MAX)
+RETRY_DELAY = 0.5
+RETRY_MAX = 30
+
+
+def read_records(fd, start, end):
+    """Genera (fin, contenido) de cada registro válido entre start y end.
+
+    Se detiene en el primer registro incompleto o con CRC incorrecto.
+    """
+    if end <= start:
+        return
+    with mmap.mmap(fd, end, access=mmap.ACCESS_READ) as view:
+        offset = start
+        while offset + HEADER.size <= end:
+            length, crc = HEADER.unpack_from(view, offset)
+            body_start = offset + HEADER.size
+            body_end = body_start + length
+            if length > MAX_RECORD_BYTES or body_end > end:
+                return
+            body = view[body_start:body_end]
+            if zlib.crc32(body) != crc:
+                return
+            offset = body_end
+            yield offset, body
+
+
+def _write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+class SaleJournal:
+    def __init__(self, path=None):
+        self.path = path
+        self._fd = None
+        self._cond = threading.Condition()
+        # Bytes escritos, con fsync y ya confirmados en la base. Se vuelven a
+        # 0 al vaciar el diario; la generación dice si ocurrió entre medias
+        self._size = 0
+        self._synced = 0
+        self._drained = 0
+        self._generation = 0
+        self._stopping = False
+        self._threads = []
+        self._appended = 0
+        self._applied = 0
+        self._fsyncs = 0
+        self._rejected = 0
+
+    def start(self):
+        """Abre el diario, corta un final dañado y empieza a pasarlo a la base."""
+        with self._cond:
+            if self._fd is not None:
+                return
+            flags = os.O_RDWR | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0)
+            fd = os.open(self.path or JOURNAL_PATH, flags, 0o644)
+            size = os.fstat(fd).st_size
+            valid = 0
+            for valid, _ in read_records(fd, 0, size):
+                pass
+            if valid < size:
+                os.ftruncate(fd, valid)
+                os.fsync(fd)
+            self._fd = fd
+            self._size = self._synced = valid
+            self._drained = 0
+            self._stopping = False
+            self._threads = [
+                threading.Thread(target=self._flush_loop, name="diario-fsync", daemon=True),
+                threading.Thread(target=self._drain_loop, name="diario-base", daemon=True),
+            ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=5):
+        """Espera (hasta timeout) a que el diario llegue a la base y lo cierra.
+
+        Lo que no llegue se reenvía en el siguiente start(). Si un hilo sigue
+        ocupado (esperando a la base) el archivo queda abierto para él.
+        """
+        with self._cond:
+            if self._fd is None:
+                return
+            self._stopping = True
+            self._cond.notify_all()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0, deadline - time.monotonic()))
+        with self._cond:
+            if any(thread.is_alive() for thread in self._threads):
+                return
+            os.fsync(self._fd)
+            os.close(self._fd)
+            self._fd = None
+
+    def append_sale(self, items, customer_id=None, user_id=None, total=None, durable=False):
+        """Anota una venta y devuelve (clave, fecha) sin esperar a la base.
+
+        fecha es la que tendrá la venta en la base (UTC, como datetime('now')).
+        Con durable=True espera además al fsync del grupo (unos pocos ms).
+        Lanza OSError si no se pudo escribir en el diario.
+        """
+        key = uuid.uuid4().hex
+        # La venta se fecha al cobrar, no al llegar a la base
+        when = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        body = json.dumps({
+            "clave": key,
+            "lineas": sales.normalize_items(items),
+            "cliente_id": customer_id,
+            "user_id": user_id,
+            "total": total,
+            "fecha": when,
+        }, separators=(",", ":")).encode()
+        record = HEADER.pack(len(body), zlib.crc32(body)) + body
+        with self._cond:
+            if self._fd is None or self._stopping:
+                raise OSError("El diario de ventas no está abierto")
+            _write_all(self._fd, record)
+            self._size += len(record)
+            self._appended += 1
+            target, generation = self._size, self._generation
+            self._cond.notify_all()
+            if durable:
+                while self._synced < target and self._generation == generation:
+                    self._cond.wait()
+        return key, when
+
+    def stats(self):
+        with self._cond:
+            return {
+                "anotadas": self._appended,
+                "en_base": self._applied,
+                "rechazadas": self._rejected,
+                "fsyncs": self._fsyncs,
+                "pendiente_bytes": self._size - self._drained,
+            }
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while self._synced >= self._size and not self._stopping:
+                    self._cond.wait()
+                if self._synced >= self._size:
+                    return
+            # Deja que se junten más ventas en el mismo fsync
+            time.sleep(FSYNC_INTERVAL)
+            with self._cond:
+                target, generation = self._size, self._generation
+            os.fsync(self._fd)
+            with self._cond:
+                if generation == self._generation:
+                    self._synced = max(self._synced, target)
+                self._fsyncs += 1
+                self._cond.notify_all()
+
+    def _drain_loop(self):
+        delay = RETRY_DELAY
+        while True:
+            with self._cond:
+                while self._drained >= self._size and not self._stopping:
+                    self._cond.wait()
+                if self._drained >= self._size:
+                    return
+                start, end, generation = self._drained, self._size, self._generation
+
+            drained, retry = self._drain(start, end)
+            with self._cond:
+                if generation == self._generation:
+                    self._drained = drained
+                    if self._drained == self._size:
+                        # Todo está en la base: el diario vuelve a empezar
+                        os.ftruncate(self._fd, 0)
+                        self._size = self._synced = self._drained = 0
+                        self._generation += 1
+                        self._cond.notify_all()
+                stopping = self._stopping
+            if retry:
+                with self._cond:
+                    # stop() interrumpe la espera: lo pendiente queda en el diario
+                    if stopping or self._cond.wait_for(lambda: self._stopping, delay):
+                        return
+                delay = min(delay * 2, RETRY_MAX)
+            else:
+                delay = RETRY_DELAY
+
+    def _drain(self, start, end):
+        """Envía un grupo al escritor; devuelve (hasta dónde llegó, si hay que reintentar)."""
+        pending = []
+        retry = False
+        for offset, body in read_records(self._fd, start, end):
+            sale = json.loads(body)
+            try:
+                future = sales.submit_sale(
+                    sale["lineas"], sale["cliente_id"], sale["user_id"], sale["total"], sale["clave"], sale["fecha"]
+                )
+            except RuntimeError:
+                # El escritor ya se detuvo (la aplicación se está cerrando)
+                retry = True
+                break
+            pending.append((offset, body, future))
+            if len(pending) == DRAIN_BATCH:
+                break
+
+        drained = start
+        for offset, body, future in pending:
+            try:
+                future.result()
+            except sqlite3.OperationalError:
+                # Base bloqueada o inaccesible: esta venta y las siguientes se
+                # reintentan (las que sí entraron no se repiten por su clave)
+                traceback.print_exc()
+                return drained, True
+            except Exception as error:
+                traceback.print_exc()
+                self._reject(body, error)
+            else:
+                with self._cond:
+                    self._applied += 1
+            drained = offset
+        return drained, retry
+
+    def _reject(self, body, error):
+        with open(REJECTED_PATH, "a", encoding="utf-8") as out:
+            out.write(json.dumps({"venta": json.loads(body), "error": str(error)}, ensure_ascii=False) + "\n")
+        with self._cond:
+            self._rejected += 1
+
+
+_journal = SaleJournal()
+
+
+def get_journal():
+    return _journal
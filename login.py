@@ -23,9 +23,8 @@ from PyQt6.QtCore import (
     pyqtSignal
 )
 from PyQt6.QtGui import QColor, QIcon, QPainter, QLinearGradient
-import bcrypt
-import sqlite3
-import bcrypt
+
+from database import get_connection
 
 class GradientWidget(QWidget):
     def __init__(self, start_color, end_color, *args, **kwargs):
@@ -198,13 +197,15 @@ class LoginModule(QWidget):
             username = self.username_input.text()
             password = self.password_input.text()
 
-            conn = sqlite3.connect("pos_database.db")
+            conn = get_connection()
             c = conn.cursor()
             c.execute("SELECT id, password FROM usuarios WHERE username=?", (username,))
             user = c.fetchone()
-            conn.close()
 
             if user:
+                # bcrypt tarda en importarse: solo hace falta al validar
+                import bcrypt
+
                 user_id, hashed_password = user
                 if bcrypt.checkpw(password.encode('utf-8'), hashed_password):
                     self.message_label.setText("Login successful!")
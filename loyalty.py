@@ -1,5 +1,7 @@
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton, QLineEdit, QTableWidget, QTableWidgetItem
-import sqlite3
+
+import writer
+from database import get_connection
 
 class LoyaltyModule(QWidget):
     def __init__(self):
@@ -31,12 +33,8 @@ class LoyaltyModule(QWidget):
         customer_id = int(self.customer_id_input.text())
         points = int(self.points_input.text())
 
-        conn = sqlite3.connect('pos_database.db')
-        c = conn.cursor()
-        c.execute("INSERT OR REPLACE INTO puntos (cliente_id, cantidad) VALUES (?, coalesce((SELECT cantidad FROM puntos WHERE cliente_id = ?) + ?, ?))",
-                  (customer_id, customer_id, points, points))
-        conn.commit()
-        conn.close()
+        writer.execute("INSERT OR REPLACE INTO puntos (cliente_id, cantidad) VALUES (?, coalesce((SELECT cantidad FROM puntos WHERE cliente_id = ?) + ?, ?))",
+                       (customer_id, customer_id, points, points))
 
         self.load_loyalty_data()
 
@@ -44,21 +42,16 @@ class LoyaltyModule(QWidget):
         customer_id = int(self.customer_id_input.text())
         points = int(self.points_input.text())
 
-        conn = sqlite3.connect('pos_database.db')
-        c = conn.cursor()
-        c.execute("UPDATE puntos SET cantidad = cantidad - ? WHERE cliente_id = ? AND cantidad >= ?",
-                  (points, customer_id, points))
-        conn.commit()
-        conn.close()
+        writer.execute("UPDATE puntos SET cantidad = cantidad - ? WHERE cliente_id = ? AND cantidad >= ?",
+                       (points, customer_id, points))
 
         self.load_loyalty_data()
 
     def load_loyalty_data(self):
-        conn = sqlite3.connect('pos_database.db')
+        conn = get_connection()
         c = conn.cursor()
         c.execute("SELECT c.id, c.nombre, COALESCE(p.cantidad, 0) FROM clientes c LEFT JOIN puntos p ON c.id = p.cliente_id")
         loyalty_data = c.fetchall()
-        conn.close()
 
         self.loyalty_table.setRowCount(0)
         for row, data in enumerate(loyalty_data):
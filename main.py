@@ -1,5 +1,12 @@
+import importlib
 import sys
-import types
+import threading
+
+import tracing
+
+# Antes de importar Qt y los módulos, para que la traza los incluya
+tracing.start(sys.argv)
+
 from PyQt6.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -16,22 +23,73 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt, QPropertyAnimation, QEasingCurve, QSize, QTimer, pyqtSignal
 from PyQt6.QtGui import QColor, QIcon, QFontDatabase, QFont
-import sqlite3
 
 # Modules
 from login import LoginModule
-from pos import POSModule
-from inventory import InventoryModule
-from customers import CustomersModule
-from suppliers import SuppliersModule
-from estadisticas import StatisticsModule
-from Historial import SalesHistoryWidget
-from calculator import CalculatorModule
-from settings import SettingsModule
-from local_server import LocalServerModule
-from dashboard import DashboardModule
-from myprofile import ProfileModule
-from register import RegisterModule
+from catalog import get_catalog
+import writer
+from journal import get_journal
+from database import get_connection
+from schema import migrate, optimize
+
+# (texto, icono, módulo, clase) de la barra lateral. Las clases se importan y
+# construyen al abrirlas o en la precarga tras el login, no al arrancar: la
+# pantalla de login solo necesita LoginModule
+MODULES = [
+    ("Dashboard", "dashboard_icon.png", "dashboard", "DashboardModule"),
+    ("Punto De Venta", "pos_icon.png", "pos", "POSModule"),
+    ("Inventario", "inventory_icon.png", "inventory", "InventoryModule"),
+    ("Clientes", "customers_icon.png", "customers", "CustomersModule"),
+    ("Proveedores", "suppliers_icon.png", "suppliers", "SuppliersModule"),
+    ("Reportes", "statistics_icon.png", "estadisticas", "StatisticsModule"),
+    ("Historial", "Historial.png", "Historial", "SalesHistoryWidget"),
+    ("Calculadora", "calculator_icon.png", "calculator", "CalculatorModule"),
+    ("Configuracion", "settings_icon.png", "settings", "SettingsModule"),
+    ("Mi Perfil", "profile_icon.png", "myprofile", "ProfileModule"),
+]
+MODULE_PATHS = {name: module for _, _, module, name in MODULES}
+HOME_MODULE = "DashboardModule"
+# Necesita el usuario con sesión: se construye en cada login
+PROFILE_MODULE = "ProfileModule"
+
+
+def module_class(name):
+    return getattr(importlib.import_module(MODULE_PATHS[name]), name)
+
+
+def preload():
+    """Importa los módulos de la barra lateral y calienta el catálogo.
+
+    Corre en un hilo mientras se muestra el login: plotly ya no está, pero
+    QtCharts, bcrypt y el resto de módulos tardan en importarse. Los widgets
+    se construyen después en el hilo de la interfaz; los que escuchan al
+    catálogo reciben su aviso en ese hilo.
+    """
+    for module in MODULE_PATHS.values():
+        with tracing.span(f"import {module}", "import"):
+            importlib.import_module(module)
+    with tracing.span("catalogo"):
+        get_catalog().warm()
+
+
+def predicted_order():
+    """Módulos de más a menos usados según uso_modulos; empates en orden de la barra."""
+    usage = dict(get_connection().execute("SELECT modulo, usos FROM uso_modulos").fetchall())
+    names = [name for _, _, _, name in MODULES]
+    return sorted(names, key=lambda name: -usage.get(name, 0))
+
+
+def _count_module_use(conn, name):
+    conn.execute(
+        """INSERT INTO uso_modulos (modulo, usos) VALUES (?, 1)
+           ON CONFLICT (modulo) DO UPDATE SET usos = usos + 1""",
+        (name,),
+    )
+
+
+def record_module_use(name):
+    # Es solo para ordenar la precarga: no se espera el commit
+    writer.submit(_count_module_use, name)
 
 
 class AnimatedButton(QWidget):
@@ -124,26 +182,12 @@ class MainWindow(QMainWindow):
         main_layout.addWidget(self.sidebar)
         self.sidebar.setVisible(False)
 
-        modules = [
-            ("Dashboard", "dashboard_icon.png", DashboardModule),
-            ("Punto De Venta", "pos_icon.png", POSModule),
-            ("Inventario", "inventory_icon.png", InventoryModule),
-            ("Clientes", "customers_icon.png", CustomersModule),
-            ("Proveedores", "suppliers_icon.png", SuppliersModule),
-            ("Reportes", "statistics_icon.png", StatisticsModule),
-            ("Historial", "Historial.png", SalesHistoryWidget),
-            ("Calculadora", "calculator_icon.png", CalculatorModule),
-            ("Configuracion", "settings_icon.png", SettingsModule),
-            ("Mi Perfil", "profile_icon.png", ProfileModule),
-        ]
-
-
         self.sidebar_buttons = []
 
         def connect_button(button, module):
             button.clicked.connect(lambda: self.on_sidebar_button_clicked(module))
 
-        for text, icon, module in modules:
+        for text, icon, _, module in MODULES:
             button = AnimatedButton(text, icon)
             sidebar_layout.addWidget(button)
             self.sidebar_buttons.append(button)
@@ -152,25 +196,50 @@ class MainWindow(QMainWindow):
         self.content_area = QStackedWidget()
         main_layout.addWidget(self.content_area, 1)
 
+        # Nombre de clase -> widget ya construido
         self.modules = {}
-        for _, _, module in modules:
-            if module != ProfileModule:
-                self.modules[module] = module()
-                self.content_area.addWidget(self.modules[module])
+        self.pending_modules = []
 
         self.login_module = LoginModule()
         self.login_module.login_success.connect(self.on_login_success)
         self.login_module.show_register_form.connect(self.show_register_form)
         self.content_area.addWidget(self.login_module)
 
-        self.register_module = RegisterModule()
-        self.register_module.registro_exitoso.connect(self.on_register_success)
-        self.register_module.regresar_signal.connect(self.show_login_form)
-        self.content_area.addWidget(self.register_module)
+        self.register_module = None
 
         self.content_area.setCurrentWidget(self.login_module)
 
+    def ensure_module(self, name):
+        """Widget del módulo, importándolo y construyéndolo si aún no existe."""
+        if name == PROFILE_MODULE:
+            if not hasattr(self, "profile_module"):
+                with tracing.span(name, "modulo"):
+                    self.profile_module = module_class(name)(self.user_id)
+                self.content_area.addWidget(self.profile_module)
+            return self.profile_module
+        widget = self.modules.get(name)
+        if widget is None:
+            with tracing.span(name, "modulo"):
+                widget = module_class(name)()
+            self.modules[name] = widget
+            self.content_area.addWidget(widget)
+        return widget
+
+    def build_next_module(self):
+        # Un módulo por vuelta del bucle de eventos: la interfaz sigue respondiendo
+        if not self.is_logged_in or not self.pending_modules:
+            return
+        self.ensure_module(self.pending_modules.pop(0))
+        QTimer.singleShot(0, self.build_next_module)
+
     def show_register_form(self):
+        if self.register_module is None:
+            from register import RegisterModule
+
+            self.register_module = RegisterModule()
+            self.register_module.registro_exitoso.connect(self.on_register_success)
+            self.register_module.regresar_signal.connect(self.show_login_form)
+            self.content_area.addWidget(self.register_module)
         self.content_area.setCurrentWidget(self.register_module)
 
     def show_login_form(self):
@@ -193,22 +262,15 @@ class MainWindow(QMainWindow):
         for button in self.sidebar_buttons:
             button.setChecked(button == sender)
 
-        if module == ProfileModule:
-            if not hasattr(self, "profile_module"):
-                self.profile_module = ProfileModule(self.user_id)
-                self.content_area.addWidget(self.profile_module)
-            widget = self.profile_module
-        else:
-            # Inicializar el módulo solo cuando se necesite
-            if isinstance(self.modules[module], types.LambdaType):
-                self.modules[module] = self.modules[module]()
-                self.content_area.addWidget(self.modules[module])
-            widget = self.modules[module]
-
+        # Inicializar el módulo solo cuando se necesite
+        widget = self.ensure_module(module)
+        if module in self.pending_modules:
+            self.pending_modules.remove(module)
+        record_module_use(module)
 
         if self.content_area.currentWidget() == widget:
             QMessageBox.information(
-                self, "Info", f"Ya estás en el módulo de {module.__name__}."
+                self, "Info", f"Ya estás en el módulo de {module}."
             )
             return
 
@@ -245,7 +307,13 @@ class MainWindow(QMainWindow):
         self.is_logged_in = True
         self.user_id = user_id
         self.sidebar.setVisible(True)
-        self.content_area.setCurrentWidget(self.modules[DashboardModule])
+        self.content_area.setCurrentWidget(self.ensure_module(HOME_MODULE))
+        # El resto se construye en segundo plano, del más usado al menos usado
+        self.pending_modules = [
+            name for name in predicted_order()
+            if name not in self.modules and name != PROFILE_MODULE
+        ]
+        QTimer.singleShot(0, self.build_next_module)
 
     def on_logout(self):
         self.is_logged_in = False
@@ -257,166 +325,35 @@ class MainWindow(QMainWindow):
         self.content_area.setCurrentWidget(self.login_module)
 
 
-def create_database():
-    conn = sqlite3.connect("pos_database.db")
-    c = conn.cursor()
-
-    c.execute(
-        """
-    CREATE TABLE IF NOT EXISTS usuarios (
-        id INTEGER PRIMARY KEY,
-        username TEXT,
-        password TEXT,
-        role TEXT,
-        email TEXT,
-        login_time TEXT,
-        logout_time TEXT,
-        profile_picture TEXT,
-        created_at TEXT
-    )
-    """
-    )
-
-    c.execute(
-        """
-    CREATE TABLE IF NOT EXISTS user_notes (
-        user_id INTEGER PRIMARY KEY,
-        notes TEXT,
-        FOREIGN KEY (user_id) REFERENCES usuarios (id)
-    )
-    """
-    )
-
-    c.execute(
-        """
-    CREATE TABLE IF NOT EXISTS user_goals (
-        id INTEGER PRIMARY KEY,
-        user_id INTEGER,
-        goal TEXT,
-        target_date TEXT,
-        completed INTEGER DEFAULT 0,
-        FOREIGN KEY (user_id) REFERENCES usuarios (id)
-    )
-    """
-    )
-
-    c.execute(
-        """
-        CREATE TABLE IF NOT EXISTS ventas (
-            id INTEGER PRIMARY KEY,
-            user_id INTEGER,
-            cliente_id INTEGER,  -- Nueva columna para referenciar a clientes
-            fecha TEXT,
-            total REAL,
-            FOREIGN KEY (user_id) REFERENCES usuarios (id),
-            FOREIGN KEY (cliente_id) REFERENCES clientes (id)
-        )
-        """
-    )
-
-
-    c.execute(
-        """CREATE TABLE IF NOT EXISTS productos
-                 (id INTEGER PRIMARY KEY,
-                 nombre TEXT, 
-                 precio REAL, 
-                 stock INTEGER, 
-                 proveedor_id INTEGER, 
-                 imagen TEXT,
-                 FOREIGN KEY (proveedor_id) REFERENCES proveedores(id))"""
-    )
-    c.execute(
-        """
-        CREATE TABLE IF NOT EXISTS detalles_venta (
-            id INTEGER PRIMARY KEY,
-            venta_id INTEGER,
-            producto_id INTEGER,
-            cantidad REAL,
-            precio REAL,
-            precio_unitario REAL,
-            FOREIGN KEY (venta_id) REFERENCES ventas (id),
-            FOREIGN KEY (producto_id) REFERENCES productos (id)
-        )
-        """
-    )
-
-    c.execute(
-        """CREATE TABLE IF NOT EXISTS roles
-                 (id INTEGER PRIMARY KEY, nombre TEXT)"""
-    )
-
-    c.execute(
-        """CREATE TABLE IF NOT EXISTS permisos
-                 (id INTEGER PRIMARY KEY, nombre TEXT)"""
-    )
-
-    c.execute(
-        """CREATE TABLE IF NOT EXISTS roles_permisos
-                 (id INTEGER PRIMARY KEY, role_id INTEGER, permiso_id INTEGER,
-                 FOREIGN KEY (role_id) REFERENCES roles(id),
-                 FOREIGN KEY (permiso_id) REFERENCES permisos(id))"""
-    )
-
-    c.execute(
-        """CREATE TABLE IF NOT EXISTS proveedores
-                 (id INTEGER PRIMARY KEY, nombre TEXT, contacto TEXT, telefono TEXT, email TEXT)"""
-    )
-
-    c.execute(
-        """CREATE TABLE IF NOT EXISTS metodos_pago
-                 (id INTEGER PRIMARY KEY, nombre TEXT)"""
-    )
-
-    c.execute(
-        """CREATE TABLE IF NOT EXISTS cortes_caja
-                 (id INTEGER PRIMARY KEY, fecha TEXT, monto_inicial REAL, monto_final REAL)"""
-    )
-
-    c.execute(
-        """CREATE TABLE IF NOT EXISTS arqueos
-                 (id INTEGER PRIMARY KEY, fecha TEXT, monto_sistema REAL, monto_fisico REAL, 
-                 diferencia REAL)"""
-    )
-
-    c.execute(
-        """CREATE TABLE IF NOT EXISTS promociones
-                 (id INTEGER PRIMARY KEY, nombre TEXT, descripcion TEXT, 
-                 fecha_inicio TEXT, fecha_fin TEXT, descuento REAL)"""
-    )
-
-    c.execute(
-        """CREATE TABLE IF NOT EXISTS clientes
-                 (id INTEGER PRIMARY KEY, nombre TEXT, email TEXT, telefono TEXT)"""
-    )
-
-    c.execute(
-        """CREATE TABLE IF NOT EXISTS puntos
-                 (id INTEGER PRIMARY KEY, cliente_id INTEGER, cantidad INTEGER,
-                 FOREIGN KEY (cliente_id) REFERENCES clientes(id))"""
-    )
-
-    c.execute(
-        """CREATE TABLE IF NOT EXISTS estadisticas
-                 (id INTEGER PRIMARY KEY, fecha TEXT, tipo TEXT, valor REAL)"""
-    )
-
-    c.execute(
-        """CREATE TABLE IF NOT EXISTS notas
-                 (id INTEGER PRIMARY KEY, titulo TEXT, contenido TEXT, fecha TEXT)"""
-    )
-
-    c.execute(
-        """CREATE TABLE IF NOT EXISTS respaldo_automatico
-                 (id INTEGER PRIMARY KEY, fecha TEXT, ruta TEXT)"""
-    )
-
-    conn.commit()
-    conn.close()
-
-
 if __name__ == "__main__":
-    create_database()
-    app = QApplication(sys.argv)
-    window = MainWindow()
-    window.show()
-    sys.exit(app.exec())
+    # Esquema base y migraciones; en una base al día solo lee user_version
+    with tracing.span("migrate"):
+        migrate()
+    with tracing.span("diario"):
+        # Reenvía a la base las ventas que quedaron en el diario al cerrar
+        get_journal().start()
+    with tracing.span("QApplication"):
+        app = QApplication(sys.argv)
+    # El diario termina de pasar sus ventas antes de que pare el escritor, y
+    # este confirma lo que quede en su cola antes de optimizar y salir
+    app.aboutToQuit.connect(get_journal().stop)
+    app.aboutToQuit.connect(writer.get_writer().stop)
+    app.aboutToQuit.connect(optimize)
+    with tracing.span("MainWindow"):
+        window = MainWindow()
+    with tracing.span("show"):
+        window.show()
+    threading.Thread(target=preload, daemon=True, name="precarga").start()
+
+    def login_ready():
+        # Primera vuelta del bucle de eventos: el login ya se pintó
+        tracing.mark("login_listo")
+        tracing.write()
+        if tracing.exit_when_ready():
+            app.quit()
+
+    if tracing.active():
+        QTimer.singleShot(0, login_ready)
+    status = app.exec()
+    tracing.write()
+    sys.exit(status)
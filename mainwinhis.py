@@ -41,6 +41,10 @@ from PyQt6.QtGui import (
 )
 from PyQt6.QtCore import Qt, QSize, QDate, QTimer, QPropertyAnimation, QEasingCurve, QTime
 
+import rollups
+from database import get_connection
+from schema import migrate
+
 [... Las clases anteriores se mantienen igual hasta SalesHistoryWidget ...]
 
 class SalesHistoryWidget(QWidget):
@@ -57,48 +61,12 @@ class SalesHistoryWidget(QWidget):
 
     def setup_database(self):
         """Configura la base de datos y añade datos de ejemplo si está vacía"""
-        conn = sqlite3.connect("pos_database.db")
+        # Las tablas las define schema.py, igual que para la aplicación principal;
+        # en una base al día migrate() solo lee PRAGMA user_version
+        migrate()
+        conn = get_connection()
         cursor = conn.cursor()
 
-        # Crear las tablas si no existen
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS clientes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nombre TEXT NOT NULL
-            )
-        """)
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS productos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nombre TEXT NOT NULL,
-                precio REAL NOT NULL
-            )
-        """)
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS ventas (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                cliente_id INTEGER,
-                fecha TEXT NOT NULL,
-                total REAL NOT NULL,
-                FOREIGN KEY (cliente_id) REFERENCES clientes (id)
-            )
-        """)
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS detalles_venta (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                venta_id INTEGER,
-                producto_id INTEGER,
-                cantidad INTEGER NOT NULL,
-                precio_unitario REAL NOT NULL,
-                precio REAL NOT NULL,
-                FOREIGN KEY (venta_id) REFERENCES ventas (id),
-                FOREIGN KEY (producto_id) REFERENCES productos (id)
-            )
-        """)
-
         # Verificar si hay datos
         cursor.execute("SELECT COUNT(*) FROM ventas")
         if cursor.fetchone()[0] == 0:
@@ -154,8 +122,10 @@ class SalesHistoryWidget(QWidget):
                     (venta_total, venta_id)
                 )
 
+            # Los datos de ejemplo no pasan por record_sale
+            rollups.rebuild(conn)
+
         conn.commit()
-        conn.close()
 
     def init_ui(self):
         [... Código del init_ui anterior ...]
@@ -11,6 +11,10 @@ from datetime import datetime, timedelta
 import os
 import shutil
 
+import rollups
+import writer
+from database import get_connection
+
 class ProfileModule(QWidget):
     logout_signal = pyqtSignal()
 
@@ -217,7 +221,7 @@ class ProfileModule(QWidget):
 
     def load_goals(self):
         try:
-            conn = sqlite3.connect("pos_database.db")
+            conn = get_connection()
             c = conn.cursor()
             
             c.execute("SELECT id, goal, target_date, completed FROM user_goals WHERE user_id = ?", (self.user_id,))
@@ -229,9 +233,6 @@ class ProfileModule(QWidget):
                 self.goals_list.addItem(f"{goal} - Fecha objetivo: {target_date} - Estado: {status}")
         except sqlite3.Error as e:
             QMessageBox.critical(self, "Error de Base de Datos", f"Error al cargar los objetivos: {str(e)}")
-        finally:
-            if conn:
-                conn.close()
 
     def add_goal(self):
         goal, ok = QInputDialog.getText(self, "Añadir Objetivo", "Ingrese su nuevo objetivo:")
@@ -239,47 +240,33 @@ class ProfileModule(QWidget):
             target_date, ok = QInputDialog.getText(self, "Fecha Objetivo", "Ingrese la fecha objetivo (YYYY-MM-DD):")
             if ok and target_date:
                 try:
-                    conn = sqlite3.connect("pos_database.db")
-                    c = conn.cursor()
-                    
-                    c.execute("INSERT INTO user_goals (user_id, goal, target_date) VALUES (?, ?, ?)",
-                              (self.user_id, goal, target_date))
-                    conn.commit()
+                    writer.execute("INSERT INTO user_goals (user_id, goal, target_date) VALUES (?, ?, ?)",
+                                   (self.user_id, goal, target_date))
                     
                     QMessageBox.information(self, "Éxito", "Objetivo añadido correctamente.")
                     self.load_goals()
                 except sqlite3.Error as e:
                     QMessageBox.critical(self, "Error de Base de Datos", f"Error al añadir el objetivo: {str(e)}")
-                finally:
-                    if conn:
-                        conn.close()
 
     def complete_goal(self):
         current_item = self.goals_list.currentItem()
         if current_item:
             goal_text = current_item.text().split(" - ")[0]
             try:
-                conn = sqlite3.connect("pos_database.db")
-                c = conn.cursor()
-                
-                c.execute("UPDATE user_goals SET completed = 1 WHERE user_id = ? AND goal = ?",
-                          (self.user_id, goal_text))
-                conn.commit()
+                writer.execute("UPDATE user_goals SET completed = 1 WHERE user_id = ? AND goal = ?",
+                               (self.user_id, goal_text))
                 
                 QMessageBox.information(self, "Éxito", "Objetivo marcado como completado.")
                 self.load_goals()
             except sqlite3.Error as e:
                 QMessageBox.critical(self, "Error de Base de Datos", f"Error al completar el objetivo: {str(e)}")
-            finally:
-                if conn:
-                    conn.close()
         else:
             QMessageBox.warning(self, "Advertencia", "Por favor, seleccione un objetivo para marcar como completado.")
 
     # Nuevo método para exportar datos del usuario
     def export_user_data(self):
         try:
-            conn = sqlite3.connect("pos_database.db")
+            conn = get_connection()
             c = conn.cursor()
             
             c.execute("SELECT * FROM usuarios WHERE id = ?", (self.user_id,))
@@ -302,9 +289,6 @@ class ProfileModule(QWidget):
                 QMessageBox.information(self, "Éxito", "Datos exportados correctamente.")
         except sqlite3.Error as e:
             QMessageBox.critical(self, "Error de Base de Datos", f"Error al exportar los datos: {str(e)}")
-        finally:
-            if conn:
-                conn.close()
                 
     def create_action_buttons(self, layout):
         action_group = QGroupBox("Acciones")
@@ -500,7 +484,7 @@ class ProfileModule(QWidget):
 
     def load_user_data(self):
         try:
-            conn = sqlite3.connect("pos_database.db")
+            conn = get_connection()
             c = conn.cursor()
             
             # Verificar si la columna user_id existe en la tabla ventas
@@ -549,8 +533,7 @@ class ProfileModule(QWidget):
 
             # Cargar estadísticas del usuario
             if 'user_id' in columns:
-                c.execute("SELECT SUM(total) FROM ventas WHERE user_id = ?", (self.user_id,))
-                total_sales = c.fetchone()[0] or 0
+                total_sales = rollups.user_total(self.user_id, conn)
                 self.total_sales_label.setText(f"Ventas totales: ${total_sales:.2f}")
             else:
                 self.total_sales_label.setText("Ventas totales: No disponible")
@@ -581,9 +564,6 @@ class ProfileModule(QWidget):
 
         except sqlite3.Error as e:
             QMessageBox.critical(self, "Error de Base de Datos", f"Error al cargar los datos del usuario: {str(e)}")
-        finally:
-            if conn:
-                conn.close()
     def start_session_timer(self):
         self.session_start = datetime.now()
         self.timer = QTimer(self)
@@ -659,11 +639,7 @@ class ProfileModule(QWidget):
 
     def save_profile(self, username, email, dialog):
         try:
-            conn = sqlite3.connect("pos_database.db")
-            c = conn.cursor()
-            
-            c.execute("UPDATE usuarios SET username = ?, email = ? WHERE id = ?", (username, email, self.user_id))
-            conn.commit()
+            writer.execute("UPDATE usuarios SET username = ?, email = ? WHERE id = ?", (username, email, self.user_id))
 
             self.username_label.setText(username)
             self.email_label.setText(email)
@@ -672,9 +648,6 @@ class ProfileModule(QWidget):
             QMessageBox.information(self, "Éxito", "Perfil actualizado correctamente.")
         except sqlite3.Error as e:
             QMessageBox.critical(self, "Error de Base de Datos", f"Error al actualizar el perfil: {str(e)}")
-        finally:
-            if conn:
-                conn.close()
 
     def change_password(self):
         dialog = QDialog(self)
@@ -747,7 +720,7 @@ class ProfileModule(QWidget):
             return
 
         try:
-            conn = sqlite3.connect("pos_database.db")
+            conn = get_connection()
             c = conn.cursor()
             
             c.execute("SELECT password FROM usuarios WHERE id = ?", (self.user_id,))
@@ -757,32 +730,21 @@ class ProfileModule(QWidget):
                 QMessageBox.warning(self, "Error", "La contraseña actual es incorrecta.")
                 return
 
-            c.execute("UPDATE usuarios SET password = ? WHERE id = ?", (new_password, self.user_id))
-            conn.commit()
+            writer.execute("UPDATE usuarios SET password = ? WHERE id = ?", (new_password, self.user_id))
 
             dialog.accept()
             QMessageBox.information(self, "Éxito", "Contraseña actualizada correctamente.")
         except sqlite3.Error as e:
             QMessageBox.critical(self, "Error de Base de Datos", f"Error al actualizar la contraseña: {str(e)}")
-        finally:
-            if conn:
-                conn.close()
 
     def logout(self):
         try:
-            conn = sqlite3.connect("pos_database.db")
-            c = conn.cursor()
-            
             logout_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            c.execute("UPDATE usuarios SET logout_time = ? WHERE id = ?", (logout_time, self.user_id))
+            writer.execute("UPDATE usuarios SET logout_time = ? WHERE id = ?", (logout_time, self.user_id))
             
-            conn.commit()
             self.logout_signal.emit()
         except sqlite3.Error as e:
             QMessageBox.critical(self, "Error de Base de Datos", f"Error al cerrar sesión: {str(e)}")
-        finally:
-            if conn:
-                conn.close()
 
     def change_profile_picture(self):
         file_dialog = QFileDialog()
@@ -803,11 +765,7 @@ class ProfileModule(QWidget):
                 shutil.copy(image_file, destination)
                 
                 # Actualizar la base de datos con la ruta relativa de la imagen
-                conn = sqlite3.connect("pos_database.db")
-                c = conn.cursor()
-                
-                c.execute("UPDATE usuarios SET profile_picture = ? WHERE id = ?", (destination, self.user_id))
-                conn.commit()
+                writer.execute("UPDATE usuarios SET profile_picture = ? WHERE id = ?", (destination, self.user_id))
                 
                 # Cargar la nueva imagen de perfil
                 self.load_profile_picture(destination)
@@ -815,9 +773,6 @@ class ProfileModule(QWidget):
                 QMessageBox.information(self, "Éxito", "Imagen de perfil actualizada correctamente.")
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"No se pudo actualizar la imagen de perfil: {str(e)}")
-            finally:
-                if conn:
-                    conn.close()
 
     def load_profile_picture(self, picture_path):
         if picture_path and os.path.exists(picture_path):
@@ -838,7 +793,7 @@ class ProfileModule(QWidget):
         selected_date = self.calendar.selectedDate().toString("yyyy-MM-dd")
         
         try:
-            conn = sqlite3.connect("pos_database.db")
+            conn = get_connection()
             c = conn.cursor()
             
             c.execute("SELECT login_time, logout_time FROM usuarios WHERE id = ? AND DATE(login_time) = ?", (self.user_id, selected_date))
@@ -858,23 +813,13 @@ class ProfileModule(QWidget):
                 self.date_events_list.addItem(f"Venta: {date} - ${total:.2f}")
         except sqlite3.Error as e:
             QMessageBox.critical(self, "Error de Base de Datos", f"Error al cargar eventos del día: {str(e)}")
-        finally:
-            if conn:
-                conn.close()
 
     def save_notes(self):
         notes = self.notes_text.toPlainText()
         
         try:
-            conn = sqlite3.connect("pos_database.db")
-            c = conn.cursor()
-            
-            c.execute("INSERT OR REPLACE INTO user_notes (user_id, notes) VALUES (?, ?)", (self.user_id, notes))
-            conn.commit()
+            writer.execute("INSERT OR REPLACE INTO user_notes (user_id, notes) VALUES (?, ?)", (self.user_id, notes))
             
             QMessageBox.information(self, "Éxito", "Notas guardadas correctamente.")
         except sqlite3.Error as e:
-            QMessageBox.critical(self, "Error de Base de Datos", f"Error al guardar las notas: {str(e)}")
-        finally:
-            if conn:
-                conn.close()
\ No newline at end of file
+            QMessageBox.critical(self, "Error de Base de Datos", f"Error al guardar las notas: {str(e)}")
\ No newline at end of file
@@ -1,22 +1,137 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit,
-    QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox, QDialog,
+    QTableView, QHeaderView, QAbstractItemView, QMessageBox, QDialog,
     QFormLayout, QDialogButtonBox, QApplication, QComboBox, QDoubleSpinBox,
     QGroupBox, QSplitter, QCompleter, QFrame
 )
 from PyQt6.QtGui import QFont, QColor, QIcon, QKeySequence, QShortcut, QPixmap
-from PyQt6.QtCore import Qt, pyqtSignal, QPropertyAnimation, QEasingCurve
+from PyQt6.QtCore import (
+    Qt, pyqtSignal, QPropertyAnimation, QEasingCurve, QAbstractTableModel,
+    QAbstractListModel, QModelIndex, QTimer
+)
 import sqlite3
 import sys
 
+from cart import Cart, format_cents
+from catalog import get_catalog
+from database import get_connection
+from journal import get_journal
+from sales import record_sale
+from search_index import SearchIndex
+
+# Espera tras la última tecla antes de buscar, y máximo de sugerencias
+SEARCH_DEBOUNCE_MS = 150
+SEARCH_LIMIT = 50
+
+
+class CartTableModel(QAbstractTableModel):
+    HEADERS = ["ID", "Producto", "Precio", "Cantidad", "Subtotal"]
+
+    def __init__(self, cart, parent=None):
+        super().__init__(parent)
+        self.cart = cart
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.cart)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        line = self.cart.line(index.row())
+        column = index.column()
+        if column == 0:
+            return str(line.product_id)
+        if column == 1:
+            return line.name
+        if column == 2:
+            return format_cents(line.unit_cents)
+        if column == 3:
+            return str(line.quantity.normalize())
+        return format_cents(line.subtotal_cents)
+
+    def add(self, product_id, name, unit_price, quantity):
+        row = self.cart.row_of(product_id)
+        if row is None:
+            row = len(self.cart)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.cart.add(product_id, name, unit_price, quantity)
+            self.endInsertRows()
+        else:
+            self.cart.add(product_id, name, unit_price, quantity)
+            self._row_changed(row)
+
+    def remove_row(self, row):
+        # La última fila pasa a ocupar el hueco: se anuncia su eliminación y
+        # el cambio de datos en la fila reutilizada
+        last = len(self.cart) - 1
+        self.beginRemoveRows(QModelIndex(), last, last)
+        self.cart.remove_row(row)
+        self.endRemoveRows()
+        if row != last:
+            self._row_changed(row)
+
+    def clear(self):
+        self.beginResetModel()
+        self.cart.clear()
+        self.endResetModel()
+
+    def _row_changed(self, row):
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+
+class ProductSearchModel(QAbstractListModel):
+    """Sugerencias del buscador: solo los primeros resultados ya ordenados.
+
+    El filtrado y el orden los hace SearchIndex; este modelo nunca tiene más
+    de SEARCH_LIMIT filas, así que el completer no recorre el catálogo entero.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.products = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.products)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        product = self.products[index.row()]
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return f"{product.nombre} - ${product.precio:.2f}"
+        if role == Qt.ItemDataRole.UserRole:
+            return product.id
+        return None
+
+    def set_results(self, products):
+        self.beginResetModel()
+        self.products = products
+        self.endResetModel()
+
+
 class POSModule(QWidget):
     sale_completed = pyqtSignal()
+    # Cambios del catálogo (id o None), entregados en el hilo de la interfaz
+    catalog_changed = pyqtSignal(object)
 
     def __init__(self):
         super().__init__()
+        self.catalog = get_catalog()
+        self.catalog.ensure_loaded()
+        self.search_index = SearchIndex()
+        self.search_index.rebuild((product.id, product.nombre) for product in self.catalog.all())
         self.init_ui()
         self.load_products()
         self.load_customers()
+        self.catalog_changed.connect(self.on_catalog_changed)
+        self.catalog.subscribe(self._relay_catalog_change)
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -59,7 +174,7 @@ class POSModule(QWidget):
                 border-color: #80bdff;
                 outline: none;
             }
-            QTableWidget {
+            QTableView {
                 border: 1px solid #dee2e6;
                 background-color: white;
             }
@@ -139,6 +254,12 @@ class POSModule(QWidget):
 
         self.product_search = QLineEdit()
         self.product_search.setPlaceholderText("Buscar producto...")
+        self.product_search.returnPressed.connect(self.scan_product)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(lambda: self.filter_products(self.product_search.text()))
+        self.product_search.textEdited.connect(self.search_timer.start)
         product_layout.addWidget(self.product_search)
 
         self.product_combo = QComboBox()
@@ -178,16 +299,19 @@ class POSModule(QWidget):
         # Tabla de carrito
         cart_group = QGroupBox("Carrito de compras")
         cart_layout = QVBoxLayout()
-        self.cart_table = QTableWidget(0, 5)
-        self.cart_table.setHorizontalHeaderLabels(["ID", "Producto", "Precio", "Cantidad", "Subtotal"])
+        self.cart = Cart()
+        self.cart_model = CartTableModel(self.cart, self)
+        self.cart_table = QTableView()
+        self.cart_table.setModel(self.cart_model)
+        self.cart_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         self.cart_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.cart_table.setAlternatingRowColors(True)
         self.cart_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 border: none;
                 gridline-color: #e9ecef;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 10px;
             }
         """)
@@ -267,10 +391,13 @@ class POSModule(QWidget):
 
     def setup_autocomplete(self):
         # Autocompletado para productos
-        self.product_completer = QCompleter()
-        self.product_completer.setModel(self.product_combo.model())
-        self.product_completer.setFilterMode(Qt.MatchFlag.MatchContains)
-        self.product_search.setCompleter(self.product_completer)
+        # El índice ya filtra y ordena; el completer solo muestra la lista
+        self.product_results = ProductSearchModel(self)
+        self.product_completer = QCompleter(self.product_results, self)
+        self.product_completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.product_completer.setMaxVisibleItems(12)
+        self.product_completer.setWidget(self.product_search)
+        self.product_completer.activated[QModelIndex].connect(self.select_search_result)
 
         # Autocompletado para clientes
         self.customer_completer = QCompleter()
@@ -335,45 +462,70 @@ class POSModule(QWidget):
         return search_layout
 
     def filter_products(self, text):
-        for i in range(self.product_combo.count()):
-            item = self.product_combo.itemText(i)
-            self.product_combo.setItemVisible(i, text.lower() in item.lower())
+        ids = self.search_index.search(text, SEARCH_LIMIT)
+        products = [product for product in map(self.catalog.get, ids) if product is not None]
+        self.product_results.set_results(products)
+        if products:
+            self.product_completer.complete()
+        else:
+            self.product_completer.popup().hide()
+
+    def select_search_result(self, index):
+        product_id = index.data(Qt.ItemDataRole.UserRole)
+        row = self.product_combo.findData(product_id)
+        if row >= 0:
+            self.product_combo.setCurrentIndex(row)
+        self.product_search.setText(index.data())
 
     def remove_from_cart(self):
-        selected_rows = set(index.row() for index in self.cart_table.selectedIndexes())
+        selected_rows = set(index.row() for index in self.cart_table.selectionModel().selectedIndexes())
+        self.cart_table.clearSelection()
+        # De mayor a menor, la fila que ocupa cada hueco nunca está seleccionada
         for row in sorted(selected_rows, reverse=True):
-            self.cart_table.removeRow(row)
+            self.cart_model.remove_row(row)
         self.update_total()
 
 
     def load_products(self):
+        self.product_combo.clear()
+        for product in self.catalog.all():
+            self.product_combo.addItem(f"{product.nombre} - ${product.precio:.2f}", product.id)
+
+    def _relay_catalog_change(self, product_id):
+        # El catálogo avisa desde el hilo que lo cambió (la precarga, el
+        # escritor): la señal lleva el cambio al hilo de la interfaz
         try:
-            conn = sqlite3.connect('pos_database.db')
-            c = conn.cursor()
-            c.execute("SELECT id, nombre, precio FROM productos")
-            products = c.fetchall()
-            conn.close()
-
-            self.product_combo.clear()
-            product_names = []
-            for product in products:
-                self.product_combo.addItem(f"{product[1]} - ${product[2]:.2f}", product[0])
-                product_names.append(product[1])
-
-            # Configurar el autocompletado de productos
-            self.product_completer.setModel(self.product_combo.model())
-            self.product_completer.setFilterMode(Qt.MatchFlag.MatchContains)
+            self.catalog_changed.emit(product_id)
+        except RuntimeError:
+            # El widget ya se destruyó
+            self.catalog.unsubscribe(self._relay_catalog_change)
+
+    def on_catalog_changed(self, product_id):
+        if product_id is None:
+            self.search_index.rebuild((product.id, product.nombre) for product in self.catalog.all())
+            self.load_products()
+            return
 
-        except sqlite3.Error as e:
-            QMessageBox.critical(self, "Error", f"No se pudieron cargar los productos: {e}")
+        # Cambio de un solo producto: índice y combo se actualizan en sitio
+        product = self.catalog.get(product_id)
+        row = self.product_combo.findData(product_id)
+        if product is None:
+            self.search_index.remove(product_id)
+            if row >= 0:
+                self.product_combo.removeItem(row)
+            return
+        self.search_index.add(product.id, product.nombre)
+        text = f"{product.nombre} - ${product.precio:.2f}"
+        if row >= 0:
+            self.product_combo.setItemText(row, text)
+        else:
+            self.product_combo.addItem(text, product.id)
 
     def load_customers(self):
         try:
-            conn = sqlite3.connect('pos_database.db')
-            c = conn.cursor()
+            c = get_connection().cursor()
             c.execute("SELECT id, nombre FROM clientes")
             customers = c.fetchall()
-            conn.close()
 
             self.customer_combo.clear()
             customer_names = []
@@ -397,109 +549,66 @@ class POSModule(QWidget):
             QMessageBox.warning(self, "Error", "Por favor, seleccione un producto.")
             return
 
-        try:
-            conn = sqlite3.connect('pos_database.db')
-            c = conn.cursor()
-            c.execute("SELECT nombre, precio FROM productos WHERE id = ?", (product_id,))
-            product = c.fetchone()
-            conn.close()
-
-            if product:
-                name, price = product
-                subtotal = price * quantity
-
-                row = self.cart_table.rowCount()
-                self.cart_table.insertRow(row)
-                self.cart_table.setItem(row, 0, QTableWidgetItem(str(product_id)))
-                self.cart_table.setItem(row, 1, QTableWidgetItem(name))
-                self.cart_table.setItem(row, 2, QTableWidgetItem(f"${price:.2f}"))
-                self.cart_table.setItem(row, 3, QTableWidgetItem(str(quantity)))
-                self.cart_table.setItem(row, 4, QTableWidgetItem(f"${subtotal:.2f}"))
-
-                self.update_total()
-            else:
-                QMessageBox.warning(self, "Error", "Producto no encontrado.")
+        product = self.catalog.get(product_id)
+        if product:
+            self.cart_model.add(product.id, product.nombre, product.precio, quantity)
+            self.update_total()
+        else:
+            QMessageBox.warning(self, "Error", "Producto no encontrado.")
 
-        except sqlite3.Error as e:
-            QMessageBox.critical(self, "Error", f"No se pudo agregar el producto al carrito: {e}")
+    def scan_product(self):
+        # Lectura del escáner: código de barras/SKU o id, sin consultar la base
+        code = self.product_search.text()
+        product = self.catalog.lookup_code(code)
+        if product is None:
+            return
+        self.cart_model.add(product.id, product.nombre, product.precio, self.quantity_input.value())
+        self.update_total()
+        self.product_search.clear()
 
     def update_total(self):
-        total = 0
-        for row in range(self.cart_table.rowCount()):
-            subtotal = float(self.cart_table.item(row, 4).text().replace('$', ''))
-            total += subtotal
-        self.total_label.setText(f"Total: ${total:.2f}")
+        self.total_label.setText(f"Total: {format_cents(self.cart.total_cents)}")
 
     def complete_sale(self):
-        if self.cart_table.rowCount() == 0:
+        if len(self.cart) == 0:
             QMessageBox.warning(self, "Error", "El carrito está vacío.")
             return
 
         if not self.confirm_sale():
             return
 
+        # Sin cliente seleccionado, record_sale asigna el cliente "variado"
         customer_id = self.customer_combo.currentData()
-        if not customer_id:
-            # Asignar cliente "variado" por defecto
-            customer_id = self.get_or_create_default_customer()
 
+        total = float(self.cart.total)
         try:
-            conn = sqlite3.connect('pos_database.db')
-            c = conn.cursor()
-
-            # Calcular el total de la venta
-            total_venta = sum(float(self.cart_table.item(row, 4).text().replace('$', '')) for row in range(self.cart_table.rowCount()))
-
-            # Crear la venta con el total calculado
-            c.execute("INSERT INTO ventas (cliente_id, fecha, total) VALUES (?, datetime('now'), ?)", (customer_id, total_venta))
-            sale_id = c.lastrowid
-
-            # Agregar detalles de la venta
-            for row in range(self.cart_table.rowCount()):
-                product_id = int(self.cart_table.item(row, 0).text())
-                quantity = float(self.cart_table.item(row, 3).text())
-                price_unitario = float(self.cart_table.item(row, 2).text().replace('$', ''))
-                precio_total = quantity * price_unitario
-
-                c.execute("""
-                    INSERT INTO detalles_venta (venta_id, producto_id, cantidad, precio_unitario, precio)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (sale_id, product_id, quantity, price_unitario, precio_total))
-
-                # Actualizar el stock del producto
-                c.execute("UPDATE productos SET stock = stock - ? WHERE id = ?", (quantity, product_id))
-
-            conn.commit()
-            conn.close()
-
-            QMessageBox.information(self, "Éxito", "Venta completada correctamente.")
-            self.cart_table.setRowCount(0)
-            self.update_total()
-            self.sale_completed.emit()
-            self.show_sale_summary(sale_id)
-
-        except sqlite3.Error as e:
+            summary = self._record_sale(customer_id, total)
+        except (sqlite3.Error, ValueError, RuntimeError) as e:
+            # RuntimeError: el escritor ya se detuvo (la aplicación se está cerrando)
             QMessageBox.critical(self, "Error", f"No se pudo completar la venta: {e}")
+            return
 
-    def get_or_create_default_customer(self):
-        conn = sqlite3.connect('pos_database.db')
-        c = conn.cursor()
-        
-        # Buscar el cliente "variado"
-        c.execute("SELECT id FROM clientes WHERE nombre = 'variado'")
-        result = c.fetchone()
-        
-        if result:
-            default_customer_id = result[0]
-        else:
-            # Crear el cliente "variado" si no existe
-            c.execute("INSERT INTO clientes (nombre) VALUES ('variado')")
-            default_customer_id = c.lastrowid
-            conn.commit()
-        
-        conn.close()
-        return default_customer_id
+        QMessageBox.information(self, "Éxito", "Venta completada correctamente.")
+        self.cart_model.clear()
+        self.update_total()
+        self.sale_completed.emit()
+        self.show_sale_summary(summary)
 
+    def _record_sale(self, customer_id, total):
+        try:
+            # La venta queda en el diario local y pasa a la base en segundo plano
+            _, fecha = get_journal().append_sale(self.cart.items(), customer_id, total=total)
+        except OSError:
+            # Sin diario (disco lleno, sin permisos): directo a la base
+            return record_sale(self.cart.items(), customer_id, total=total)
+        return {
+            "id": None,
+            "cliente": self.customer_combo.currentText() or "variado",
+            # La misma fecha que tendrá la venta en la base y en el historial
+            "fecha": fecha,
+            "total": total,
+            "detalles": self.cart.details(),
+        }
 
     def show_error_animation(self, widget):
         animation = QPropertyAnimation(widget, b"styleSheet")
@@ -517,48 +626,26 @@ class POSModule(QWidget):
         )
         return confirm == QMessageBox.StandardButton.Yes
 
-    def show_sale_summary(self, sale_id):
+    def show_sale_summary(self, venta):
         summary = QMessageBox(self)
         summary.setWindowTitle("Resumen de Venta")
         summary.setIcon(QMessageBox.Icon.Information)
 
-        conn = sqlite3.connect('pos_database.db')
-        c = conn.cursor()
-        c.execute("""
-            SELECT v.id, c.nombre, v.fecha, SUM(d.cantidad * d.precio_unitario) as total
-            FROM ventas v
-            JOIN clientes c ON v.cliente_id = c.id
-            JOIN detalles_venta d ON v.id = d.venta_id
-            WHERE v.id = ?
-            GROUP BY v.id
-        """, (sale_id,))
-        venta = c.fetchone()
-
-        if venta:
-            summary_text = f"""
-            Venta #{venta[0]}
-            Cliente: {venta[1]}
-            Fecha: {venta[2]}
-            Total: ${venta[3]:.2f}
-
-            Detalles:
-            """
-
-            c.execute("""
-                SELECT p.nombre, d.cantidad, d.precio_unitario, (d.cantidad * d.precio_unitario) as subtotal
-                FROM detalles_venta d
-                JOIN productos p ON d.producto_id = p.id
-                WHERE d.venta_id = ?
-            """, (sale_id,))
-            detalles = c.fetchall()
-
-            for detalle in detalles:
-                summary_text += f"\n{detalle[0]}: {detalle[1]} x ${detalle[2]:.2f} = ${detalle[3]:.2f}"
-
-            summary.setText(summary_text)
-            summary.exec()
-
-        conn.close()
+        number = f"#{venta['id']}" if venta["id"] is not None else "registrada"
+        summary_text = f"""
+        Venta {number}
+        Cliente: {venta['cliente']}
+        Fecha: {venta['fecha']}
+        Total: ${venta['total']:.2f}
+
+        Detalles:
+        """
+
+        for nombre, cantidad, precio_unitario, subtotal in venta["detalles"]:
+            summary_text += f"\n{nombre}: {cantidad} x ${precio_unitario:.2f} = ${subtotal:.2f}"
+
+        summary.setText(summary_text)
+        summary.exec()
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
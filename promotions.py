@@ -1,6 +1,8 @@
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton, QLineEdit, QDateEdit, QTableWidget, QTableWidgetItem
 from PyQt6.QtCore import QDate
-import sqlite3
+
+import writer
+from database import get_connection
 
 class PromotionsModule(QWidget):
     def __init__(self):
@@ -41,21 +43,16 @@ class PromotionsModule(QWidget):
         end_date = self.promo_end_date.date().toString("yyyy-MM-dd")
         discount = float(self.promo_discount_input.text())
 
-        conn = sqlite3.connect('pos_database.db')
-        c = conn.cursor()
-        c.execute("INSERT INTO promociones (nombre, descripcion, fecha_inicio, fecha_fin, descuento) VALUES (?, ?, ?, ?, ?)",
-                  (name, description, start_date, end_date, discount))
-        conn.commit()
-        conn.close()
+        writer.execute("INSERT INTO promociones (nombre, descripcion, fecha_inicio, fecha_fin, descuento) VALUES (?, ?, ?, ?, ?)",
+                       (name, description, start_date, end_date, discount))
 
         self.load_promotions()
 
     def load_promotions(self):
-        conn = sqlite3.connect('pos_database.db')
+        conn = get_connection()
         c = conn.cursor()
         c.execute("SELECT nombre, descripcion, fecha_inicio, fecha_fin, descuento FROM promociones")
         promotions = c.fetchall()
-        conn.close()
 
         self.promo_table.setRowCount(0)
         for row, promo in enumerate(promotions):
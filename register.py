@@ -5,11 +5,12 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import pyqtSignal, Qt, QPropertyAnimation, QEasingCurve, QSize, QTimer
 from PyQt6.QtGui import QColor, QFont, QPainter, QLinearGradient, QIcon
 import sqlite3
-import bcrypt
 from datetime import datetime
 import re
 import json
 
+import writer
+
 class GradientWidget(QWidget):
     def __init__(self, start_color, end_color, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -278,22 +279,19 @@ class RegisterModule(QWidget):
             self.show_message("Debe aceptar los términos y condiciones.", error=True)
             return
 
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        # bcrypt tarda en importarse: solo hace falta al registrar
+        import bcrypt
 
-        conn = sqlite3.connect("pos_database.db")
-        c = conn.cursor()
+        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
 
         try:
-            c.execute("INSERT INTO usuarios (username, password, email, role, created_at) VALUES (?, ?, ?, ?, ?)",
-                      (username, hashed_password, email, 'usuario', datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-            conn.commit()
+            writer.execute("INSERT INTO usuarios (username, password, email, role, created_at) VALUES (?, ?, ?, ?, ?)",
+                           (username, hashed_password, email, 'usuario', datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
             self.show_message("Usuario registrado correctamente.", error=False)
             self.registro_exitoso.emit()
             self.limpiar_campos()
         except sqlite3.IntegrityError:
             self.show_message("El nombre de usuario ya existe.", error=True)
-        finally:
-            conn.close()
 
     def show_message(self, message, error=False):
         self.message_label.setText(message)
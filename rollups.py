@@ -0,0 +1,326 @@
+"""Resúmenes de ventas por día, producto, usuario y cliente.
+
+record_sale suma cada venta a estas tablas en su misma transacción, así que
+los tableros leen unos cientos de filas en lugar de agregar todo ventas y
+detalles_venta. rebuild() las recalcula desde cero (migración 5 o a mano):
+
+    python rollups.py [--db pos_database.db]
+"""
+import argparse
+import heapq
+
+import database
+from database import get_connection, get_pool, get_read_connection
+
+# Día de una venta; las ventas sin fecha se agrupan en ''
+DAY = "IFNULL(substr(v.fecha, 1, 10), '')"
+# Importe de una línea (precio es el total de la línea; las antiguas pueden no tenerlo)
+LINE_AMOUNT = "IFNULL(d.precio, d.cantidad * d.precio_unitario)"
+# Líneas de cada venta y su importe, resueltos por idx_detalles_venta_venta
+LINE_COUNT = "(SELECT COUNT(*) FROM detalles_venta d WHERE d.venta_id = v.id)"
+LINES_AMOUNT = f"(SELECT IFNULL(SUM({LINE_AMOUNT}), 0) FROM detalles_venta d WHERE d.venta_id = v.id)"
+
+# Cada resumen es (tabla, SELECT sobre ventas v [y detalles_venta d], suma al
+# chocar con una fila existente). El SELECT lleva {where} para limitarlo a
+# una venta; sin filtro recalcula todo el historial.
+ROLLUPS = (
+    (
+        "resumen_ventas_dia",
+        f"""SELECT {DAY}, COUNT(*), COUNT(v.total), IFNULL(SUM(v.total), 0),
+                   SUM(n > 0), SUM(n), SUM(importe)
+            FROM (SELECT v.fecha, v.total, {LINE_COUNT} AS n, {LINES_AMOUNT} AS importe
+                  FROM ventas v {{where}}) v
+            GROUP BY 1""",
+        """ON CONFLICT (dia) DO UPDATE SET
+               ventas = ventas + excluded.ventas,
+               ventas_con_total = ventas_con_total + excluded.ventas_con_total,
+               total = total + excluded.total,
+               ventas_con_lineas = ventas_con_lineas + excluded.ventas_con_lineas,
+               lineas = lineas + excluded.lineas,
+               importe = importe + excluded.importe""",
+    ),
+    (
+        "resumen_productos_dia",
+        f"""SELECT {DAY}, IFNULL(d.producto_id, 0), IFNULL(SUM(d.cantidad), 0), IFNULL(SUM({LINE_AMOUNT}), 0)
+            FROM ventas v JOIN detalles_venta d ON d.venta_id = v.id
+            {{where}}
+            GROUP BY 1, 2""",
+        """ON CONFLICT (dia, producto_id) DO UPDATE SET
+               cantidad = cantidad + excluded.cantidad,
+               importe = importe + excluded.importe""",
+    ),
+    (
+        # Totales históricos por producto: tantas filas como productos
+        "resumen_productos",
+        f"""SELECT IFNULL(d.producto_id, 0), IFNULL(SUM(d.cantidad), 0), IFNULL(SUM({LINE_AMOUNT}), 0)
+            FROM ventas v JOIN detalles_venta d ON d.venta_id = v.id
+            {{where}}
+            GROUP BY 1""",
+        """ON CONFLICT (producto_id) DO UPDATE SET
+               cantidad = cantidad + excluded.cantidad,
+               importe = importe + excluded.importe""",
+    ),
+    (
+        "resumen_usuarios_dia",
+        f"""SELECT {DAY}, IFNULL(v.user_id, 0), COUNT(*), IFNULL(SUM(v.total), 0)
+            FROM ventas v {{where}}
+            GROUP BY 1, 2""",
+        """ON CONFLICT (dia, user_id) DO UPDATE SET
+               ventas = ventas + excluded.ventas,
+               total = total + excluded.total""",
+    ),
+    (
+        "resumen_clientes",
+        """SELECT IFNULL(v.cliente_id, 0), COUNT(*), IFNULL(SUM(v.total), 0)
+           FROM ventas v {where}
+           GROUP BY 1""",
+        """ON CONFLICT (cliente_id) DO UPDATE SET
+               ventas = ventas + excluded.ventas,
+               total = total + excluded.total""",
+    ),
+)
+
+
+def apply_sale(conn, sale_id):
+    """Suma una venta ya insertada (con sus líneas) a todos los resúmenes.
+
+    Debe llamarse dentro de la transacción que insertó la venta, para que
+    los resúmenes nunca queden desfasados respecto a ventas.
+    """
+    for table, select, upsert in ROLLUPS:
+        conn.execute(
+            f"INSERT INTO {table} {select.format(where='WHERE v.id = :venta')} {upsert}",
+            {"venta": sale_id},
+        )
+
+
+def rebuild(conn):
+    """Vacía y recalcula todos los resúmenes a partir de ventas y detalles_venta."""
+    for table, select, _ in ROLLUPS:
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(f"INSERT INTO {table} {select.format(where='')}")
+
+
+def sales_summary(day, conn=None):
+    """(total histórico, total del día, transacciones) para day 'YYYY-MM-DD'."""
+    conn = conn or get_read_connection()
+    total, transactions = conn.execute(
+        "SELECT IFNULL(SUM(total), 0), IFNULL(SUM(ventas), 0) FROM resumen_ventas_dia"
+    ).fetchone()
+    row = conn.execute("SELECT total FROM resumen_ventas_dia WHERE dia = ?", (day,)).fetchone()
+    return total, row[0] if row else 0, transactions
+
+
+def period_total(prefix, conn=None):
+    """Total vendido en los días que empiezan por prefix ('2024-05' = un mes)."""
+    conn = conn or get_read_connection()
+    return conn.execute(
+        "SELECT IFNULL(SUM(total), 0) FROM resumen_ventas_dia WHERE dia LIKE ? || '%'",
+        (prefix,),
+    ).fetchone()[0]
+
+
+def monthly_sales(limit=6, conn=None, amounts="ventas"):
+    """[(mes, total)] de los últimos meses con ventas, del más antiguo al más reciente.
+
+    amounts="ventas" suma el total de las ventas; "lineas" suma el importe de
+    las líneas de producto.
+    """
+    conn = conn or get_read_connection()
+    column = "total" if amounts == "ventas" else "importe"
+    rows = conn.execute(
+        f"""SELECT substr(dia, 1, 7) AS mes, SUM({column}) FROM resumen_ventas_dia
+            WHERE dia <> '' GROUP BY mes ORDER BY mes DESC LIMIT ?""",
+        (limit,),
+    ).fetchall()
+    return rows[::-1]
+
+
+def kpis(conn=None):
+    """(ticket promedio, usuarios activos, productos por venta)."""
+    conn = conn or get_read_connection()
+    total, with_total, lines, with_lines = conn.execute(
+        """SELECT IFNULL(SUM(total), 0), IFNULL(SUM(ventas_con_total), 0),
+                  IFNULL(SUM(lineas), 0), IFNULL(SUM(ventas_con_lineas), 0)
+           FROM resumen_ventas_dia"""
+    ).fetchone()
+    users = conn.execute(
+        "SELECT COUNT(DISTINCT user_id) FROM resumen_usuarios_dia WHERE user_id <> 0"
+    ).fetchone()[0]
+    return (total / with_total if with_total else 0), users, (lines / with_lines if with_lines else 0)
+
+
+def top_products(limit=5, conn=None, by="importe"):
+    """[(nombre, cantidad, importe)] de los productos que más han vendido.
+
+    by elige el criterio: "importe" (dinero) o "cantidad" (unidades).
+    """
+    if by not in ("importe", "cantidad"):
+        raise ValueError(f"Criterio no permitido: {by}")
+    conn = conn or get_read_connection()
+    return conn.execute(
+        f"""SELECT p.nombre, r.cantidad, r.importe
+            FROM (SELECT producto_id, cantidad, importe FROM resumen_productos
+                  ORDER BY {by} DESC LIMIT ?) r
+            JOIN productos p ON p.id = r.producto_id
+            ORDER BY r.{by} DESC""",
+        (limit,),
+    ).fetchall()
+
+
+def user_total(user_id, conn=None):
+    """Total vendido por un usuario."""
+    conn = conn or get_read_connection()
+    return conn.execute(
+        "SELECT IFNULL(SUM(total), 0) FROM resumen_usuarios_dia WHERE user_id = ?", (user_id,)
+    ).fetchone()[0]
+
+
+def customer_count(conn=None):
+    """Clientes distintos que han comprado alguna vez."""
+    conn = conn or get_read_connection()
+    return conn.execute("SELECT COUNT(*) FROM resumen_clientes WHERE cliente_id <> 0").fetchone()[0]
+
+
+class LiveTotals:
+    """Agregados de los tableros en memoria, al día con los eventos de venta.
+
+    load() los lee de los resúmenes (carga inicial y reconciliación) y guarda
+    la revisión de ventas; apply_sale() suma una venta publicada por
+    record_sale sin consultar la base. La revisión de cada venta dice si ya
+    estaba contada (se ignora), si es la siguiente (se suma) o si faltan
+    ventas de por medio, escritas por otro proceso: entonces apply_sale
+    devuelve None y hay que volver a cargar.
+    """
+
+    # Meses que se guardan para los gráficos mensuales
+    MONTHS = 12
+
+    def __init__(self):
+        self.revision = None
+        self.total = 0
+        self.transactions = 0
+        self.with_total = 0
+        self.lines = 0
+        self.with_lines = 0
+        self.days = {}
+        self.months = {}
+        self.users = set()
+        self.customers = 0
+        self.products = {}
+
+    def load(self, conn=None):
+        conn = conn or get_read_connection()
+        # contadores existe desde la migración 4, anterior a los resúmenes
+        self.revision = conn.execute(
+            "SELECT revision FROM contadores WHERE tabla = 'ventas'"
+        ).fetchone()[0]
+        (self.total, self.transactions, self.with_total,
+         self.lines, self.with_lines) = conn.execute(
+            """SELECT IFNULL(SUM(total), 0), IFNULL(SUM(ventas), 0), IFNULL(SUM(ventas_con_total), 0),
+                      IFNULL(SUM(lineas), 0), IFNULL(SUM(ventas_con_lineas), 0)
+               FROM resumen_ventas_dia"""
+        ).fetchone()
+        # Solo el último día con ventas: el de hoy o, si no hay, uno anterior
+        self.days = dict(conn.execute(
+            "SELECT dia, total FROM resumen_ventas_dia WHERE dia <> '' ORDER BY dia DESC LIMIT 1"
+        ).fetchall())
+        self.months = {
+            month: [total, amount]
+            for month, total, amount in conn.execute(
+                """SELECT substr(dia, 1, 7) AS mes, SUM(total), SUM(importe) FROM resumen_ventas_dia
+                   WHERE dia <> '' GROUP BY mes ORDER BY mes DESC LIMIT ?""",
+                (self.MONTHS,),
+            )
+        }
+        self.users = {
+            row[0] for row in conn.execute(
+                "SELECT DISTINCT user_id FROM resumen_usuarios_dia WHERE user_id <> 0"
+            )
+        }
+        self.customers = customer_count(conn)
+        self.products = {
+            product_id: [name, quantity, amount]
+            for product_id, name, quantity, amount in conn.execute(
+                """SELECT r.producto_id, p.nombre, r.cantidad, r.importe
+                   FROM resumen_productos r JOIN productos p ON p.id = r.producto_id"""
+            )
+        }
+        return self
+
+    def apply_sale(self, sale):
+        """Suma una venta (events.SALE); True si se sumó, False si ya estaba, None si hay hueco."""
+        revision = sale.get("revision")
+        if self.revision is None or revision is None or revision > self.revision + 1:
+            return None
+        if revision <= self.revision:
+            return False
+        self.revision = revision
+
+        total = sale["total"]
+        day = (sale["fecha"] or "")[:10]
+        self.transactions += 1
+        if total is not None:
+            self.total += total
+            self.with_total += 1
+        if sale["lineas"]:
+            self.lines += sale["lineas"]
+            self.with_lines += 1
+        if day:
+            self.days[day] = self.days.get(day, 0) + (total or 0)
+            month = self.months.setdefault(day[:7], [0, 0])
+            month[0] += total or 0
+            month[1] += sale["importe"]
+            if len(self.months) > self.MONTHS:
+                del self.months[min(self.months)]
+        if sale["user_id"]:
+            self.users.add(sale["user_id"])
+        if sale["cliente_nuevo"]:
+            self.customers += 1
+        for product_id, (name, quantity, amount) in sale["productos"].items():
+            product = self.products.setdefault(product_id, [name, 0, 0])
+            product[1] += quantity
+            product[2] += amount
+        return True
+
+    def day_total(self, day):
+        return self.days.get(day, 0)
+
+    def month_total(self, month):
+        return self.months.get(month, (0, 0))[0]
+
+    def monthly(self, limit=6, amounts="ventas"):
+        """Como monthly_sales: [(mes, total)] del más antiguo al más reciente."""
+        column = 0 if amounts == "ventas" else 1
+        return [(month, self.months[month][column]) for month in sorted(self.months)[-limit:]]
+
+    def kpis(self):
+        """Como kpis(): (ticket promedio, usuarios activos, productos por venta)."""
+        return (
+            self.total / self.with_total if self.with_total else 0,
+            len(self.users),
+            self.lines / self.with_lines if self.with_lines else 0,
+        )
+
+    def top_products(self, limit=5, by="importe"):
+        """Como top_products(): [(nombre, cantidad, importe)]."""
+        column = 2 if by == "importe" else 1
+        return [tuple(product) for product in heapq.nlargest(
+            limit, self.products.values(), key=lambda product: product[column]
+        )]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcula los resúmenes de ventas desde cero.")
+    parser.add_argument("--db", default=database.DB_PATH)
+    args = parser.parse_args()
+    database.DB_PATH = args.db
+    conn = get_connection()
+    with get_pool().transaction(conn):
+        rebuild(conn)
+    days = conn.execute("SELECT COUNT(*) FROM resumen_ventas_dia").fetchone()[0]
+    print(f"Resúmenes recalculados: {days} días")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import events
+import rollups
+import writer
+from database import get_pool
+from schema import get_counter
+
+DEFAULT_CUSTOMER_NAME = "variado"
+
+
+def get_or_create_default_customer(conn):
+    """Id del cliente "variado", creándolo dentro de la transacción en curso si falta."""
+    row = conn.execute(
+        "SELECT id FROM clientes WHERE nombre = ?", (DEFAULT_CUSTOMER_NAME,)
+    ).fetchone()
+    if row:
+        return row[0]
+    return conn.execute(
+        "INSERT INTO clientes (nombre) VALUES (?)", (DEFAULT_CUSTOMER_NAME,)
+    ).lastrowid
+
+
+def normalize_items(items):
+    """Líneas (producto_id, cantidad, precio_unitario) con sus tipos; ValueError si no hay."""
+    items = [
+        (int(product_id), float(quantity), float(unit_price))
+        for product_id, quantity, unit_price in items
+    ]
+    if not items:
+        raise ValueError("La venta no tiene productos")
+    return items
+
+
+def unknown_reference(conn, customer_id=None, user_id=None):
+    """Motivo por el que la venta no se puede registrar si su cliente o usuario no existen, o None."""
+    if customer_id and not conn.execute("SELECT 1 FROM clientes WHERE id = ?", (customer_id,)).fetchone():
+        return f"el cliente {customer_id} no existe"
+    if user_id is not None and not conn.execute("SELECT 1 FROM usuarios WHERE id = ?", (user_id,)).fetchone():
+        return f"el usuario {user_id} no existe"
+    return None
+
+
+def record_sale(items, customer_id=None, user_id=None, total=None, conn=None):
+    """Registra una venta completa por el escritor único y espera su commit.
+
+    items es una secuencia de (producto_id, cantidad, precio_unitario). Los
+    detalles se insertan con executemany, el stock se descuenta con un único
+    UPDATE por conjunto y el resumen se lee antes del commit, de modo que una
+    venta de cualquier tamaño cuesta un solo commit (un fsync). Los resúmenes
+    de rollups se actualizan dentro de la misma transacción.
+
+    total permite pasar el total ya calculado en centavos por el carrito; si
+    se omite se calcula a partir de las líneas.
+
+    Devuelve un diccionario con id, cliente, fecha, total y detalles, más lo
+    que necesitan las vistas para aplicar la venta sin consultar (ver
+    events.SALE). Tras el commit se publican los eventos de venta, de stock
+    y, si se creó el cliente "variado", de cliente.
+
+    Con conn la venta se confirma directamente en esa conexión, sin pasar
+    por el escritor (benchmarks y scripts de mantenimiento).
+    """
+    items = normalize_items(items)
+    if conn is not None:
+        with get_pool().transaction(conn):
+            result = insert_sale(conn, items, customer_id, user_id, total)
+        publish_sale(*result)
+        return result[0]
+    _, result = submit_sale(items, customer_id, user_id, total).result()
+    return result[0]
+
+
+def submit_sale(items, customer_id=None, user_id=None, total=None, key=None, when=None, strict=False):
+    """Encola una venta en el escritor y devuelve un Future con (venta_id, resultado).
+
+    key es una clave de idempotencia: si ya está en claves_venta no se
+    inserta nada y resultado es None. Si no, resultado es (resumen, stock,
+    cliente_creado) como lo devuelve insert_sale(), y los eventos ya se
+    publicaron cuando el Future se resuelve. when es la fecha de la venta
+    (UTC, como datetime('now')) si no es el momento de insertarla. Con
+    strict el Future lleva un ValueError si el cliente o el usuario no existen
+    (comprobado dentro de la transacción).
+    """
+    items = normalize_items(items)
+    return writer.submit(
+        _record, items, customer_id, user_id, total, key, when, strict, after_commit=_publish_recorded
+    )
+
+
+def _record(conn, items, customer_id, user_id, total, key, when, strict):
+    if key is not None:
+        row = conn.execute("SELECT venta_id FROM claves_venta WHERE clave = ?", (key,)).fetchone()
+        if row:
+            return row[0], None
+    if strict:
+        reason = unknown_reference(conn, customer_id, user_id)
+        if reason:
+            raise ValueError(reason)
+    result = insert_sale(conn, items, customer_id, user_id, total, when)
+    sale_id = result[0]["id"]
+    if key is not None:
+        conn.execute("INSERT INTO claves_venta (clave, venta_id) VALUES (?, ?)", (key, sale_id))
+    return sale_id, result
+
+
+def _publish_recorded(outcome):
+    _, result = outcome
+    if result is not None:
+        publish_sale(*result)
+
+
+def insert_sale(conn, items, customer_id=None, user_id=None, total=None, when=None):
+    """Inserta una venta dentro de la transacción en curso de conn.
+
+    items ya normalizados con normalize_items(). Devuelve (resumen, stock,
+    cliente_creado) para pasarlos a publish_sale() después del commit; así
+    el escritor puede confirmar varias ventas en una sola transacción.
+    """
+    if total is None:
+        total = round(sum(quantity * unit_price for _, quantity, unit_price in items), 2)
+
+    new_customer = False
+    if not customer_id:
+        changes = conn.total_changes
+        customer_id = get_or_create_default_customer(conn)
+        new_customer = conn.total_changes != changes
+
+    sale_id = conn.execute(
+        "INSERT INTO ventas (user_id, cliente_id, fecha, total) VALUES (?, ?, IFNULL(?, datetime('now')), ?)",
+        (user_id, customer_id, when, total),
+    ).lastrowid
+
+    conn.executemany(
+        """
+        INSERT INTO detalles_venta (venta_id, producto_id, cantidad, precio_unitario, precio)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        [
+            (sale_id, product_id, quantity, unit_price, quantity * unit_price)
+            for product_id, quantity, unit_price in items
+        ],
+    )
+
+    # Los resúmenes de los tableros se actualizan en la misma transacción
+    rollups.apply_sale(conn, sale_id)
+
+    # Un solo UPDATE para todo el carrito, agrupando líneas repetidas
+    conn.execute(
+        """
+        UPDATE productos
+        SET stock = stock - (
+            SELECT SUM(d.cantidad) FROM detalles_venta d
+            WHERE d.venta_id = :venta AND d.producto_id = productos.id
+        )
+        WHERE id IN (SELECT producto_id FROM detalles_venta WHERE venta_id = :venta)
+        """,
+        {"venta": sale_id},
+    )
+
+    header = conn.execute(
+        """
+        SELECT v.id, c.nombre, v.fecha, v.total
+        FROM ventas v
+        LEFT JOIN clientes c ON v.cliente_id = c.id
+        WHERE v.id = ?
+        """,
+        (sale_id,),
+    ).fetchone()
+    details = conn.execute(
+        """
+        SELECT d.producto_id, p.nombre, d.cantidad, d.precio_unitario, d.precio
+        FROM detalles_venta d
+        JOIN productos p ON d.producto_id = p.id
+        WHERE d.venta_id = ?
+        ORDER BY d.id
+        """,
+        (sale_id,),
+    ).fetchall()
+    stock = dict(conn.execute(
+        "SELECT id, stock FROM productos WHERE id IN (SELECT producto_id FROM detalles_venta WHERE venta_id = ?)",
+        (sale_id,),
+    ).fetchall())
+    username = None
+    if user_id is not None:
+        row = conn.execute("SELECT username FROM usuarios WHERE id = ?", (user_id,)).fetchone()
+        username = row[0] if row else None
+    purchases = conn.execute(
+        "SELECT ventas FROM resumen_clientes WHERE cliente_id = ?", (customer_id,)
+    ).fetchone()[0]
+    _, revision = get_counter("ventas", conn)
+
+    products = {}
+    for product_id, name, quantity, _, amount in details:
+        _, sold, subtotal = products.get(product_id, (name, 0, 0))
+        products[product_id] = (name, sold + quantity, subtotal + amount)
+
+    summary = {
+        "id": header[0],
+        "cliente": header[1],
+        "fecha": header[2],
+        "total": header[3],
+        "detalles": [detail[1:] for detail in details],
+        "cliente_id": customer_id,
+        "user_id": user_id,
+        "usuario": username,
+        "productos": products,
+        "lineas": len(items),
+        "importe": sum(quantity * unit_price for _, quantity, unit_price in items),
+        "cliente_nuevo": purchases == 1,
+        "revision": revision,
+    }
+    return summary, stock, new_customer
+
+
+def publish_sale(summary, stock, new_customer):
+    """Publica los eventos de una venta ya confirmada."""
+    if new_customer:
+        events.publish(events.CUSTOMER, {"id": summary["cliente_id"], "accion": "alta"})
+    events.publish(events.SALE, summary)
+    events.publish(events.STOCK, stock)
@@ -0,0 +1,324 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from datetime import date, timedelta
+
+import fulltext
+from database import get_read_connection, read_connection
+from schema import get_counter
+
+# Nombre del cliente leído por su clave primaria, sin depender del plan del JOIN
+CUSTOMER_NAME = "(SELECT nombre FROM clientes WHERE id = v.cliente_id)"
+
+# Orden del historial -> partes que lo forman, cada una (columnas de la clave,
+# origen de las filas, columna del cliente, condición o None). La clave
+# termina siempre en un id para que sea única y usa IFNULL para que las ventas
+# sin total o sin cliente también tengan posición. Cada parte tiene su índice
+# sobre esas mismas expresiones (migración 4) y se fija con INDEXED BY/CROSS
+# JOIN: buscar una posición es siempre un SEARCH en el índice, aunque las
+# estadísticas de ANALYZE sean de una base casi vacía.
+# "+c.id" evita que SQLite derive v.cliente_id > ? de c.id > ? y recorra
+# ventas por rango en lugar de por cliente. El JOIN no lista las ventas sin
+# cliente o con el cliente borrado: van en una segunda parte con la clave
+# ('', 0, id) que les daría un LEFT JOIN, y las dos se unen con UNION ALL
+# ordenado, que SQLite mezcla sin ordenar de nuevo. Así el orden por cliente
+# lista las mismas filas que cuenta contadores. Cuando el tramo pedido no
+# llega a esa clave la condición constante ('' > ?) descarta la segunda
+# parte sin leerla.
+SORTS = {
+    "fecha": (
+        (("IFNULL(v.fecha, '')", "v.id"), "ventas v INDEXED BY idx_ventas_fecha_id", CUSTOMER_NAME, None),
+    ),
+    "total": (
+        (("IFNULL(v.total, 0)", "v.id"), "ventas v INDEXED BY idx_ventas_total_id", CUSTOMER_NAME, None),
+    ),
+    "cliente": (
+        (
+            ("IFNULL(c.nombre, '')", "c.id", "v.id"),
+            "clientes c INDEXED BY idx_clientes_nombre_id "
+            "CROSS JOIN ventas v INDEXED BY idx_ventas_cliente_id ON v.cliente_id = +c.id",
+            "c.nombre",
+            None,
+        ),
+        (
+            ("''", "0", "v.id"),
+            "ventas v INDEXED BY idx_ventas_cliente_id",
+            "NULL",
+            # Los ids huérfanos salen de recorrer idx_ventas_cliente_id con DISTINCT
+            "v.cliente_id IS NULL OR v.cliente_id IN ("
+            "SELECT cliente_id FROM (SELECT DISTINCT cliente_id FROM ventas) "
+            "WHERE cliente_id NOT IN (SELECT id FROM clientes))",
+        ),
+    ),
+}
+
+# Columnas visibles de cada fila (id, cliente, fecha, total); detrás va la clave
+VISIBLE_COLUMNS = 4
+
+# Páginas ya leídas que se guardan para que anterior/siguiente sean inmediatos
+PAGE_CACHE_SIZE = 8
+
+
+class SalesHistoryPager:
+    """Paginación por clave (seek) del historial de ventas.
+
+    Cada página se pide como "las N filas después de la última clave de la
+    anterior", así que avanzar o retroceder cuesta lo mismo en la página 1
+    que en la 5000. Para saltar a una página lejana se busca la clave de su
+    primera fila saltando entradas del índice de cobertura (sin leer filas de
+    ventas ni de clientes), partiendo de la página conocida más cercana o del final.
+
+    El total de filas sale de la tabla contadores, que mantienen los
+    triggers; su revisión invalida las claves recordadas y las páginas en
+    caché (un LRU de PAGE_CACHE_SIZE páginas) cuando cambian las ventas o los
+    clientes. La instancia no es segura entre hilos: úsala siempre desde el
+    mismo hilo o desde un pool de un solo hilo.
+    """
+
+    def __init__(self, page_size=20, conn=None):
+        self.page_size = page_size
+        self.conn = conn
+        self.sort = "fecha"
+        self.descending = True
+        self._revision = None
+        self._total = 0
+        self._first_keys = {}
+        self._last_keys = {}
+        self._pages = OrderedDict()
+        # Partes con condición que tienen filas, por revisión (ver _parts)
+        self._nonempty = {}
+
+    def _connection(self):
+        return self.conn or get_read_connection()
+
+    @contextmanager
+    def borrowed(self):
+        """Lee con una conexión prestada del pool durante el bloque (tareas de un QThreadPool)."""
+        if self.conn is not None:
+            yield
+            return
+        with read_connection() as conn:
+            self.conn = conn
+            try:
+                yield
+            finally:
+                self.conn = None
+
+    def set_sort(self, sort, descending=True):
+        if sort not in SORTS:
+            raise ValueError(f"Orden no permitido: {sort}")
+        self.sort = sort
+        self.descending = descending
+        self._forget()
+
+    def _forget(self):
+        self._first_keys.clear()
+        self._last_keys.clear()
+        self._pages.clear()
+        self._nonempty.clear()
+
+    def refresh(self):
+        """Relee el contador y olvida las claves si los datos cambiaron."""
+        conn = self._connection()
+        total, sales_revision = get_counter("ventas", conn)
+        _, customers_revision = get_counter("clientes", conn)
+        revision = (sales_revision, customers_revision)
+        if revision != self._revision:
+            self._revision = revision
+            self._forget()
+        self._total = total
+        return total
+
+    def apply_sale(self, revision):
+        """Cuenta una venta nueva (events.SALE) sin releer el contador.
+
+        Devuelve False si la revisión no es la siguiente a la conocida: la
+        venta ya estaba contada o faltan cambios, y refresh() los traerá.
+        """
+        if self._revision is None or self._revision[0] is None or revision != self._revision[0] + 1:
+            return False
+        self._revision = (revision, self._revision[1])
+        self._total += 1
+        # La venta nueva desplaza las páginas en todos los órdenes
+        self._forget()
+        return True
+
+    @property
+    def total_items(self):
+        return self._total
+
+    @property
+    def total_pages(self):
+        return max(1, (self._total - 1) // self.page_size + 1)
+
+    def _order(self, start, reverse=False, first=0):
+        """ORDER BY por posición: la clave empieza en la columna start (desde 1)."""
+        keys = SORTS[self.sort][0][0]
+        direction = "DESC" if self.descending != reverse else "ASC"
+        return ", ".join(f"{start + i} {direction}" for i in range(first, len(keys)))
+
+    def _seek(self, key, reverse=False, inclusive=False):
+        """Condiciones que, en orden, cubren las filas "después de key".
+
+        Para la clave (k1, k2, k3) son k1 = ? AND k2 = ? AND k3 > ?, luego
+        k1 = ? AND k2 > ? y por último k1 > ?: cada una es un prefijo de
+        igualdades más un rango, que SQLite resuelve con un solo SEARCH en el
+        índice aunque la primera columna tenga muchos empates (p. ej. totales
+        repetidos). Con reverse son las filas anteriores a key.
+
+        Devuelve (condición, parámetros, primera columna por la que ordenar):
+        las columnas fijadas por igualdad no se repiten en el ORDER BY, porque
+        SQLite no siempre reconoce que ya vienen ordenadas y ordenaría de nuevo.
+        En la condición {0}, {1}... son las columnas de la clave de cada parte.
+        """
+        width = len(SORTS[self.sort][0][0])
+        op = "<" if self.descending != reverse else ">"
+        parts = []
+        for i in range(width - 1, -1, -1):
+            compare = op + "=" if inclusive and i == width - 1 else op
+            conditions = [f"{{{column}}} = ?" for column in range(i)] + [f"{{{i}}} {compare} ?"]
+            parts.append((" AND ".join(conditions), tuple(key[:i + 1]), i))
+        return parts
+
+    def _parts(self, where, params, columns):
+        """SELECT de cada parte del orden y los parámetros de todos.
+
+        columns es None (columnas visibles y clave), "clave" o "cuenta" (COUNT(*)).
+        """
+        selects = []
+        for keys, source, customer, condition in SORTS[self.sort]:
+            if condition and not self._has_rows(source, condition):
+                # Casi siempre no hay ventas huérfanas: el orden queda en un solo SEARCH
+                continue
+            if columns == "cuenta":
+                names = ("COUNT(*)",)
+            elif columns == "clave":
+                names = keys
+            else:
+                names = ("v.id", customer, "v.fecha", "v.total") + keys
+            conditions = [f"({condition})"] if condition else []
+            if where:
+                conditions.append(where.format(*keys))
+            sql = f"SELECT {', '.join(names)} FROM {source}"
+            if conditions:
+                sql += " WHERE " + " AND ".join(conditions)
+            selects.append(sql)
+        return selects, params * len(selects)
+
+    def _has_rows(self, source, condition):
+        if condition not in self._nonempty:
+            sql = f"SELECT EXISTS (SELECT 1 FROM {source} WHERE {condition})"
+            self._nonempty[condition] = bool(self._connection().execute(sql).fetchone()[0])
+        return self._nonempty[condition]
+
+    def _select(self, where=None, params=(), reverse=False, first=0, limit=None, offset=0, columns=None):
+        """Filas en el orden actual; con columns="clave" solo las columnas de la clave."""
+        selects, params = self._parts(where, params, columns)
+        start = 1 if columns == "clave" else VISIBLE_COLUMNS + 1
+        sql = f"{' UNION ALL '.join(selects)} ORDER BY {self._order(start, reverse, first)} LIMIT ? OFFSET ?"
+        return self._connection().execute(sql, params + (limit or self.page_size, offset)).fetchall()
+
+    def _select_after(self, key, reverse=False, inclusive=False):
+        rows = []
+        for where, params, first in self._seek(key, reverse, inclusive):
+            rows += self._select(where, params, reverse, first, limit=self.page_size - len(rows))
+            if len(rows) == self.page_size:
+                break
+        return rows
+
+    def _count(self, where, params):
+        selects, params = self._parts(where, params, "cuenta")
+        sql = "SELECT " + " + ".join(f"({select})" for select in selects)
+        return self._connection().execute(sql, params).fetchone()[0]
+
+    def _skip_to(self, row_number):
+        """Clave de la fila row_number (desde 0) saltando solo por el índice."""
+        # Punto de partida: la página recordada más cercana por debajo
+        known = [page for page in self._last_keys if page * self.page_size <= row_number]
+        start_page = max(known, default=0)
+        remaining = row_number - start_page * self.page_size
+        # Todos los órdenes listan las filas que cuenta el contador
+        from_end = self._total - 1 - row_number
+
+        if 0 <= from_end < remaining:
+            rows = self._select(reverse=True, limit=1, offset=from_end, columns="clave")
+            return rows[0] if rows else None
+        if not start_page:
+            rows = self._select(limit=1, offset=remaining, columns="clave")
+            return rows[0] if rows else None
+        for where, params, first in self._seek(self._last_keys[start_page]):
+            rows = self._select(where, params, first=first, limit=1, offset=remaining, columns="clave")
+            if rows:
+                return rows[0]
+            remaining -= self._count(where, params)
+        return None
+
+    def fetch_page(self, page):
+        """Filas (id, cliente, fecha, total) de la página indicada (desde 1)."""
+        page = max(1, min(page, self.total_pages))
+        width = VISIBLE_COLUMNS
+        if page in self._pages:
+            self._pages.move_to_end(page)
+            return page, self._pages[page]
+
+        if page == 1:
+            rows = self._select()
+        elif page - 1 in self._last_keys:
+            rows = self._select_after(self._last_keys[page - 1])
+        elif page + 1 in self._first_keys:
+            rows = self._select_after(self._first_keys[page + 1], reverse=True)[::-1]
+        else:
+            key = self._skip_to((page - 1) * self.page_size)
+            rows = [] if key is None else self._select_after(key, inclusive=True)
+
+        if rows:
+            self._first_keys[page] = rows[0][width:]
+            self._last_keys[page] = rows[-1][width:]
+        rows = [row[:width] for row in rows]
+        self._pages[page] = rows
+        if len(self._pages) > PAGE_CACHE_SIZE:
+            self._pages.popitem(last=False)
+        return page, rows
+
+    def prefetch(self, page):
+        """Deja en caché una página (p. ej. la siguiente) si existe y no está ya."""
+        if 1 <= page <= self.total_pages and page not in self._pages:
+            self.fetch_page(page)
+
+
+def filter_query(text="", day=None):
+    """(sql, parámetros) del historial filtrado por búsqueda y día.
+
+    Cada filtro se escribe de forma que lo resuelva un índice: un número es
+    una búsqueda exacta por id, las palabras buscan en el nombre del cliente a
+    través de clientes_fts (LIKE si no hay FTS5) y el día es un rango
+    semiabierto [día, día + 1) sobre la misma expresión de idx_ventas_fecha_id.
+    El resultado sale ya en orden de fecha descendente desde ese índice, así
+    que la tabla perezosa puede ir leyéndolo por lotes.
+    """
+    conditions = []
+    params = []
+    text = (text or "").strip()
+    if text.isdigit():
+        conditions.append("v.id = ?")
+        params.append(int(text))
+    elif text:
+        conn = get_read_connection()
+        expression = fulltext.match_expression(text, column="nombre")
+        if expression and fulltext.has_index(conn, "clientes"):
+            conditions.append("v.cliente_id IN (SELECT rowid FROM clientes_fts WHERE clientes_fts MATCH ?)")
+            params.append(expression)
+        else:
+            conditions.append("v.cliente_id IN (SELECT id FROM clientes WHERE nombre LIKE ?)")
+            params.append(f"%{text}%")
+    if day is not None:
+        if isinstance(day, str):
+            day = date.fromisoformat(day)
+        conditions.append("IFNULL(v.fecha, '') >= ? AND IFNULL(v.fecha, '') < ?")
+        params += [day.isoformat(), (day + timedelta(days=1)).isoformat()]
+
+    sql = f"SELECT v.id, {CUSTOMER_NAME}, v.fecha, v.total FROM ventas v"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY IFNULL(v.fecha, '') DESC, v.id DESC"
+    return sql, tuple(params)
@@ -0,0 +1,344 @@
+import sqlite3
+
+from database import get_connection, get_pool
+from fulltext import create_index
+from rollups import rebuild as rebuild_rollups
+
+
+def _add_column(table, column, definition):
+    """Paso de migración que añade una columna solo si todavía no existe."""
+
+    def step(conn):
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    return step
+
+
+def _counter(table):
+    """Paso de migración que lleva en contadores las filas y la revisión de una tabla.
+
+    Los triggers suman o restan una fila y aumentan la revisión en la misma
+    transacción que cada cambio, así que el total nunca hay que recontarlo.
+    """
+
+    def step(conn):
+        conn.execute(
+            "INSERT OR REPLACE INTO contadores (tabla, filas, revision) "
+            f"SELECT '{table}', COUNT(*), 0 FROM {table}"
+        )
+        conn.execute(
+            f"""CREATE TRIGGER IF NOT EXISTS contadores_{table}_ai AFTER INSERT ON {table} BEGIN
+                    UPDATE contadores SET filas = filas + 1, revision = revision + 1 WHERE tabla = '{table}';
+                END"""
+        )
+        conn.execute(
+            f"""CREATE TRIGGER IF NOT EXISTS contadores_{table}_ad AFTER DELETE ON {table} BEGIN
+                    UPDATE contadores SET filas = filas - 1, revision = revision + 1 WHERE tabla = '{table}';
+                END"""
+        )
+        conn.execute(
+            f"""CREATE TRIGGER IF NOT EXISTS contadores_{table}_au AFTER UPDATE ON {table} BEGIN
+                    UPDATE contadores SET revision = revision + 1 WHERE tabla = '{table}';
+                END"""
+        )
+
+    return step
+
+
+# Esquema base: las tablas de la aplicación tal como las creaba
+# main.create_database. Se aplica solo a bases en la versión 0 (nuevas o de
+# antes de las migraciones), en la misma transacción que las migraciones.
+BASELINE = (
+    """CREATE TABLE IF NOT EXISTS usuarios (
+           id INTEGER PRIMARY KEY,
+           username TEXT,
+           password TEXT,
+           role TEXT,
+           email TEXT,
+           login_time TEXT,
+           logout_time TEXT,
+           profile_picture TEXT,
+           created_at TEXT
+       )""",
+    """CREATE TABLE IF NOT EXISTS user_notes (
+           user_id INTEGER PRIMARY KEY,
+           notes TEXT,
+           FOREIGN KEY (user_id) REFERENCES usuarios (id)
+       )""",
+    """CREATE TABLE IF NOT EXISTS user_goals (
+           id INTEGER PRIMARY KEY,
+           user_id INTEGER,
+           goal TEXT,
+           target_date TEXT,
+           completed INTEGER DEFAULT 0,
+           FOREIGN KEY (user_id) REFERENCES usuarios (id)
+       )""",
+    """CREATE TABLE IF NOT EXISTS ventas (
+           id INTEGER PRIMARY KEY,
+           user_id INTEGER,
+           cliente_id INTEGER,
+           fecha TEXT,
+           total REAL,
+           FOREIGN KEY (user_id) REFERENCES usuarios (id),
+           FOREIGN KEY (cliente_id) REFERENCES clientes (id)
+       )""",
+    """CREATE TABLE IF NOT EXISTS productos (
+           id INTEGER PRIMARY KEY,
+           nombre TEXT,
+           precio REAL,
+           stock INTEGER,
+           proveedor_id INTEGER,
+           imagen TEXT,
+           FOREIGN KEY (proveedor_id) REFERENCES proveedores (id)
+       )""",
+    """CREATE TABLE IF NOT EXISTS detalles_venta (
+           id INTEGER PRIMARY KEY,
+           venta_id INTEGER,
+           producto_id INTEGER,
+           cantidad REAL,
+           precio REAL,
+           precio_unitario REAL,
+           FOREIGN KEY (venta_id) REFERENCES ventas (id),
+           FOREIGN KEY (producto_id) REFERENCES productos (id)
+       )""",
+    "CREATE TABLE IF NOT EXISTS roles (id INTEGER PRIMARY KEY, nombre TEXT)",
+    "CREATE TABLE IF NOT EXISTS permisos (id INTEGER PRIMARY KEY, nombre TEXT)",
+    """CREATE TABLE IF NOT EXISTS roles_permisos (
+           id INTEGER PRIMARY KEY,
+           role_id INTEGER,
+           permiso_id INTEGER,
+           FOREIGN KEY (role_id) REFERENCES roles (id),
+           FOREIGN KEY (permiso_id) REFERENCES permisos (id)
+       )""",
+    """CREATE TABLE IF NOT EXISTS proveedores (
+           id INTEGER PRIMARY KEY, nombre TEXT, contacto TEXT, telefono TEXT, email TEXT
+       )""",
+    "CREATE TABLE IF NOT EXISTS metodos_pago (id INTEGER PRIMARY KEY, nombre TEXT)",
+    """CREATE TABLE IF NOT EXISTS cortes_caja (
+           id INTEGER PRIMARY KEY, fecha TEXT, monto_inicial REAL, monto_final REAL
+       )""",
+    """CREATE TABLE IF NOT EXISTS arqueos (
+           id INTEGER PRIMARY KEY, fecha TEXT, monto_sistema REAL, monto_fisico REAL, diferencia REAL
+       )""",
+    """CREATE TABLE IF NOT EXISTS promociones (
+           id INTEGER PRIMARY KEY, nombre TEXT, descripcion TEXT,
+           fecha_inicio TEXT, fecha_fin TEXT, descuento REAL
+       )""",
+    "CREATE TABLE IF NOT EXISTS clientes (id INTEGER PRIMARY KEY, nombre TEXT, email TEXT, telefono TEXT)",
+    """CREATE TABLE IF NOT EXISTS puntos (
+           id INTEGER PRIMARY KEY,
+           cliente_id INTEGER,
+           cantidad INTEGER,
+           FOREIGN KEY (cliente_id) REFERENCES clientes (id)
+       )""",
+    "CREATE TABLE IF NOT EXISTS estadisticas (id INTEGER PRIMARY KEY, fecha TEXT, tipo TEXT, valor REAL)",
+    "CREATE TABLE IF NOT EXISTS notas (id INTEGER PRIMARY KEY, titulo TEXT, contenido TEXT, fecha TEXT)",
+    "CREATE TABLE IF NOT EXISTS respaldo_automatico (id INTEGER PRIMARY KEY, fecha TEXT, ruta TEXT)",
+)
+
+# Cada migración es (versión, descripción, pasos). Un paso es una sentencia SQL
+# o una función que recibe la conexión. Las versiones nunca se renumeran: para
+# cambiar el esquema se añade una migración nueva al final de la lista.
+MIGRATIONS = [
+    (
+        1,
+        "Índices de cobertura para ventas, detalles de venta y clientes",
+        (
+            # Bases antiguas creadas antes de que ventas tuviera user_id
+            _add_column("ventas", "user_id", "INTEGER"),
+            # Detalles de una venta (SaleDetailsDialog, show_sale_summary)
+            """CREATE INDEX IF NOT EXISTS idx_detalles_venta_venta
+               ON detalles_venta (venta_id, producto_id, cantidad, precio_unitario, precio)""",
+            # Productos más vendidos (load_top_products, gráfico de productos)
+            """CREATE INDEX IF NOT EXISTS idx_detalles_venta_producto
+               ON detalles_venta (producto_id, cantidad, precio)""",
+            # Orden y filtros por fecha del historial y los resúmenes
+            "CREATE INDEX IF NOT EXISTS idx_ventas_fecha ON ventas (fecha, total)",
+            "CREATE INDEX IF NOT EXISTS idx_ventas_cliente ON ventas (cliente_id, fecha, total)",
+            "CREATE INDEX IF NOT EXISTS idx_ventas_usuario ON ventas (user_id, total)",
+            # Búsqueda del cliente por defecto (get_or_create_default_customer)
+            "CREATE INDEX IF NOT EXISTS idx_clientes_nombre ON clientes (nombre)",
+            "ANALYZE",
+        ),
+    ),
+    (
+        2,
+        "Índice de cobertura para el inventario ordenado por stock",
+        (
+            # DashboardModule.load_inventory recorre productos por stock sin
+            # ordenar el catálogo en memoria
+            """CREATE INDEX IF NOT EXISTS idx_productos_stock
+               ON productos (stock, nombre, precio)""",
+        ),
+    ),
+    (
+        3,
+        "Búsqueda de texto completo (FTS5) en clientes y proveedores",
+        (
+            create_index("clientes"),
+            create_index("proveedores"),
+        ),
+    ),
+    (
+        4,
+        "Índices para paginar el historial por clave y contadores de filas",
+        (
+            # Un índice por orden del historial con las mismas expresiones
+            # que las claves de sales_history.SORTS
+            """CREATE INDEX IF NOT EXISTS idx_ventas_fecha_id
+               ON ventas (IFNULL(fecha, ''), id, fecha, total, cliente_id)""",
+            """CREATE INDEX IF NOT EXISTS idx_ventas_total_id
+               ON ventas (IFNULL(total, 0), id, total, fecha, cliente_id)""",
+            """CREATE INDEX IF NOT EXISTS idx_ventas_cliente_id
+               ON ventas (cliente_id, id, fecha, total)""",
+            # UNIQUE: con nombre e id fijados SQLite sabe que es un solo cliente
+            """CREATE UNIQUE INDEX IF NOT EXISTS idx_clientes_nombre_id
+               ON clientes (IFNULL(nombre, ''), id)""",
+            """CREATE TABLE IF NOT EXISTS contadores (
+                   tabla TEXT PRIMARY KEY,
+                   filas INTEGER NOT NULL,
+                   revision INTEGER NOT NULL DEFAULT 0
+               )""",
+            _counter("ventas"),
+            _counter("clientes"),
+            _counter("productos"),
+            _counter("proveedores"),
+            "ANALYZE",
+        ),
+    ),
+    (
+        5,
+        "Resúmenes de ventas por día, producto, usuario y cliente para los tableros",
+        (
+            # Los mantiene sales.record_sale con rollups.apply_sale
+            """CREATE TABLE IF NOT EXISTS resumen_ventas_dia (
+                   dia TEXT PRIMARY KEY,
+                   ventas INTEGER NOT NULL,
+                   ventas_con_total INTEGER NOT NULL,
+                   total REAL NOT NULL,
+                   ventas_con_lineas INTEGER NOT NULL,
+                   lineas INTEGER NOT NULL,
+                   importe REAL NOT NULL
+               ) WITHOUT ROWID""",
+            """CREATE TABLE IF NOT EXISTS resumen_productos_dia (
+                   dia TEXT NOT NULL,
+                   producto_id INTEGER NOT NULL,
+                   cantidad REAL NOT NULL,
+                   importe REAL NOT NULL,
+                   PRIMARY KEY (dia, producto_id)
+               ) WITHOUT ROWID""",
+            """CREATE TABLE IF NOT EXISTS resumen_productos (
+                   producto_id INTEGER PRIMARY KEY,
+                   cantidad REAL NOT NULL,
+                   importe REAL NOT NULL
+               )""",
+            """CREATE TABLE IF NOT EXISTS resumen_usuarios_dia (
+                   dia TEXT NOT NULL,
+                   user_id INTEGER NOT NULL,
+                   ventas INTEGER NOT NULL,
+                   total REAL NOT NULL,
+                   PRIMARY KEY (dia, user_id)
+               ) WITHOUT ROWID""",
+            """CREATE TABLE IF NOT EXISTS resumen_clientes (
+                   cliente_id INTEGER PRIMARY KEY,
+                   ventas INTEGER NOT NULL,
+                   total REAL NOT NULL
+               )""",
+            # Llena los resúmenes con el historial existente
+            rebuild_rollups,
+        ),
+    ),
+    (
+        6,
+        "Uso de los módulos de la barra lateral para precargarlos en orden",
+        (
+            """CREATE TABLE IF NOT EXISTS uso_modulos (
+                   modulo TEXT PRIMARY KEY,
+                   usos INTEGER NOT NULL DEFAULT 0
+               )""",
+        ),
+    ),
+    (
+        7,
+        "Claves de idempotencia de las ventas recibidas por la API",
+        (
+            # Un reintento con la misma clave devuelve la venta ya registrada
+            """CREATE TABLE IF NOT EXISTS claves_venta (
+                   clave TEXT PRIMARY KEY,
+                   venta_id INTEGER NOT NULL
+               ) WITHOUT ROWID""",
+        ),
+    ),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(conn=None):
+    conn = conn or get_connection()
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def get_counter(table, conn=None):
+    """(filas, revisión) de una tabla según contadores; cuenta si aún no existe."""
+    conn = conn or get_connection()
+    try:
+        row = conn.execute("SELECT filas, revision FROM contadores WHERE tabla = ?", (table,)).fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    if row is None:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0], None
+    return row
+
+
+def _run(conn, steps):
+    for step in steps:
+        if callable(step):
+            step(conn)
+        else:
+            conn.execute(step)
+
+
+def migrate(conn=None):
+    """Crea o actualiza el esquema y devuelve las versiones aplicadas.
+
+    En una base al día solo se lee PRAGMA user_version, sin tomar el bloqueo
+    de escritura que frenaría a otras cajas sobre el mismo archivo. Si faltan
+    migraciones (y el esquema base, en una base nueva) se aplican todas en una
+    sola transacción junto con user_version, así que la base nunca queda a
+    medias.
+    """
+    conn = conn or get_connection()
+    if get_version(conn) >= SCHEMA_VERSION:
+        return []
+    with get_pool().transaction(conn):
+        # Otra caja pudo migrar mientras esperábamos el bloqueo
+        current = get_version(conn)
+        if current == 0:
+            _run(conn, BASELINE)
+        applied = []
+        for version, _description, steps in MIGRATIONS:
+            if version > current:
+                _run(conn, steps)
+                applied.append(version)
+        if applied:
+            conn.execute(f"PRAGMA user_version = {applied[-1]}")
+    return applied
+
+
+def optimize(conn=None):
+    """Mantiene las estadísticas de los índices al día (pensado para el cierre)."""
+    conn = conn or get_connection()
+    try:
+        conn.execute("PRAGMA optimize")
+    except sqlite3.Error:
+        pass
+
+
+if __name__ == "__main__":
+    versions = migrate()
+    if versions:
+        print(f"Migraciones aplicadas: {', '.join(map(str, versions))}")
+    print(f"Versión del esquema: {get_version()}")
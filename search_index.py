@@ -0,0 +1,170 @@
+import bisect
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+
+# Con más candidatos que esto se recorre el orden global por longitud en vez
+# de ordenar todos los candidatos
+SORT_THRESHOLD = 2000
+
+
+def fold(text):
+    """Minúsculas y sin acentos: "Jamón Ibérico" -> "jamon iberico"."""
+    text = text or ""
+    if text.isascii():
+        return text.casefold()
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+def _trigrams(term):
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+
+@lru_cache(maxsize=65536)
+def _word_keys(word):
+    # Los nombres de productos comparten mucho vocabulario
+    prefixes = {word[:1], word[:2]}
+    return frozenset(_trigrams(word)), frozenset(prefixes)
+
+
+class SearchIndex:
+    """Índice de búsqueda por trigramas con plegado de acentos.
+
+    Los términos de tres o más letras se resuelven intersectando las listas de
+    trigramas; los de una o dos letras, con un índice de prefijos de palabra.
+    El orden de los resultados es: primero los nombres que empiezan por la
+    búsqueda (por orden alfabético), después el resto del más corto al más
+    largo. Ambos órdenes se mantienen en listas ordenadas, de modo que una
+    búsqueda muy amplia se corta en cuanto tiene los primeros resultados.
+    """
+
+    def __init__(self):
+        self._names = {}
+        self._trigrams = defaultdict(set)
+        self._prefixes = defaultdict(set)
+        self._by_name = []
+        self._by_length = []
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, key):
+        return key in self._names
+
+    def _keys(self, folded):
+        grams = set()
+        prefixes = set()
+        for word in folded.split():
+            word_grams, word_prefixes = _word_keys(word)
+            grams |= word_grams
+            prefixes |= word_prefixes
+        return grams, prefixes
+
+    def add(self, key, name):
+        if key in self._names:
+            self.remove(key)
+        folded = fold(name)
+        self._names[key] = folded
+        grams, prefixes = self._keys(folded)
+        for gram in grams:
+            self._trigrams[gram].add(key)
+        for prefix in prefixes:
+            self._prefixes[prefix].add(key)
+        bisect.insort(self._by_name, (folded, key))
+        bisect.insort(self._by_length, (len(folded), folded, key))
+
+    def remove(self, key):
+        folded = self._names.pop(key, None)
+        if folded is None:
+            return
+        grams, prefixes = self._keys(folded)
+        for table, entries in ((self._trigrams, grams), (self._prefixes, prefixes)):
+            for entry in entries:
+                keys = table.get(entry)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del table[entry]
+        for ordered, entry in ((self._by_name, (folded, key)), (self._by_length, (len(folded), folded, key))):
+            i = bisect.bisect_left(ordered, entry)
+            if i < len(ordered) and ordered[i] == entry:
+                del ordered[i]
+
+    def rebuild(self, entries):
+        """Reconstruye el índice completo a partir de pares (clave, nombre)."""
+        self.clear()
+        for key, name in entries:
+            folded = fold(name)
+            self._names[key] = folded
+            grams, prefixes = self._keys(folded)
+            for gram in grams:
+                self._trigrams[gram].add(key)
+            for prefix in prefixes:
+                self._prefixes[prefix].add(key)
+        self._by_name = sorted((folded, key) for key, folded in self._names.items())
+        self._by_length = sorted((len(folded), folded, key) for key, folded in self._names.items())
+
+    def clear(self):
+        self._names.clear()
+        self._trigrams.clear()
+        self._prefixes.clear()
+        self._by_name = []
+        self._by_length = []
+
+    def _candidates(self, term):
+        if len(term) < 3:
+            return self._prefixes.get(term, set())
+        postings = [self._trigrams.get(gram) for gram in _trigrams(term)]
+        if not all(postings):
+            return set()
+        postings.sort(key=len)
+        result = set(postings[0])
+        for keys in postings[1:]:
+            result &= keys
+            if not result:
+                break
+        return result
+
+    def search(self, query, limit=20):
+        """Claves que coinciden con todos los términos, ordenadas por relevancia."""
+        folded_query = " ".join(fold(query).split())
+        terms = folded_query.split()
+        if not terms or limit <= 0:
+            return []
+
+        # 1) Nombres que empiezan por la búsqueda completa
+        results = []
+        start = bisect.bisect_left(self._by_name, (folded_query,))
+        for name, key in self._by_name[start:start + limit]:
+            if not name.startswith(folded_query):
+                break
+            results.append(key)
+        if len(results) == limit:
+            return results
+
+        # 2) Resto de coincidencias, de la más corta a la más larga
+        candidate_sets = sorted((self._candidates(term) for term in terms), key=len)
+        candidates = candidate_sets[0]
+        for keys in candidate_sets[1:]:
+            candidates = candidates & keys
+        if not candidates:
+            return results
+
+        seen = set(results)
+        needed = limit - len(results)
+        if len(candidates) <= SORT_THRESHOLD:
+            ordered = sorted(
+                (len(self._names[key]), self._names[key], key)
+                for key in candidates
+                if key not in seen
+            )
+        else:
+            ordered = (entry for entry in self._by_length if entry[2] in candidates and entry[2] not in seen)
+        for _, name, key in ordered:
+            if all(term in name for term in terms):
+                results.append(key)
+                needed -= 1
+                if not needed:
+                    break
+        return results
@@ -1,7 +1,14 @@
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton, QFileDialog
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton, QFileDialog, QMessageBox, QApplication
 import sqlite3
 import os
 
+import database
+import rollups
+import writer
+from database import get_connection, get_pool, get_read_pool
+from journal import get_journal
+from schema import migrate
+
 class SettingsModule(QWidget):
     def __init__(self):
         super().__init__()
@@ -21,19 +28,50 @@ class SettingsModule(QWidget):
     def backup_database(self):
         backup_path, _ = QFileDialog.getSaveFileName(self, "Guardar copia de seguridad", "", "SQLite DB Files (*.db)")
         if backup_path:
-            conn = sqlite3.connect('pos_database.db')
             backup = sqlite3.connect(backup_path)
-            conn.backup(backup)
+            get_connection().backup(backup)
             backup.close()
-            conn.close()
             QLabel("Copia de seguridad realizada con éxito").show()
 
     def restore_database(self):
         restore_path, _ = QFileDialog.getOpenFileName(self, "Seleccionar copia de seguridad", "", "SQLite DB Files (*.db)")
-        if restore_path:
-            conn = sqlite3.connect('pos_database.db')
+        if not restore_path:
+            return
+        reply = QMessageBox.question(
+            self, "Restaurar copia de seguridad",
+            "Se reemplazarán todos los datos actuales y la aplicación se cerrará al terminar. ¿Continuar?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+
+        # Nadie más puede leer ni escribir mientras se reemplaza la base: el
+        # diario pasa lo que tenga, el escritor se detiene (ya no vuelve a
+        # arrancar) y se cierran las conexiones de los pools
+        get_journal().stop()
+        writer.get_writer().stop()
+        get_pool().close_all()
+        get_read_pool().close_all()
+        try:
             backup = sqlite3.connect(restore_path)
-            backup.backup(conn)
-            conn.close()
-            backup.close()
-            QLabel("Base de datos restaurada con éxito").show()
\ No newline at end of file
+            conn = database.connect()
+            try:
+                backup.backup(conn)
+                # Una copia antigua queda con el esquema y los resúmenes al día
+                migrate(conn)
+                with get_pool().transaction(conn):
+                    rollups.rebuild(conn)
+            finally:
+                backup.close()
+                conn.close()
+        except sqlite3.Error as e:
+            QMessageBox.critical(
+                self, "Error",
+                f"No se pudo restaurar la copia de seguridad: {e}\nLa aplicación se cerrará; vuelva a abrirla."
+            )
+        else:
+            QMessageBox.information(
+                self, "Éxito", "Base de datos restaurada con éxito.\nLa aplicación se cerrará; vuelva a abrirla."
+            )
+        # Cachés (catálogo, totales, tablas) y escritor se recrean al volver a abrir
+        QApplication.quit()
\ No newline at end of file
@@ -1,6 +1,6 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit,
-    QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox, QDialog,
+    QTableView, QAbstractItemView, QHeaderView, QMessageBox, QDialog,
     QFormLayout, QDialogButtonBox, QApplication, QFrame, QSplitter
 )
 from PyQt6.QtGui import QFont, QColor, QIcon
@@ -8,6 +8,13 @@ from PyQt6.QtCore import Qt, pyqtSignal
 import sqlite3
 import sys
 
+import writer
+from fulltext import search_query
+from schema import get_counter
+from table_models import LazyQueryModel
+
+SUPPLIER_COLUMNS = ("id", "nombre", "contacto", "telefono", "email")
+
 class SuppliersModule(QWidget):
     supplier_updated = pyqtSignal()
 
@@ -46,7 +53,7 @@ class SuppliersModule(QWidget):
                 border: 1px solid #ddd;
                 border-radius: 4px;
             }
-            QTableWidget {
+            QTableView {
                 border: 1px solid #ddd;
                 border-radius: 4px;
                 background-color: white;
@@ -153,11 +160,13 @@ class SuppliersModule(QWidget):
         right_layout.addLayout(search_layout)
 
         # Tabla de proveedores
-        self.supplier_table = QTableWidget(0, 5)
-        self.supplier_table.setHorizontalHeaderLabels(["ID", "Nombre", "Contacto", "Teléfono", "Email"])
+        self.supplier_model = LazyQueryModel(["ID", "Nombre", "Contacto", "Teléfono", "Email"], parent=self)
+        self.supplier_table = QTableView()
+        self.supplier_table.setModel(self.supplier_model)
+        self.supplier_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         
         # Deshabilitar edición directa
-        self.supplier_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.supplier_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
         
         # Mejorar los encabezados
         self.supplier_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
@@ -174,16 +183,16 @@ class SuppliersModule(QWidget):
         # Alternar colores de las filas y otros estilos visuales
         self.supplier_table.setAlternatingRowColors(True)
         self.supplier_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 gridline-color: #BFBFBF;
                 background-color: #f9f9f9;  /* Color de fondo de la tabla */
                 alternate-background-color: #F2F2F2;  /* Color de fondo alternado */
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 8px;  /* Mejorar el espaciado en las celdas */
                 border-bottom: 1px solid #ddd;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #3399FF;  /* Color de selección */
                 color: white;
             }
@@ -228,12 +237,8 @@ class SuppliersModule(QWidget):
             return
 
         try:
-            conn = sqlite3.connect('pos_database.db')
-            c = conn.cursor()
-            c.execute("INSERT INTO proveedores (nombre, contacto, telefono, email) VALUES (?, ?, ?, ?)",
-                      (name, contact, phone, email))
-            conn.commit()
-            conn.close()
+            writer.execute("INSERT INTO proveedores (nombre, contacto, telefono, email) VALUES (?, ?, ?, ?)",
+                           (name, contact, phone, email))
 
             self.clear_form()
             self.load_suppliers()
@@ -245,38 +250,29 @@ class SuppliersModule(QWidget):
 
     def load_suppliers(self):
         try:
-            conn = sqlite3.connect('pos_database.db')
-            c = conn.cursor()
-            c.execute("SELECT * FROM proveedores")
-            suppliers = c.fetchall()
-            conn.close()
-
-            self.supplier_table.setRowCount(0)
-            for row, supplier in enumerate(suppliers):
-                self.supplier_table.insertRow(row)
-                for col, value in enumerate(supplier):
-                    item = QTableWidgetItem(str(value))
-                    if col == 0:  # ID column
-                        item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                    self.supplier_table.setItem(row, col, item)
-
-            self.total_suppliers_label.setText(f"Total de proveedores: {len(suppliers)}")
+            # Las filas se leen del cursor a medida que se desplaza la tabla
+            self.search_suppliers(self.search_input.text())
+
+            # Lo mantienen los disparadores de contadores: no recorre la tabla
+            total, _ = get_counter("proveedores")
+            self.total_suppliers_label.setText(f"Total de proveedores: {total}")
 
         except sqlite3.Error as e:
             QMessageBox.critical(self, 'Error', f"No se pudieron cargar los proveedores: {e}")
 
+    def selected_supplier(self):
+        rows = self.supplier_table.selectionModel().selectedRows()
+        if not rows:
+            return None
+        return ["" if value is None else value for value in self.supplier_model.row_values(rows[0].row())]
+
     def edit_supplier(self):
-        selected_items = self.supplier_table.selectedItems()
-        if not selected_items:
+        supplier = self.selected_supplier()
+        if supplier is None:
             QMessageBox.warning(self, 'Advertencia', "Por favor, seleccione un proveedor para editar.")
             return
 
-        row = selected_items[0].row()
-        supplier_id = int(self.supplier_table.item(row, 0).text())
-        current_name = self.supplier_table.item(row, 1).text()
-        current_contact = self.supplier_table.item(row, 2).text()
-        current_phone = self.supplier_table.item(row, 3).text()
-        current_email = self.supplier_table.item(row, 4).text()
+        supplier_id, current_name, current_contact, current_phone, current_email = supplier
 
         dialog = QDialog(self)
         dialog.setWindowTitle("Editar Proveedor")
@@ -305,15 +301,11 @@ class SuppliersModule(QWidget):
             new_email = email_input.text()
 
             try:
-                conn = sqlite3.connect('pos_database.db')
-                c = conn.cursor()
-                c.execute("""
+                writer.execute("""
                     UPDATE proveedores
                     SET nombre = ?, contacto = ?, telefono = ?, email = ?
                     WHERE id = ?
                 """, (new_name, new_contact, new_phone, new_email, supplier_id))
-                conn.commit()
-                conn.close()
 
                 self.load_suppliers()
                 QMessageBox.information(self, 'Éxito', "Proveedor actualizado correctamente.")
@@ -321,23 +313,18 @@ class SuppliersModule(QWidget):
                 QMessageBox.critical(self, 'Error', f"No se pudo actualizar el proveedor: {e}")
 
     def delete_supplier(self):
-        selected_items = self.supplier_table.selectedItems()
-        if not selected_items:
+        supplier = self.selected_supplier()
+        if supplier is None:
             QMessageBox.warning(self, 'Advertencia', "Por favor, seleccione un proveedor para eliminar.")
             return
 
-        row = selected_items[0].row()
-        supplier_id = int(self.supplier_table.item(row, 0).text())
+        supplier_id = supplier[0]
 
         reply = QMessageBox.question(self, 'Confirmación', "¿Está seguro de que desea eliminar este proveedor?",
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
             try:
-                conn = sqlite3.connect('pos_database.db')
-                c = conn.cursor()
-                c.execute("DELETE FROM proveedores WHERE id = ?", (supplier_id,))
-                conn.commit()
-                conn.close()
+                writer.execute("DELETE FROM proveedores WHERE id = ?", (supplier_id,))
 
                 self.load_suppliers()
                 QMessageBox.information(self, 'Éxito', "Proveedor eliminado correctamente.")
@@ -351,12 +338,9 @@ class SuppliersModule(QWidget):
         self.supplier_email_input.clear()
 
     def search_suppliers(self, query):
-        for row in range(self.supplier_table.rowCount()):
-            supplier_name = self.supplier_table.item(row, 1).text().lower()
-            if query.lower() in supplier_name:
-                self.supplier_table.setRowHidden(row, False)
-            else:
-                self.supplier_table.setRowHidden(row, True)
+        # Búsqueda por prefijos en proveedores_fts (nombre y contacto)
+        sql, params = search_query("proveedores", query, SUPPLIER_COLUMNS)
+        self.supplier_model.set_query(sql, params)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -0,0 +1,227 @@
+from PyQt6.QtWidgets import QStyledItemDelegate, QStyle
+from PyQt6.QtGui import QColor, QIcon, QPainter
+from PyQt6.QtCore import (
+    Qt, pyqtSignal, QAbstractTableModel, QModelIndex, QEvent, QRectF, QSize
+)
+
+from database import get_read_pool
+
+# Filas que se leen del cursor cada vez que la vista pide más
+FETCH_BATCH = 256
+
+
+class LazyQueryModel(QAbstractTableModel):
+    """Modelo de tabla que lee las filas de un cursor SQLite según se necesitan.
+
+    set_query() solo ejecuta la consulta; las filas se van trayendo por lotes
+    con canFetchMore/fetchMore a medida que la vista se desplaza, así que abrir
+    una tabla de cientos de miles de filas cuesta lo mismo que una de veinte.
+    Cada consulta usa su propia conexión de solo lectura, tomada del pool y
+    devuelta al agotar el cursor o al reemplazar la consulta: un cursor a
+    medio leer mantiene su instantánea, y en una conexión compartida haría
+    que las demás consultas no vieran los cambios posteriores.
+    Se pueden declarar más encabezados que columnas tiene la consulta: esas
+    columnas extra no tienen datos y las dibuja un delegado (p. ej. un botón).
+    Con key_column (que puede ir después de los encabezados, sin mostrarse)
+    update_rows() cambia filas ya cargadas sin volver a consultar.
+    """
+
+    def __init__(self, headers, formatters=None, alignment=None, batch_size=FETCH_BATCH, key_column=None, parent=None):
+        super().__init__(parent)
+        self.headers = list(headers)
+        self.formatters = formatters or {}
+        self.alignment = alignment
+        self.batch_size = batch_size
+        self.key_column = key_column
+        self._rows = []
+        self._positions = {}
+        self._pending = {}
+        self._cursor = None
+        self._conn = None
+
+    def set_query(self, sql, params=(), conn=None):
+        """Reemplaza el contenido por el resultado de una consulta nueva."""
+        self.beginResetModel()
+        self._close_cursor()
+        self._rows = []
+        self._positions = {}
+        self._pending = {}
+        if conn is None:
+            conn = self._conn = get_read_pool().acquire()
+        try:
+            self._cursor = conn.execute(sql, params)
+        except Exception:
+            self._close_cursor()
+            raise
+        finally:
+            self.endResetModel()
+
+    def set_rows(self, rows):
+        """Reemplaza el contenido por filas ya leídas (p. ej. una página)."""
+        self.beginResetModel()
+        self._close_cursor()
+        self._rows = []
+        self._positions = {}
+        self._pending = {}
+        self._append(list(rows))
+        self.endResetModel()
+
+    def clear(self):
+        self.beginResetModel()
+        self._close_cursor()
+        self._rows = []
+        self._positions = {}
+        self._pending = {}
+        self.endResetModel()
+
+    def _append(self, rows):
+        if self.key_column is not None:
+            for position, row in enumerate(rows, len(self._rows)):
+                key = row[self.key_column]
+                self._positions[key] = position
+                values = self._pending.pop(key, None)
+                if values is not None:
+                    rows[position - len(self._rows)] = self._changed(row, values)
+        self._rows.extend(rows)
+
+    @staticmethod
+    def _changed(row, values):
+        updated = list(row)
+        for column, value in values.items():
+            updated[column] = value
+        return tuple(updated)
+
+    def update_rows(self, changes):
+        """Cambia valores de filas ya cargadas: {clave: {columna: valor}}.
+
+        Devuelve {clave: fila anterior} de las que estaban cargadas. Los
+        cambios de las demás se aplican cuando el cursor llegue a ellas: el
+        cursor sigue leyendo la instantánea de cuando se abrió.
+        """
+        previous = {}
+        for key, values in changes.items():
+            position = self._positions.get(key)
+            if position is None:
+                if self._cursor is not None:
+                    self._pending.setdefault(key, {}).update(values)
+                continue
+            row = self._rows[position]
+            previous[key] = row
+            self._rows[position] = self._changed(row, values)
+            self.dataChanged.emit(
+                self.index(position, min(values)), self.index(position, max(values))
+            )
+        return previous
+
+    def _close_cursor(self):
+        # Cerrar el cursor libera la instantánea de lectura que mantiene abierta
+        if self._cursor is not None:
+            self._cursor.close()
+            self._cursor = None
+        if self._conn is not None:
+            get_read_pool().release(self._conn)
+            self._conn = None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._cursor is not None
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._cursor is None:
+            return
+        rows = self._cursor.fetchmany(self.batch_size)
+        if len(rows) < self.batch_size:
+            self._close_cursor()
+        if rows:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            self._append(rows)
+            self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        column = index.column()
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return self.alignment
+        if column >= len(row):
+            return None
+        value = row[column]
+        if role == Qt.ItemDataRole.DisplayRole:
+            formatter = self.formatters.get(column)
+            if formatter is not None and value is not None:
+                return formatter(value)
+            return "" if value is None else str(value)
+        if role == Qt.ItemDataRole.UserRole:
+            return value
+        return None
+
+    def row_values(self, row):
+        """Valores crudos de una fila ya cargada."""
+        return self._rows[row]
+
+
+class ButtonDelegate(QStyledItemDelegate):
+    """Dibuja un botón en cada celda de una columna sin crear widgets por fila.
+
+    Emite clicked(fila) al soltar el ratón sobre el botón.
+    """
+
+    clicked = pyqtSignal(int)
+
+    def __init__(self, text, color, icon_path=None, parent=None):
+        super().__init__(parent)
+        self.text = text
+        self.color = QColor(color)
+        self.icon = QIcon(icon_path) if icon_path else None
+        self._pressed = None
+
+    def _button_rect(self, option):
+        return QRectF(option.rect).adjusted(6, 8, -6, -8)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        color = self.color
+        if option.state & QStyle.StateFlag.State_MouseOver:
+            color = color.darker(110)
+        if self._pressed == (index.row(), index.column()):
+            color = color.darker(120)
+        rect = self._button_rect(option)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(color)
+        painter.drawRoundedRect(rect, 4, 4)
+
+        painter.setPen(QColor("white"))
+        text_rect = rect
+        if self.icon is not None:
+            icon_size = QSize(16, 16)
+            icon_rect = rect.toRect()
+            icon_rect.setWidth(icon_size.width() + 12)
+            self.icon.paint(painter, icon_rect.adjusted(8, 0, 0, 0))
+            text_rect = rect.adjusted(icon_size.width() + 8, 0, 0, 0)
+        painter.drawText(text_rect, Qt.AlignmentFlag.AlignCenter, self.text)
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.Type.MouseButtonPress:
+            if self._button_rect(option).contains(event.position()):
+                self._pressed = (index.row(), index.column())
+                return True
+        elif event.type() == QEvent.Type.MouseButtonRelease:
+            pressed, self._pressed = self._pressed, None
+            if pressed == (index.row(), index.column()) and self._button_rect(option).contains(event.position()):
+                self.clicked.emit(index.row())
+            return pressed is not None
+        return False
@@ -0,0 +1,207 @@
+"""Trazas del arranque: importaciones, construcción de módulos y SQL.
+
+Desactivado no cuesta nada. Se activa con la variable de entorno
+POS_TRACE_STARTUP=<archivo.json> o con main.py --trace-startup <archivo.json>;
+con POS_TRACE_EXIT=1 la aplicación se cierra en cuanto el login está listo
+(benchmarks/bench_startup.py). El archivo usa el formato de trazas de Chrome
+(se abre en chrome://tracing o en Perfetto) y añade un "resumen" con los
+milisegundos por importación, por fase o módulo y de SQL por fase.
+
+El SQL se atribuye a la fase abierta en el hilo que lo ejecuta (por ejemplo
+la construcción de un módulo); fuera de una fase, al nombre del hilo.
+"""
+import builtins
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+ENV_VAR = "POS_TRACE_STARTUP"
+EXIT_ENV_VAR = "POS_TRACE_EXIT"
+FLAG = "--trace-startup"
+
+_tracer = None
+
+
+class StartupTracer:
+    def __init__(self, path):
+        self.path = path
+        self.origin = time.perf_counter()
+        self.events = []
+        self.marks = {}
+        self.imports = {}
+        self.phases = {}
+        self.sql = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _us(self, instant):
+        return round((instant - self.origin) * 1_000_000)
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name, category="fase"):
+        stack = self._stack()
+        stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            stack.pop()
+            totals = self.imports if category == "import" else self.phases
+            with self._lock:
+                totals[name] = totals.get(name, 0) + (end - start) * 1000
+                self.events.append({
+                    "name": name, "cat": category, "ph": "X", "pid": os.getpid(),
+                    "tid": threading.get_ident(), "ts": self._us(start), "dur": self._us(end) - self._us(start),
+                })
+
+    def mark(self, name):
+        instant = time.perf_counter()
+        with self._lock:
+            self.marks[name] = (instant - self.origin) * 1000
+            self.events.append({
+                "name": name, "cat": "marca", "ph": "i", "s": "g", "pid": os.getpid(),
+                "tid": threading.get_ident(), "ts": self._us(instant),
+            })
+
+    def add_sql(self, seconds):
+        stack = self._stack()
+        # Las importaciones no son fases: el SQL va a la fase que las contiene
+        phase = next((name for name in reversed(stack) if not name.startswith("import ")), None)
+        phase = phase or f"hilo {threading.current_thread().name}"
+        with self._lock:
+            ms, count = self.sql.get(phase, (0, 0))
+            self.sql[phase] = (ms + seconds * 1000, count + 1)
+
+    def summary(self):
+        with self._lock:
+            return {
+                "marcas_ms": dict(self.marks),
+                "importaciones_ms": dict(sorted(self.imports.items(), key=lambda item: -item[1])),
+                "fases_ms": dict(sorted(self.phases.items(), key=lambda item: -item[1])),
+                "sql": {
+                    phase: {"ms": ms, "llamadas": count}
+                    for phase, (ms, count) in sorted(self.sql.items(), key=lambda item: -item[1][0])
+                },
+            }
+
+    def write(self):
+        summary = self.summary()
+        with self._lock:
+            events = list(self.events)
+        with open(self.path, "w", encoding="utf-8") as out:
+            json.dump({"traceEvents": events, "resumen": summary}, out, ensure_ascii=False, indent=1)
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor que suma a la traza el tiempo de ejecutar y de leer filas."""
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            if _tracer is not None:
+                _tracer.add_sql(time.perf_counter() - start)
+
+    def execute(self, sql, parameters=()):
+        return self._timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(super().executemany, sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self._timed(super().executescript, sql_script)
+
+    def fetchone(self):
+        return self._timed(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._timed(super().fetchall)
+
+    def __next__(self):
+        return self._timed(super().__next__)
+
+
+class TracedConnection(sqlite3.Connection):
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+def _traced_import(original):
+    def traced(name, globals=None, locals=None, fromlist=(), level=0):
+        # Solo la primera importación absoluta de cada módulo cuesta algo
+        if level or name in sys.modules or _tracer is None:
+            return original(name, globals, locals, fromlist, level)
+        with _tracer.span(f"import {name}", "import"):
+            return original(name, globals, locals, fromlist, level)
+
+    return traced
+
+
+def start(argv=None):
+    """Activa la traza si la pide el entorno o argv; devuelve el trazador o None.
+
+    Quita --trace-startup <archivo> de argv. Llamar antes de las
+    importaciones pesadas para que queden medidas.
+    """
+    global _tracer
+    path = os.environ.get(ENV_VAR)
+    if argv is not None and FLAG in argv:
+        index = argv.index(FLAG)
+        path = argv[index + 1] if index + 1 < len(argv) else "startup_trace.json"
+        del argv[index:index + 2]
+    if not path or _tracer is not None:
+        return _tracer
+
+    _tracer = StartupTracer(path)
+    builtins.__import__ = _traced_import(builtins.__import__)
+    import database
+
+    database.CONNECTION_FACTORY = TracedConnection
+    return _tracer
+
+
+def active():
+    return _tracer is not None
+
+
+def span(name, category="fase"):
+    return _tracer.span(name, category) if _tracer is not None else nullcontext()
+
+
+def mark(name):
+    if _tracer is not None:
+        _tracer.mark(name)
+
+
+def write():
+    if _tracer is not None:
+        _tracer.write()
+
+
+def exit_when_ready():
+    """True si la traza se pidió solo para medir el arranque (POS_TRACE_EXIT)."""
+    return _tracer is not None and os.environ.get(EXIT_ENV_VAR) == "1"
@@ -0,0 +1,87 @@
+import traceback
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+import database
+import events
+
+
+class WorkerSignals(QObject):
+    """Señales de un Worker; Qt las entrega en el hilo de la interfaz."""
+
+    progress = pyqtSignal(int)
+    result = pyqtSignal(object)
+    error = pyqtSignal(str)
+    finished = pyqtSignal()
+
+
+class Worker(QRunnable):
+    """Ejecuta fn(*args, progress=..., **kwargs) en un hilo de un QThreadPool.
+
+    fn recibe un callback progress(porcentaje) que emite la señal progress;
+    su valor de retorno llega por result y cualquier excepción por error.
+    Al terminar, las conexiones que fn tomó con get_connection() o
+    get_read_connection() vuelven al pool.
+    Conecta las señales a métodos de widgets (no a lambdas) para que Qt las
+    entregue en el hilo de la interfaz.
+    """
+
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, progress=self.signals.progress.emit, **self.kwargs)
+        except Exception as exc:
+            traceback.print_exc()
+            self.signals.error.emit(str(exc))
+        else:
+            self.signals.result.emit(result)
+        finally:
+            # Cada tarea del pool corre con un threading.local nuevo: la
+            # conexión que abrió no la volvería a usar nadie
+            database.get_pool().release_thread_connection()
+            database.get_read_pool().release_thread_connection()
+            self.signals.finished.emit()
+
+
+def serial_pool(parent=None):
+    """QThreadPool de un solo hilo: los trabajos corren en orden, sin solaparse."""
+    pool = QThreadPool(parent)
+    pool.setMaxThreadCount(1)
+    return pool
+
+
+
+class EventRelay(QObject):
+    """Reenvía eventos de events.get_bus() al hilo de la interfaz.
+
+    Conecta la señal event(tipo, datos) a un método del widget: aunque el
+    evento se publique desde otro hilo, Qt lo entrega en el hilo del widget.
+    """
+
+    event = pyqtSignal(str, object)
+
+    def __init__(self, kinds, parent=None):
+        super().__init__(parent)
+        self._relays = {kind: self._relayer(kind) for kind in kinds}
+        for kind, relay in self._relays.items():
+            events.get_bus().subscribe(kind, relay)
+
+    def _relayer(self, kind):
+        def relay(payload):
+            try:
+                self.event.emit(kind, payload)
+            except RuntimeError:
+                # El objeto de Qt ya se destruyó junto con su widget
+                self.close()
+
+        return relay
+
+    def close(self):
+        for kind, relay in self._relays.items():
+            events.get_bus().unsubscribe(kind, relay)
@@ -0,0 +1,233 @@
+"""Escritor único: todas las escrituras de la aplicación, confirmadas en grupo.
+
+Los módulos no escriben en la base desde su propio hilo: envían un trabajo
+(una función job(conn, *args)) a Writer, cuyo único hilo es el único que
+escribe. El hilo toma todo lo que haya en la cola (hasta MAX_BATCH
+trabajos) y lo ejecuta en una sola transacción BEGIN IMMEDIATE con un solo
+commit. Mientras se hace ese commit se acumula el siguiente grupo, así que
+con más cajas (la interfaz, la API de las cajas satélite) hay más trabajos
+por commit y nadie compite por el bloqueo de escritura ("database is
+locked").
+
+Cada trabajo va en su propio SAVEPOINT: si uno falla se deshace solo ese y
+el resto del grupo se confirma igual. submit() devuelve un Future con lo que
+devolvió el trabajo o con su excepción; run() y execute() esperan el
+resultado. after_commit(resultado) se llama en el hilo del escritor después
+del commit y antes de resolver el Future, en el orden de confirmación (así
+se publican los eventos de las ventas).
+
+Después de stop() el escritor no vuelve a arrancar: submit() lanza
+RuntimeError, para que nadie escriba mientras la aplicación se cierra.
+
+stats() da la profundidad de la cola, los trabajos por commit y las
+latencias de espera en la cola y de commit (p50/p99 de las últimas
+LATENCY_SAMPLES).
+"""
+import queue
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import Future
+
+from database import get_connection, get_pool
+
+# Trabajos como máximo por transacción
+MAX_BATCH = 64
+# Cuánto espera el escritor por más trabajos antes de confirmar un grupo.
+# Con 0 el grupo es lo que llegó durante el commit anterior: en
+# benchmarks/bench_writer.py esperar 2 ms apenas agranda los grupos y
+# multiplica la latencia
+GROUP_WINDOW = 0
+# Mediciones recientes guardadas para los percentiles de stats()
+LATENCY_SAMPLES = 1000
+
+_STOP = object()
+
+
+class WriteJob:
+    __slots__ = ("job", "args", "after_commit", "future", "queued")
+
+    def __init__(self, job, args, after_commit):
+        self.job = job
+        self.args = args
+        self.after_commit = after_commit
+        self.future = Future()
+        self.queued = time.perf_counter()
+
+
+def _execute(conn, sql, params):
+    cursor = conn.execute(sql, params)
+    return cursor.lastrowid, cursor.rowcount
+
+
+def _percentiles(samples):
+    if not samples:
+        return {"p50": None, "p99": None}
+    values = sorted(samples)
+    return {
+        "p50": values[len(values) // 2] * 1000,
+        "p99": values[min(len(values) - 1, len(values) * 99 // 100)] * 1000,
+    }
+
+
+class Writer:
+    def __init__(self, max_batch=MAX_BATCH, window=GROUP_WINDOW):
+        self.max_batch = max_batch
+        self.window = window
+        self._queue = queue.Queue()
+        self._thread = None
+        self._stopped = False
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._jobs = 0
+        self._commits = 0
+        self._largest = 0
+        self._deepest = 0
+        self._waits = deque(maxlen=LATENCY_SAMPLES)
+        self._commit_times = deque(maxlen=LATENCY_SAMPLES)
+
+    def start(self):
+        with self._lock:
+            self._start()
+
+    def _start(self):
+        # Con self._lock tomado
+        if self._stopped:
+            raise RuntimeError("El escritor ya se detuvo")
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="escritor", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """Termina el hilo después de confirmar lo que ya estaba en la cola."""
+        with self._lock:
+            self._stopped = True
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(_STOP)
+        if thread is not None:
+            thread.join(timeout)
+
+    def submit(self, job, *args, after_commit=None):
+        """Encola job(conn, *args) y devuelve un Future con su resultado."""
+        request = WriteJob(job, args, after_commit)
+        with self._lock:
+            # Dentro del bloqueo: nada entra en la cola detrás de _STOP
+            self._start()
+            self._queue.put(request)
+        depth = self._queue.qsize()
+        if depth > self._deepest:
+            with self._stats_lock:
+                self._deepest = max(self._deepest, depth)
+        return request.future
+
+    def run(self, job, *args, after_commit=None):
+        """Como submit(), pero espera a que el trabajo se confirme y devuelve su resultado."""
+        if threading.current_thread() is self._thread:
+            # El escritor se esperaría a sí mismo
+            raise RuntimeError("No se puede esperar al escritor desde su propio hilo")
+        return self.submit(job, *args, after_commit=after_commit).result()
+
+    def execute(self, sql, params=()):
+        """Ejecuta una sentencia por el escritor; devuelve (lastrowid, rowcount)."""
+        return self.run(_execute, sql, params)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "trabajos": self._jobs,
+                "commits": self._commits,
+                "trabajos_por_commit": self._jobs / self._commits if self._commits else 0,
+                "mayor_grupo": self._largest,
+                "en_cola": self._queue.qsize(),
+                "cola_maxima": self._deepest,
+                "espera_ms": _percentiles(self._waits),
+                "commit_ms": _percentiles(self._commit_times),
+            }
+
+    def _next_batch(self, first):
+        """Junta con first lo que haya o llegue en la ventana; True al final si hay que parar."""
+        batch = [first]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            try:
+                request = self._queue.get(timeout=max(0, deadline - time.perf_counter()))
+            except queue.Empty:
+                break
+            if request is _STOP:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    def _run(self):
+        while True:
+            request = self._queue.get()
+            if request is _STOP:
+                return
+            batch, stop = self._next_batch(request)
+            self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch):
+        conn = get_connection()
+        outcomes = []
+        started = time.perf_counter()
+        try:
+            with get_pool().transaction(conn):
+                for request in batch:
+                    outcomes.append(self._call(conn, request))
+        except Exception as error:
+            traceback.print_exc()
+            for request in batch:
+                request.future.set_exception(error)
+            return
+        finished = time.perf_counter()
+
+        with self._stats_lock:
+            self._jobs += len(batch)
+            self._commits += 1
+            self._largest = max(self._largest, len(batch))
+            self._commit_times.append(finished - started)
+            self._waits.extend(started - request.queued for request in batch)
+        for request, (ok, value) in zip(batch, outcomes):
+            if not ok:
+                request.future.set_exception(value)
+                continue
+            if request.after_commit is not None:
+                try:
+                    request.after_commit(value)
+                except Exception:
+                    traceback.print_exc()
+            request.future.set_result(value)
+
+    def _call(self, conn, request):
+        conn.execute("SAVEPOINT trabajo")
+        try:
+            value = request.job(conn, *request.args)
+        except Exception as error:
+            conn.execute("ROLLBACK TO trabajo")
+            conn.execute("RELEASE trabajo")
+            return False, error
+        conn.execute("RELEASE trabajo")
+        return True, value
+
+
+_writer = Writer()
+
+
+def get_writer():
+    return _writer
+
+
+def submit(job, *args, after_commit=None):
+    return _writer.submit(job, *args, after_commit=after_commit)
+
+
+def run(job, *args, after_commit=None):
+    return _writer.run(job, *args, after_commit=after_commit)
+
+
+def execute(sql, params=()):
+    return _writer.execute(sql, params)